@@ -1,232 +1,355 @@
-from fastapi import FastAPI, Request, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
+import io
+import os
+import tempfile
+from email.utils import formatdate, parsedate_to_datetime
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Form, Depends, HTTPException, UploadFile, File
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from jinja2 import FileSystemBytecodeCache
 from sqlalchemy.orm import Session
-from lib.db import get_db, Base, engine
-from lib import crud, models
-
-from lib.db import SessionLocal
-
-Base.metadata.create_all(bind=engine)
-
-from lib.db import SessionLocal  
-
-def seed_database():
-    db = SessionLocal()
+from starlette.concurrency import run_in_threadpool
+from lib.db import get_db, get_session, run_db, engine, async_engine, pool_stats
+from lib import api, assets, crud, events, export, fragments, importer, metrics, refdata, summary, scheduler, seed
+from lib.cache import digest
+
+# Importing this module never touches the database. Schema migrations and
+# demo seeding run once at startup unless AUTO_INIT_DB=0, in which case run
+# `python manage.py init-db` as a deploy step instead.
+AUTO_INIT_DB = os.environ.get("AUTO_INIT_DB", "1").lower() in ("1", "true", "yes")
+# /debug/pool is for sizing the pool, not for the public; off unless set.
+DEBUG_POOL = os.environ.get("DEBUG_POOL", "").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AUTO_INIT_DB:
+        await run_in_threadpool(seed.init_db)
+    due_date_checks = scheduler.start()
     try:
-        
-        if db.query(models.ToolType).first() is None:
-           
-            tool_types_data = [
-                ("Drilling Bits", "Fixed cutter and roller cone drill bits for various formations"),
-                ("Measurement While Drilling (MWD)", "Real-time downhole measurement tools for directional data"),
-                ("Logging While Drilling (LWD)", "Formation evaluation tools that measure petrophysical properties"),
-                ("Directional Drilling Tools", "Bent housing motors, rotary steerable systems for wellbore navigation"),
-                ("Downhole Motors", "Positive displacement motors for directional drilling"),
-                ("Stabilizers", "Blades and sleeve stabilizers for wellbore stability"),
-                ("Reamers", "Hole enlargement tools and back reamers"),
-                ("Drill Pipe", "Heavy weight drill pipe and drill collars"),
-                ("Mud Motors", "Turbodrilling motors and performance motors"),
-                ("Survey Instruments", "Multi-shot and single-shot survey tools")
-            ]
-
-            for name, description in tool_types_data:
-                crud.create_tool_type(db, name, description)
-
-            
-            users_data = [
-                ("john_kamau", "John Kamau", "john.kamau@gmail.com", "drilling_engineer"),
-                ("prince_kibali", "Prince Kibali", "prince.kibali@gmail.com", "mwd_technician"),
-                ("simon_njoroge", "Simon Njoroge", "simon.njoroge@gmail.com", "tool_push"),
-                ("edwin_omondi", "Edwin Omondi", "edwin.omondi@gmail.com", "mud_engineer"),
-                ("ann_kwamboka", "Ann Kwamboka", "ann.kwamboka@gmail.com", "rig_manager")
-            ]
-
-            for username, full_name, email, role in users_data:
-                crud.create_user(db, username, full_name, email, role)
-
-          
-            tools_data = [
-                ("PDC Bit 8.5\"", "MWDBIT-001", 1, "Drill Bits Storage"),
-                ("Tricone Bit 12.25\"", "MWDBIT-002", 1, "Drill Bits Storage"),
-                ("PDC Bit 6\"", "MWDBIT-003", 1, "Drill Bits Storage"),
-
-                ("PowerPulse MWD System", "MWDSYS-001", 2, "MWD Electronics Bay"),
-                ("TeleScope MWD Tool", "MWDSYS-002", 2, "MWD Electronics Bay"),
-                ("SlimPulse MWD", "MWDSYS-003", 2, "MWD Electronics Bay"),
-
-                ("EcoScope Multiple Propagation Resistivity", "LWDTOOL-001", 3, "LWD Tool Storage"),
-                ("SonicVision Sonic Tool", "LWDTOOL-002", 3, "LWD Tool Storage"),
-                ("Azimuthal Litho-Density Tool", "LWDTOOL-003", 3, "LWD Tool Storage"),
-
-                ("Navi-Drill RSS", "DDSYS-001", 4, "Directional Tools Bay"),
-                ("PowerDrive RSS", "DDSYS-002", 4, "Directional Tools Bay"),
-                ("AutoTrak RSS", "DDSYS-003", 4, "Directional Tools Bay"),
-
-                ("Hamilton Motor 8\"", "DHMOTOR-001", 5, "Downhole Motors Storage"),
-                ("Navi-Drill X-treme Motor", "DHMOTOR-002", 5, "Downhole Motors Storage"),
-                ("PowerPak Motor", "DHMOTOR-003", 5, "Downhole Motors Storage"),
-
-                ("Spiral Blade Stabilizer 8.5\"", "STABIL-001", 6, "Stabilizers Storage"),
-                ("Integral Blade Stabilizer", "STABIL-002", 6, "Stabilizers Storage"),
-                ("String Stabilizer", "STABIL-003", 6, "Stabilizers Storage"),
-            ]
-
-            for name, serial_number, type_id, location in tools_data:
-                crud.create_tool(db, name, serial_number, type_id, location)
-
-        db.commit()
-        print(" Database seeded with initial MWD equipment data")
-    except Exception as e:
-        print(f" Error seeding database: {e}")
-        db.rollback()
+        yield
     finally:
-        db.close()
-
-seed_database()
-
-
-app = FastAPI(title="MWD Tool Management")
-
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-templates = Jinja2Templates(directory="templates")
+        await scheduler.stop(due_date_checks)
+        await run_in_threadpool(events.stop)
+        if async_engine is not None:
+            # aiosqlite runs a non-daemon thread per connection; left open they keep the process alive.
+            await async_engine.dispose()
+
+
+app = FastAPI(title="MWD Tool Management", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+
+app.mount("/static", assets.static_files("static"), name="static")
+# The standalone frontend build, served with the same precompressed files and caching.
+frontend = assets.static_files("frontend", html=True)
+if frontend is not None:
+    app.mount("/frontend", frontend, name="frontend")
+app.include_router(api.router)
+
+templates = metrics.TimedTemplates(directory="templates")
+# Compiled templates survive restarts, so a new worker skips parsing them.
+JINJA_CACHE_DIR = os.environ.get("JINJA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "mwd-jinja-cache"))
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+templates.env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+fragments.install(templates.env)
+templates.env.globals["asset_url"] = assets.asset_url
+
+# Part of every ETag, so a deploy that changes a template or an asset URL
+# invalidates pages whose data did not change.
+TEMPLATES_VERSION = digest((sorted(
+    (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+    for entry in os.scandir("templates")
+), sorted(assets.manifest.items())))
+
+
+def _not_modified(request: Request, etag: str, last_modified: float):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def conditional(request: Request, entries, render):
+    """Answers 304 when the client's copy was built from the same cached data, else renders.
+
+    `entries` are the CacheEntry objects the page is built from; their
+    versions form the ETag and the newest modification time the
+    Last-Modified header.
+    """
+    etag = f'W/"{digest((TEMPLATES_VERSION, [e.version for e in entries]))}"'
+    last_modified = max(e.modified_at for e in entries)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response = render()
+    response.headers.update(headers)
+    return response
+
+
+def is_fragment_request(request: Request):
+    """htmx sends HX-Request on the requests it makes; those get a fragment back, not a redirect."""
+    return request.headers.get("hx-request") == "true"
+
+
+def render_row(template_name: str, key, **context):
+    return HTMLResponse(fragments.cache.render(templates.env, template_name, tuple(key), **context))
+
+
+def paginate(rows, size=crud.PAGE_SIZE):
+    """Splits a PAGE_SIZE + 1 fetch into the page rows and whether more follow."""
+    return rows[:size], len(rows) > size
+
+
+def check_format(fmt: str):
+    if fmt not in importer.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(importer.FORMATS)}")
+    return fmt
+
+
+def import_upload(db: Session, kind: str, file: UploadFile, fmt: str):
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    report = importer.import_rows(db, kind, importer.read_rows(stream, check_format(fmt)))
+    return {
+        "inserted": sum(batch["inserted"] for batch in report),
+        "rejected": sum(len(batch["errors"]) for batch in report),
+        "batches": report,
+    }
 
 
 @app.get("/", response_class=HTMLResponse)
-def home(request: Request, db: Session = Depends(get_db)):
-    types = crud.get_tool_types(db)
-    return templates.TemplateResponse("index.html", {"request": request, "major_tool_types": types})
+async def home(request: Request, db=Depends(get_session)):
+    types = await run_db(db, refdata.tool_types)
+    fleet = await run_db(db, summary.fleet_summary_entry)
+    return conditional(request, (types, fleet), lambda: templates.TemplateResponse("index.html", {
+        "request": request,
+        "major_tool_types": types.value,
+        "fleet": fleet.value,
+    }))
 
 @app.get("/users", response_class=HTMLResponse)
-def users(request: Request, db: Session = Depends(get_db)):
-    users_db = crud.get_users(db)
-    return templates.TemplateResponse("users.html", {"request": request, "users": users_db})
+async def users(request: Request, after: int = None, db=Depends(get_session)):
+    all_users = await run_db(db, refdata.users)
+    users_db, has_more = paginate(refdata.page_after(all_users.value, after, crud.PAGE_SIZE + 1))
+    return conditional(request, (all_users,), lambda: templates.TemplateResponse("users.html", {
+        "request": request,
+        "users": users_db,
+        "first_page": after is None,
+        "next_url": f"/users?after={users_db[-1].id}" if has_more else None,
+    }))
+
+@app.get("/users/export")
+def export_users(format: str = "csv", db: Session = Depends(get_db)):
+    return export.export_response("users", crud.USER_EXPORT_COLUMNS, crud.iter_users(db), check_format(format))
+
+@app.post("/users/import")
+def import_users(file: UploadFile = File(...), format: str = Form("csv"), db: Session = Depends(get_db)):
+    return import_upload(db, "users", file, format)
 
 @app.post("/users/add")
-def add_user(
+async def add_user(
     username: str = Form(...),
     full_name: str = Form(""),
     email: str = Form(""),
     role: str = Form("technician"),
-    db: Session = Depends(get_db)
+    db=Depends(get_session)
 ):
-    crud.create_user(db, username, full_name, email, role)
+    await run_db(db, crud.create_user, username, full_name, email, role)
     return RedirectResponse("/users", status_code=303)
 
 @app.get("/users/edit/{user_id}", response_class=HTMLResponse)
-def edit_user(user_id: int, request: Request, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+async def edit_user(user_id: int, request: Request, db=Depends(get_session)):
+    user = await run_db(db, crud.get_user, user_id)
     if not user:
         return RedirectResponse("/users", status_code=303)
     return templates.TemplateResponse("edit_user.html", {"request": request, "user": user})
 
 @app.post("/users/edit/{user_id}")
-def update_user(
+async def update_user(
     user_id: int,
     username: str = Form(...),
     full_name: str = Form(""),
     email: str = Form(""),
     role: str = Form("technician"),
-    db: Session = Depends(get_db)
+    db=Depends(get_session)
 ):
-    user = crud.update_user(db, user_id, username, full_name, email, role)
+    user = await run_db(db, crud.update_user, user_id, username, full_name, email, role)
     return RedirectResponse("/users", status_code=303)
 
 @app.post("/users/delete/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    crud.delete_user(db, user_id)
+async def delete_user(user_id: int, db=Depends(get_session)):
+    await run_db(db, crud.delete_user, user_id)
     return RedirectResponse("/users", status_code=303)
 
 @app.get("/tool-types", response_class=HTMLResponse)
-def tool_types(request: Request, db: Session = Depends(get_db)):
-    tool_types_list = crud.get_tool_types(db)
-    return templates.TemplateResponse("tool_types.html", {"request": request, "tool_types": tool_types_list})
+async def tool_types(request: Request, after: int = None, db=Depends(get_session)):
+    all_types = await run_db(db, refdata.tool_types)
+    tool_types_list, has_more = paginate(refdata.page_after(all_types.value, after, crud.PAGE_SIZE + 1))
+    return conditional(request, (all_types,), lambda: templates.TemplateResponse("tool_types.html", {
+        "request": request,
+        "tool_types": tool_types_list,
+        "first_page": after is None,
+        "next_url": f"/tool-types?after={tool_types_list[-1].id}" if has_more else None,
+    }))
 
 @app.post("/tool-types/add")
-def add_tool_type(name: str = Form(...), description: str = Form(""), db: Session = Depends(get_db)):
-    crud.create_tool_type(db, name, description)
+async def add_tool_type(name: str = Form(...), description: str = Form(""), db=Depends(get_session)):
+    await run_db(db, crud.create_tool_type, name, description)
     return RedirectResponse("/tool-types", status_code=303)
 
 @app.get("/tool-types/edit/{tool_type_id}", response_class=HTMLResponse)
-def edit_tool_type(tool_type_id: int, request: Request, db: Session = Depends(get_db)):
-    tt = db.query(models.ToolType).filter(models.ToolType.id == tool_type_id).first()
+async def edit_tool_type(tool_type_id: int, request: Request, db=Depends(get_session)):
+    tt = await run_db(db, crud.get_tool_type, tool_type_id)
     if not tt:
         return RedirectResponse("/tool-types", status_code=303)
     return templates.TemplateResponse("edit_tool_type.html", {"request": request, "tool_type": tt})
 
 @app.post("/tool-types/edit/{tool_type_id}")
-def update_tool_type(
+async def update_tool_type(
     tool_type_id: int,
     name: str = Form(...),
     description: str = Form(""),
-    db: Session = Depends(get_db)
+    db=Depends(get_session)
 ):
-    tt = crud.update_tool_type(db, tool_type_id, name, description)
+    tt = await run_db(db, crud.update_tool_type, tool_type_id, name, description)
     return RedirectResponse("/tool-types", status_code=303)
 
 @app.post("/tool-types/delete/{tool_type_id}")
-def delete_tool_type(tool_type_id: int, db: Session = Depends(get_db)):
-    crud.delete_tool_type(db, tool_type_id)
+async def delete_tool_type(tool_type_id: int, db=Depends(get_session)):
+    await run_db(db, crud.delete_tool_type, tool_type_id)
     return RedirectResponse("/tool-types", status_code=303)
 
 @app.get("/tools", response_class=HTMLResponse)
-def tools(request: Request, search: str = "", db: Session = Depends(get_db)):
-    all_tools = crud.get_tools(db)
-
+async def tools(request: Request, search: str = "", after: int = None, db=Depends(get_session)):
+    has_more = False
     if search:
-        tools_db = [tool for tool in all_tools
-                if search.lower() in tool.name.lower() or
-                   search.lower() in tool.serial_number.lower()]
+        tools_db = await run_db(db, crud.search_tools, search)
     else:
-        tools_db = all_tools
+        tools_db, has_more = paginate(await run_db(db, crud.get_tools, after_id=after, limit=crud.PAGE_SIZE + 1))
 
     return templates.TemplateResponse("tools.html", {
         "request": request,
         "tools": tools_db,
-        "types": crud.get_tool_types(db),
-        "search_query": search
+        "types": (await run_db(db, refdata.tool_types)).value,
+        "search_query": search,
+        "first_page": after is None,
+        "next_url": f"/tools?after={tools_db[-1].id}" if has_more else None,
     })
 
+@app.get("/tools/rows/{tool_id}", response_class=HTMLResponse)
+async def tool_row(tool_id: int, db=Depends(get_session)):
+    tool = await run_db(db, crud.get_tool_with_type, tool_id)
+    if not tool:
+        raise HTTPException(status_code=404, detail="Tool not found")
+    key = (tool.id, tool.name, tool.serial_number, tool.type_id,
+           tool.tool_type.name if tool.tool_type else None, tool.location, tool.status, tool.calibration_due)
+    return render_row("_tool_row.html", key, tool=tool)
+
+@app.get("/tools/export")
+def export_tools(format: str = "csv", db: Session = Depends(get_db)):
+    return export.export_response("tools", crud.TOOL_EXPORT_COLUMNS, crud.iter_tools(db), check_format(format))
+
+@app.post("/tools/import")
+def import_tools(file: UploadFile = File(...), format: str = Form("csv"), db: Session = Depends(get_db)):
+    return import_upload(db, "tools", file, format)
+
 @app.post("/tools/add")
-def add_tool(
+async def add_tool(
     name: str = Form(...),
     serial_number: str = Form(...),
     type_id: int = Form(...),
     location: str = Form(""),
-    db: Session = Depends(get_db)
+    db=Depends(get_session)
 ):
-    crud.create_tool(db, name, serial_number, type_id, location)
+    await run_db(db, crud.create_tool, name, serial_number, type_id, location)
     return RedirectResponse("/tools", status_code=303)
 
 @app.get("/checkouts", response_class=HTMLResponse)
-def checkouts(request: Request, db: Session = Depends(get_db)):
-    active = crud.get_active_checkouts(db)
-    return templates.TemplateResponse("checkouts.html", {"request": request, "checkouts": active})
+async def checkouts(request: Request, cursor: str = None, db=Depends(get_session)):
+    active, has_more = paginate(await run_db(db, crud.get_active_checkout_rows, cursor=cursor, limit=crud.PAGE_SIZE + 1))
+    return templates.TemplateResponse("checkouts.html", {
+        "request": request,
+        "checkouts": active,
+        "fleet": await run_db(db, summary.fleet_summary),
+        "first_page": cursor is None,
+        "next_url": f"/checkouts?cursor={crud.checkout_cursor(active[-1])}" if has_more else None,
+    })
+
+@app.get("/checkouts/rows/{checkout_id}", response_class=HTMLResponse)
+async def checkout_row(checkout_id: int, db=Depends(get_session)):
+    """One board row; empty once the checkout has been returned, so htmx drops the row."""
+    row = await run_db(db, crud.get_active_checkout_row, checkout_id)
+    if row is None:
+        return HTMLResponse("")
+    return render_row("_checkout_row.html", row, checkout=row)
+
+@app.get("/checkouts/export")
+def export_checkouts(format: str = "csv", db: Session = Depends(get_db)):
+    return export.export_response("checkouts", crud.CHECKOUT_EXPORT_COLUMNS, crud.iter_checkouts(db), check_format(format))
+
+@app.post("/checkouts/import")
+def import_checkouts(file: UploadFile = File(...), format: str = Form("csv"), db: Session = Depends(get_db)):
+    return import_upload(db, "checkouts", file, format)
 
 @app.get("/checkouts/new", response_class=HTMLResponse)
-def new_checkout(request: Request, db: Session = Depends(get_db)):
-    users_db = crud.get_users(db)
-    available_tools = crud.get_available_tools(db)
-    return templates.TemplateResponse("add_checkout.html", {
+async def new_checkout(request: Request, db=Depends(get_session)):
+    users_db = await run_db(db, refdata.users)
+    available_tools = await run_db(db, refdata.available_tools)
+    return conditional(request, (users_db, available_tools), lambda: templates.TemplateResponse("add_checkout.html", {
         "request": request,
-        "users": users_db,
-        "available_tools": available_tools
-    })
+        "users": users_db.value,
+        "available_tools": available_tools.value,
+    }))
 
 @app.post("/checkouts/checkout")
-def checkout_tool(
+async def checkout_tool(
+    request: Request,
     user_id: int = Form(...),
     tool_id: int = Form(...),
     project_location: str = Form(...),
     due_date: str = Form(...),
-    db: Session = Depends(get_db)
+    db=Depends(get_session)
 ):
-    co, err = crud.checkout_tool(db, user_id, tool_id, project_location, due_date)
+    co, err = await run_db(db, crud.checkout_tool, user_id, tool_id, project_location, due_date)
+    if is_fragment_request(request):
+        if err:
+            raise HTTPException(status_code=409, detail=err)
+        row = await run_db(db, crud.get_open_checkout_row, tool_id)
+        return render_row("_checkout_row.html", row, checkout=row)
     return RedirectResponse("/checkouts", status_code=303)
 
 @app.post("/checkouts/return")
-def return_tool(tool_id: int = Form(...), condition: str = Form("Good"), db: Session = Depends(get_db)):
-    co, err = crud.return_tool(db, tool_id, condition)
+async def return_tool(request: Request, tool_id: int = Form(...), condition: str = Form("Good"), db=Depends(get_session)):
+    co, err = await run_db(db, crud.return_tool, tool_id, condition)
+    if is_fragment_request(request):
+        if err:
+            # htmx leaves the row in place on an error status.
+            raise HTTPException(status_code=409, detail=err)
+        # The returned checkout leaves the board: swap its row for nothing.
+        return HTMLResponse("")
     return RedirectResponse("/checkouts", status_code=303)
+
+@app.get("/debug/pool")
+def debug_pool():
+    if not DEBUG_POOL:
+        raise HTTPException(status_code=404)
+    stats = {"sync": pool_stats(engine)}
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine)
+    return stats
+
+@app.get("/metrics")
+def prometheus_metrics():
+    pools = {"sync": pool_stats(engine)}
+    if async_engine is not None:
+        pools["async"] = pool_stats(async_engine)
+    body, content_type = metrics.render_latest(pools)
+    return Response(body, media_type=content_type)
@@ -0,0 +1,5 @@
+"""Benchmark suite: synthetic fleet generator and in-process route runner.
+
+    python -m bench generate --database-url sqlite:///bench.db --tools 100000 --checkouts 1000000
+    python -m bench run --database-url sqlite:///bench.db -o results.json --compare baseline.json
+"""
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+
+def _configure(args):
+    # lib.db reads these at import time, so set them before importing anything from lib.
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SCHEDULER_ENABLED", "0")
+    os.environ.setdefault("DEBUG_POOL", "1")
+
+
+def cmd_generate(args):
+    _configure(args)
+    from bench import fleet
+
+    counts = fleet.generate(
+        users=args.users, tool_types=args.tool_types, tools=args.tools, checkouts=args.checkouts,
+        checked_out_fraction=args.checked_out_fraction, seed_value=args.seed,
+    )
+    print(json.dumps(counts))
+    if args.archive_after_days is not None:
+        from datetime import timedelta
+        from lib import archive
+
+        moved = archive.archive_returned(older_than=timedelta(days=args.archive_after_days))
+        print(f"Archived {moved} returned checkouts")
+    return 0
+
+
+def cmd_run(args):
+    if args.db_async:
+        os.environ["DB_ASYNC"] = "1"
+    _configure(args)
+    from bench import runner
+
+    preset = runner.PRESETS[args.preset]
+    results = asyncio.run(runner.run(
+        requests=args.requests or preset["requests"], concurrency=args.concurrency or preset["concurrency"],
+        only=args.only, writes=not args.no_writes,
+    ))
+    print(f"import {results['meta']['import_seconds']}s, startup {results['meta']['lifespan_startup_seconds']}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as f:
+        regressions = runner.compare(results, json.load(f), args.tolerance)
+    for route, metric, before, now in regressions:
+        print(f"REGRESSION {route}: {metric} {before} -> {now}", file=sys.stderr)
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 1 if regressions else 0
+
+
+def cmd_reservations(args):
+    _configure(args)
+    from bench import reservations
+
+    if args.count:
+        print(f"Booked {reservations.generate(args.count, history_days=args.history_days)} reservations")
+    print(json.dumps(reservations.run(windows=args.windows)))
+    return 0
+
+
+def cmd_due_checks(args):
+    _configure(args)
+    from bench import due_checks
+
+    steps = [int(step) for step in args.steps.split(",")]
+    for step in due_checks.run(steps=steps, repeat=args.repeat):
+        print(json.dumps(step))
+    return 0
+
+
+def cmd_archive(args):
+    _configure(args)
+    from bench import archive_board
+
+    steps = [int(step) for step in args.steps.split(",")]
+    for step in archive_board.run(steps=steps, repeat=args.repeat, pages=args.pages):
+        print(json.dumps(step))
+    return 0
+
+
+def cmd_search(args):
+    _configure(args)
+    from bench import search
+
+    print(json.dumps(search.run(repeat=args.repeat), indent=2))
+    return 0
+
+
+def cmd_serialization(args):
+    _configure(args)
+    from bench import serialization
+
+    print(json.dumps(serialization.run(repeat=args.repeat), indent=2))
+    return 0
+
+
+def cmd_import(args):
+    _configure(args)
+    from bench import bulk_import
+
+    print(json.dumps(bulk_import.run(rows=args.rows, per_row_rows=args.per_row_rows), indent=2))
+    return 0
+
+
+def cmd_assets(args):
+    _configure(args)
+    from bench import assets
+
+    results = asyncio.run(assets.run(pages=args.page or ["/"]))
+    for page, modes in results.items():
+        for accept_encoding, loads in modes.items():
+            print(f"{page:12} {accept_encoding:10} cold {loads['cold']['bytes']:>9} B in {loads['cold']['requests']} requests"
+                  f"   warm {loads['warm']['bytes']:>9} B in {loads['warm']['requests']} requests")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="MWD Tool Management benchmarks")
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL / lib/mwd.db; use a scratch database")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="Bulk-load a synthetic fleet")
+    p.add_argument("--users", type=int, default=500)
+    p.add_argument("--tool-types", type=int, default=40)
+    p.add_argument("--tools", type=int, default=10_000)
+    p.add_argument("--checkouts", type=int, default=100_000)
+    p.add_argument("--checked-out-fraction", type=float, default=0.2)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--archive-after-days", type=int, help="archive old returned checkouts after loading")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser("run", help="Benchmark every route in-process")
+    p.add_argument("--preset", choices=["quick", "contention"], default="quick",
+                   help="quick: 200 requests from 8 clients; contention: 2000 from 200")
+    p.add_argument("--requests", type=int, help="timed requests per route (overrides the preset)")
+    p.add_argument("--concurrency", type=int, help="requests in flight at once, i.e. simulated clients (overrides the preset)")
+    p.add_argument("--db-async", action="store_true", help="serve from the async engine (same as DB_ASYNC=1)")
+    p.add_argument("--only", help="only routes whose name contains this")
+    p.add_argument("--no-writes", action="store_true", help="skip checkout/return routes")
+    p.add_argument("-o", "--output", help="write results JSON here")
+    p.add_argument("--compare", help="results JSON from an earlier run; exit 1 on regressions")
+    p.add_argument("--tolerance", type=float, default=0.10)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("reservations", help="Availability query vs a naive scan over reservations")
+    p.add_argument("--count", type=int, default=100_000, help="reservations to book first (0 to reuse existing)")
+    p.add_argument("--history-days", type=int, default=730, help="how far into the past bookings reach")
+    p.add_argument("--windows", type=int, default=20)
+    p.set_defaults(func=cmd_reservations)
+
+    p = sub.add_parser("due-checks", help="Overdue/calibration scan time as checkout history grows")
+    p.add_argument("--steps", default="100000,1000000,5000000", help="returned-history sizes to time at")
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=cmd_due_checks)
+
+    p = sub.add_parser("archive", help="Active board time as history grows, before and after archiving")
+    p.add_argument("--steps", default="100000,1000000,5000000", help="total returned-history sizes to time at")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--pages", type=int, default=3, help="board pages walked per timing")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("search", help="Database tool search vs the old in-Python filter")
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("serialization", help="JSON API response-body cost vs the HTML template for the same rows")
+    p.add_argument("--repeat", type=int, default=200)
+    p.set_defaults(func=cmd_serialization)
+
+    p = sub.add_parser("import", help="Bulk import rows/sec vs the per-row create path")
+    p.add_argument("--rows", type=int, default=20_000, help="rows per kind for the bulk import")
+    p.add_argument("--per-row-rows", type=int, default=1_000, help="rows per kind for the per-row path")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("assets", help="Bytes transferred for a cold and a warm page load")
+    p.add_argument("--page", action="append", help="page to load (repeatable, default /)")
+    p.set_defaults(func=cmd_assets)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
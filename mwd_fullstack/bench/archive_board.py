@@ -0,0 +1,71 @@
+"""Active board cost as checkout history grows, with and without archiving.
+
+Grows the total returned checkout history (hot table plus archive) in steps
+(default 100k, 1M and 5M rows) while the open checkouts stay the same. At
+each step it times the first few pages of ``crud.get_active_checkout_rows``
+with all of the history still in ``checkouts``, then runs
+``archive.archive_returned`` and times them again. The board reads only open
+checkouts through a partial index, so both timings should stay flat; the
+archive pass is reported so its own cost is visible too.
+"""
+import statistics
+import time
+
+from sqlalchemy import func, select
+
+from lib import archive, crud
+from lib.db import SessionLocal, engine
+from lib.models import Checkout, CheckoutArchive
+from bench.due_checks import DEFAULT_STEPS, _history_rows, grow_history
+
+
+def _archived_rows(conn):
+    return conn.scalar(select(func.count()).select_from(CheckoutArchive))
+
+
+def _time_board(repeat, pages):
+    samples = []
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            cursor = None
+            for _ in range(pages):
+                rows = crud.get_active_checkout_rows(db, cursor=cursor)
+                if len(rows) < crud.PAGE_SIZE:
+                    break
+                cursor = crud.checkout_cursor(rows[-1])
+            samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def run(steps=DEFAULT_STEPS, repeat=5, pages=3):
+    """Returns one entry per step: hot/archived sizes and board ms before and after archiving."""
+    results = []
+    for target in steps:
+        with engine.connect() as conn:
+            archived = _archived_rows(conn)
+        added = grow_history(max(target - archived, 0))
+        with engine.connect() as conn:
+            hot = _history_rows(conn)
+            open_checkouts = conn.scalar(select(func.count()).select_from(Checkout).where(Checkout.returned_at.is_(None)))
+        unarchived_ms = _time_board(repeat, pages)
+
+        start = time.perf_counter()
+        moved = archive.archive_returned()
+        archive_ms = round((time.perf_counter() - start) * 1000, 3)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+        archived_ms = _time_board(repeat, pages)
+        with engine.connect() as conn:
+            results.append({
+                "history_rows": hot + archived,
+                "added": added,
+                "open_checkouts": open_checkouts,
+                "board_ms_all_hot": unarchived_ms,
+                "archived_now": moved,
+                "archive_pass_ms": archive_ms,
+                "hot_history_after": _history_rows(conn),
+                "archived_total": _archived_rows(conn),
+                "board_ms_archived": archived_ms,
+            })
+    return results
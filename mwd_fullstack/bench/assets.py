@@ -0,0 +1,88 @@
+"""Bytes on the wire for a cold and a warm page load.
+
+Loads a page and the same-origin assets it uses (stylesheets, scripts,
+images, and the images those stylesheets point at) the way a browser does:
+cold with an empty cache, then warm, where a response marked immutable is
+reused without a request and anything else is revalidated with its ETag.
+Bytes are the raw response bodies, still compressed, so they are what a
+rig-site link actually carries. CDN assets are not counted.
+"""
+import gzip
+import re
+
+import httpx
+
+from lib import assets
+
+LINKED = re.compile(rb'<(?:link|script|img)\b[^>]*?\b(?:href|src)="(/[^"/][^"]*)"')
+CSS_URL = re.compile(rb"""url\(\s*['"]?(/[^'")]+)""")
+
+
+def _decode(body, encoding):
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        return assets.brotli.decompress(body)
+    return body
+
+
+async def _get(client, url, cache, accept_encoding):
+    """Fetches `url` through a browser-like cache. Returns (bytes received, requests made, body or None)."""
+    cached = cache.get(url)
+    headers = {"Accept-Encoding": accept_encoding}
+    if cached is not None:
+        if "immutable" in cached["cache-control"]:
+            return 0, 0, cached["body"]
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+    async with client.stream("GET", url, headers=headers) as response:
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    if response.status_code == 304:
+        return len(raw), 1, cached["body"]
+    body = _decode(raw, response.headers.get("content-encoding"))
+    cache[url] = {
+        "cache-control": response.headers.get("cache-control", ""),
+        "etag": response.headers.get("etag"),
+        "body": body,
+    }
+    return len(raw), 1, body
+
+
+async def _load(client, page, cache, accept_encoding):
+    received, requests, html = await _get(client, page, cache, accept_encoding)
+    pending = [url.decode() for url in LINKED.findall(html or b"")]
+    seen = set()
+    while pending:
+        url = pending.pop(0)
+        if url in seen:
+            continue
+        seen.add(url)
+        size, made, body = await _get(client, url, cache, accept_encoding)
+        received += size
+        requests += made
+        if url.split("?")[0].endswith(".css") and body:
+            pending.extend(ref.decode() for ref in CSS_URL.findall(body))
+    return {"requests": requests, "bytes": received, "assets": len(seen)}
+
+
+async def measure(app, pages=("/",)):
+    """{page: {accept-encoding: {"cold": {...}, "warm": {...}}}} for the ASGI `app`."""
+    encodings = ["identity", "gzip, br" if assets.brotli is not None else "gzip"]
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for page in pages:
+            results[page] = {}
+            for accept_encoding in encodings:
+                cache = {}
+                cold = await _load(client, page, cache, accept_encoding)
+                warm = await _load(client, page, cache, accept_encoding)
+                results[page][accept_encoding] = {"cold": cold, "warm": warm}
+    return results
+
+
+async def run(pages=("/",)):
+    from app import app
+
+    async with app.router.lifespan_context(app):
+        return await measure(app, pages)
@@ -0,0 +1,85 @@
+"""Bulk import against the per-row path it replaced.
+
+Before ``lib/importer.py`` a manifest was loaded one ``crud.create_tool`` /
+``crud.create_user`` call per row, each its own add, commit and refresh.
+Both paths load fresh rows of the same shape into the current database;
+the per-row path gets fewer rows (it is slow) and the two are compared in
+rows per second. Events each path queues are flushed inside its timing.
+"""
+import time
+
+from sqlalchemy import func, select
+
+from lib.db import SessionLocal
+from lib.models import Tool, ToolType, User
+from lib import crud, events, importer, seed, summary
+
+KINDS = ("tools", "users")
+
+
+def _rows(kind, tag, count, type_ids):
+    if kind == "tools":
+        return [
+            {"name": f"Import Tool {i}", "serial_number": f"IMP-{tag}-{i:07d}",
+             "type_id": type_ids[i % len(type_ids)], "location": f"Import Bay {i % 7}"}
+            for i in range(count)
+        ]
+    return [
+        {"username": f"imp_{tag}_{i}", "full_name": f"Import User {i}",
+         "email": f"imp_{tag}_{i}@example.com", "role": "technician"}
+        for i in range(count)
+    ]
+
+
+def per_row(db, kind, rows):
+    """What loading a manifest cost before the importer."""
+    for row in rows:
+        if kind == "tools":
+            crud.create_tool(db, row["name"], row["serial_number"], row["type_id"], row["location"])
+        else:
+            crud.create_user(db, row["username"], row["full_name"], row["email"], row["role"])
+
+
+def bulk(db, kind, rows):
+    report = importer.import_rows(db, kind, enumerate(rows, start=1))
+    inserted = sum(batch["inserted"] for batch in report)
+    if inserted != len(rows):
+        raise AssertionError(f"bulk import of {kind} inserted {inserted} of {len(rows)} rows")
+
+
+def _rate(fn, db, kind, rows):
+    start = time.perf_counter()
+    fn(db, kind, rows)
+    events.flush()
+    elapsed = time.perf_counter() - start
+    return len(rows) / elapsed
+
+
+def run(rows=20_000, per_row_rows=1_000):
+    """Returns {kind: rows/sec for both paths and the speedup}."""
+    seed.init_db()
+    tag = time.strftime("%H%M%S")
+    db = SessionLocal()
+    try:
+        type_ids = list(db.scalars(select(ToolType.id).order_by(ToolType.id)))
+        results = {}
+        for kind in KINDS:
+            model = Tool if kind == "tools" else User
+            before = db.scalar(select(func.count()).select_from(model))
+            slow = _rate(per_row, db, kind, _rows(kind, f"{tag}r", per_row_rows, type_ids))
+            fast = _rate(bulk, db, kind, _rows(kind, f"{tag}b", rows, type_ids))
+            if db.scalar(select(func.count()).select_from(model)) != before + rows + per_row_rows:
+                raise AssertionError(f"{kind} row count is off after the import")
+            results[kind] = {
+                "per_row_rows": per_row_rows,
+                "bulk_rows": rows,
+                "per_row_rows_per_sec": round(slow),
+                "bulk_rows_per_sec": round(fast),
+                "speedup": round(fast / slow, 1),
+            }
+        drift = summary.verify(db)
+        if drift:
+            raise AssertionError(f"fleet counters drifted: {drift}")
+        return results
+    finally:
+        db.close()
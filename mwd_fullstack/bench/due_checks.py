@@ -0,0 +1,97 @@
+"""Overdue/calibration scan cost as checkout history grows.
+
+Grows the returned checkout history in the hot ``checkouts`` table in steps
+(default 100k, 1M and 5M rows; the archive is left alone, so this is the
+worst case) while the open checkouts and the tools stay the same. At each
+step it times ``scheduler.run_due_checks`` twice: an idle pass, which is
+what the scheduler does most of the time, and a flagging pass after the
+flags have been cleared, so every overdue checkout and calibration-due
+tool is written again. Both scans are range probes on partial/ordered
+indexes, so their cost should follow the open checkouts and tools, not the
+history.
+"""
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from lib.db import engine
+from lib.models import Checkout, Tool, User
+from lib import scheduler, summary
+from bench.fleet import CONDITIONS, LOCATIONS, _insert_all
+
+DEFAULT_STEPS = (100_000, 1_000_000, 5_000_000)
+
+
+def _history_rows(conn):
+    return conn.scalar(select(func.count()).select_from(Checkout).where(Checkout.returned_at.isnot(None)))
+
+
+def grow_history(target, seed_value=3):
+    """Adds returned checkouts until the hot table holds `target` of them. Returns rows added."""
+    rng = random.Random(seed_value + target)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        missing = target - _history_rows(conn)
+        if missing <= 0:
+            return 0
+        first_tool, last_tool = conn.execute(select(func.min(Tool.id), func.max(Tool.id))).one()
+        first_user, last_user = conn.execute(select(func.min(User.id), func.max(User.id))).one()
+
+        def rows():
+            for _ in range(missing):
+                checked_out_at = now - timedelta(days=rng.uniform(60, 3 * 365))
+                length = timedelta(days=rng.randint(1, 30))
+                yield {
+                    "user_id": rng.randint(first_user, last_user), "tool_id": rng.randint(first_tool, last_tool),
+                    "project_location": rng.choice(LOCATIONS), "checked_out_at": checked_out_at,
+                    "due_date": checked_out_at + length, "returned_at": checked_out_at + length * rng.uniform(0.5, 1.3),
+                    "condition_on_return": rng.choice(CONDITIONS), "is_overdue": False,
+                }
+
+        added = _insert_all(conn, Checkout.__table__, rows())
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return added
+
+
+def _clear_flags():
+    with engine.begin() as conn:
+        conn.execute(update(Checkout).where(Checkout.is_overdue.is_(True)).values(is_overdue=False))
+        conn.execute(update(Tool).where(Tool.calibration_due.is_(True)).values(calibration_due=False))
+        summary.rebuild(conn)
+
+
+def _time_pass(repeat, clear):
+    samples, flagged = [], (0, 0)
+    for _ in range(repeat):
+        if clear:
+            _clear_flags()
+        start = time.perf_counter()
+        flagged = scheduler.run_due_checks()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3), flagged
+
+
+def run(steps=DEFAULT_STEPS, repeat=5):
+    """Returns one entry per step: history size, idle and flagging pass ms, rows flagged."""
+    results = []
+    for target in steps:
+        added = grow_history(target)
+        with engine.connect() as conn:
+            history = _history_rows(conn)
+            open_checkouts = conn.scalar(select(func.count()).select_from(Checkout).where(Checkout.returned_at.is_(None)))
+        idle_ms, _ = _time_pass(repeat, clear=False)
+        flagging_ms, (overdue, calibration) = _time_pass(repeat, clear=True)
+        results.append({
+            "history_rows": history,
+            "added": added,
+            "open_checkouts": open_checkouts,
+            "idle_pass_ms": idle_ms,
+            "flagging_pass_ms": flagging_ms,
+            "overdue_flagged": overdue,
+            "calibration_flagged": calibration,
+        })
+    return results
@@ -0,0 +1,136 @@
+"""Synthetic fleet generator.
+
+Writes users, tool types, tools and checkout history straight through Core
+``insert`` executemany in chunks, skipping the ORM, so a million tools and a
+few million checkouts load in minutes. The output is deterministic for a
+given seed. About ``checked_out_fraction`` of the tools end up with an open
+checkout, some of them overdue; every other checkout is returned history
+spread over the last ``history_days``.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from lib.db import engine
+from lib.models import Checkout, Tool, ToolType, User
+from lib import events, seed, summary
+
+CHUNK_SIZE = 10_000
+SERIAL_PREFIX = "BENCH-"
+
+LOCATIONS = [f"Rig {n}" for n in range(1, 41)] + ["Main Yard", "Calibration Lab", "Repair Shop", "Transit"]
+ROLES = ["technician", "mwd_technician", "drilling_engineer", "tool_push", "manager"]
+CONDITIONS = ["Good", "Good", "Good", "Worn", "Damaged"]
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert_all(conn, table, rows):
+    count = 0
+    for chunk in _chunks(rows):
+        conn.execute(insert(table), chunk)
+        count += len(chunk)
+    return count
+
+
+def _sync_sequences(conn, *tables):
+    # Rows above were inserted with explicit ids; move Postgres sequences past them.
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"
+        )
+
+
+def generate(users=500, tool_types=40, tools=10_000, checkouts=100_000,
+             checked_out_fraction=0.2, overdue_fraction=0.1, history_days=3 * 365, seed_value=42, bind=engine):
+    """Adds a synthetic fleet on top of the demo data. Returns {table: rows inserted, "seconds": elapsed}."""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+
+    seed.init_db(bind)
+    with bind.begin() as conn:
+        if conn.execute(select(Tool.id).where(Tool.serial_number.startswith(SERIAL_PREFIX)).limit(1)).first():
+            raise SystemExit("This database already has a benchmark fleet; generate into a fresh one.")
+
+        first_user = (conn.scalar(select(func.max(User.id))) or 0) + 1
+        n_users = _insert_all(conn, User.__table__, (
+            {"id": first_user + i, "username": f"bench_user_{i}", "full_name": f"Bench User {i}",
+             "email": f"bench_user_{i}@example.com", "role": rng.choice(ROLES)}
+            for i in range(users)
+        ))
+        user_ids = list(range(first_user, first_user + users))
+
+        first_type = (conn.scalar(select(func.max(ToolType.id))) or 0) + 1
+        n_types = _insert_all(conn, ToolType.__table__, (
+            {"id": first_type + i, "name": f"Bench Type {i}", "description": f"Synthetic tool category {i}"}
+            for i in range(tool_types)
+        ))
+        type_ids = list(range(first_type, first_type + tool_types))
+
+        first_tool = (conn.scalar(select(func.max(Tool.id))) or 0) + 1
+        checked_out = set(rng.sample(range(tools), int(tools * checked_out_fraction)))
+        n_tools = _insert_all(conn, Tool.__table__, (
+            {"id": first_tool + i, "name": f"Bench Tool {i}", "serial_number": f"{SERIAL_PREFIX}{i:07d}",
+             "type_id": rng.choice(type_ids), "location": rng.choice(LOCATIONS),
+             "status": "checked_out" if i in checked_out else "available",
+             "last_calibrated": now - timedelta(days=rng.randint(0, 400)), "calibration_due": False}
+            for i in range(tools)
+        ))
+
+        history_seconds = history_days * 86400
+
+        def history():
+            # Returned checkouts, evenly spread and oldest first so ids follow
+            # checked_out_at, as they would in production.
+            returned = max(checkouts - len(checked_out), 0)
+            step = history_seconds / max(returned, 1)
+            for i in range(returned):
+                checked_out_at = now - timedelta(seconds=history_seconds - (i + rng.random()) * step)
+                length = timedelta(days=rng.randint(1, 30))
+                yield {
+                    "user_id": rng.choice(user_ids), "tool_id": first_tool + rng.randrange(tools),
+                    "project_location": rng.choice(LOCATIONS), "checked_out_at": checked_out_at,
+                    "due_date": checked_out_at + length,
+                    "returned_at": min(checked_out_at + length * rng.uniform(0.5, 1.3), now),
+                    "condition_on_return": rng.choice(CONDITIONS), "is_overdue": False,
+                }
+            for i in sorted(checked_out):
+                checked_out_at = now - timedelta(days=rng.randint(0, 45))
+                overdue = rng.random() < overdue_fraction
+                yield {
+                    "user_id": rng.choice(user_ids), "tool_id": first_tool + i,
+                    "project_location": rng.choice(LOCATIONS), "checked_out_at": checked_out_at,
+                    "due_date": now - timedelta(days=rng.randint(1, 10)) if overdue else now + timedelta(days=rng.randint(1, 30)),
+                    "returned_at": None, "condition_on_return": None, "is_overdue": overdue,
+                }
+
+        n_checkouts = _insert_all(conn, Checkout.__table__, history())
+        n_events = events.backfill(conn)
+        _sync_sequences(conn, User.__table__, ToolType.__table__, Tool.__table__)
+        summary.rebuild(conn)
+
+    with bind.begin() as conn:
+        # Fresh planner statistics, as a long-lived database would have.
+        conn.exec_driver_sql("ANALYZE")
+    return {
+        "users": n_users,
+        "tool_types": n_types,
+        "tools": n_tools,
+        "checkouts": n_checkouts,
+        "tool_events": n_events,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
@@ -0,0 +1,105 @@
+"""Availability query against a naive scan.
+
+Books ``count`` reservations across the fleet, spread over past history as
+well as the coming horizon, then answers "which tools of type X are free
+between A and B" (always a future window) two ways:
+``crud.get_free_tool_rows`` (index probes per tool) and a naive pass that
+loads every reservation and checks each one in Python, which is what the
+query would cost without ``ix_reservations_tool_ends_at``. Past bookings
+should not slow the probes down, since they end before any window starts.
+"""
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from lib.db import SessionLocal, engine
+from lib.models import Checkout, Reservation, Tool
+from lib import crud
+
+CHUNK_SIZE = 10_000
+
+
+def generate(count=100_000, horizon_days=730, history_days=730, seed_value=7):
+    """Inserts up to `count` non-overlapping reservations from `history_days` ago to `horizon_days` ahead."""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow().replace(microsecond=0)
+    with engine.begin() as conn:
+        tool_ids = list(conn.scalars(select(Tool.id)))
+        user_id = conn.scalar(select(func.min(Checkout.user_id))) or 1
+        per_tool = max(count // len(tool_ids), 1)
+        first = now - timedelta(days=history_days)
+        slot = timedelta(days=history_days + horizon_days) / per_tool
+        rows, inserted = [], 0
+        for tool_id in tool_ids:
+            for n in range(per_tool):
+                if inserted + len(rows) >= count:
+                    break
+                # Each booking sits inside its own slot, so none overlap.
+                start = first + slot * n + slot * rng.uniform(0, 0.5)
+                rows.append({
+                    "tool_id": tool_id, "user_id": user_id, "starts_at": start,
+                    "ends_at": start + slot * rng.uniform(0.1, 0.5), "project_location": "Bench Well",
+                })
+                if len(rows) >= CHUNK_SIZE:
+                    conn.execute(insert(Reservation), rows)
+                    inserted += len(rows)
+                    rows = []
+        if rows:
+            conn.execute(insert(Reservation), rows)
+            inserted += len(rows)
+        conn.exec_driver_sql("ANALYZE")
+    return inserted
+
+
+def naive_free_tools(db, type_id, starts_at, ends_at):
+    tools = db.execute(select(Tool.id).where(Tool.type_id == type_id).order_by(Tool.id)).scalars().all()
+    busy = {
+        tool_id
+        for tool_id, start, end in db.execute(select(Reservation.tool_id, Reservation.starts_at, Reservation.ends_at))
+        if start < ends_at and end > starts_at
+    }
+    busy.update(db.scalars(select(Checkout.tool_id).where(Checkout.returned_at.is_(None), Checkout.due_date > starts_at)))
+    return [tool_id for tool_id in tools if tool_id not in busy]
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def run(windows=20, repeat=5, seed_value=11):
+    """Returns median ms per query for both approaches over random windows and types."""
+    rng = random.Random(seed_value)
+    db = SessionLocal()
+    try:
+        type_ids = list(db.scalars(select(Tool.type_id).distinct()))
+        total = db.scalar(select(func.count()).select_from(Reservation))
+        indexed, naive = [], []
+        for _ in range(windows):
+            type_id = rng.choice(type_ids)
+            starts_at = datetime.utcnow() + timedelta(days=rng.randint(0, 700))
+            ends_at = starts_at + timedelta(days=rng.randint(1, 30))
+            ms_indexed, rows = _time(
+                lambda: crud.get_free_tool_rows(db, type_id, starts_at, ends_at, limit=None), repeat,
+            )
+            ms_naive, expected = _time(lambda: naive_free_tools(db, type_id, starts_at, ends_at), repeat)
+            if [row.id for row in rows] != expected:
+                raise AssertionError(f"availability mismatch for type {type_id} {starts_at}..{ends_at}")
+            indexed.append(ms_indexed)
+            naive.append(ms_naive)
+        return {
+            "reservations": total,
+            "windows": windows,
+            "indexed_ms_median": round(statistics.median(indexed), 3),
+            "naive_ms_median": round(statistics.median(naive), 3),
+            "speedup": round(statistics.median(naive) / statistics.median(indexed), 1),
+        }
+    finally:
+        db.close()
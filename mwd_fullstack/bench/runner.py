@@ -0,0 +1,280 @@
+"""Drives every route of the app in-process and records latency, throughput and memory.
+
+Requests go through ``httpx.ASGITransport`` straight into the ASGI app, so
+the numbers cover routing, the database and rendering but no sockets. Each
+route gets a warm-up, then ``requests`` timed requests at ``concurrency``,
+then a short separate pass under ``tracemalloc`` for peak memory (tracing
+slows everything down, so it is kept out of the timed pass). The peak
+includes the response body, which ``ASGITransport`` buffers in full.
+"""
+import asyncio
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import httpx
+from sqlalchemy import func, select
+
+from lib.db import SessionLocal, engine
+from lib.models import Checkout, Tool, ToolType, User
+from lib import crud
+
+WARMUP = 3
+MEMORY_SAMPLES = 3
+# Routes that stream whole tables get this share of the request count.
+EXPORT_SHARE = 0.05
+# `run --preset`: a quick pass, and enough clients to contend for the pool,
+# the threadpool and SQLite's write lock the way a busy rig-site shift does.
+PRESETS = {
+    "quick": {"requests": 200, "concurrency": 8},
+    "contention": {"requests": 2000, "concurrency": 200},
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _fixtures():
+    """Ids, serials and cursors that make the parameterised routes do real work."""
+    db = SessionLocal()
+    try:
+        mid_user = db.scalar(select(func.max(User.id))) // 2
+        mid_tool = db.scalar(select(func.max(Tool.id))) // 2
+        busy_tool = db.scalar(
+            select(Checkout.tool_id).group_by(Checkout.tool_id).order_by(func.count().desc()).limit(1)
+        )
+        first_page = crud.get_active_checkout_rows(db, limit=crud.PAGE_SIZE)
+        available = list(db.scalars(
+            select(Tool.serial_number).where(Tool.status == "available").order_by(Tool.id.desc()).limit(2000)
+        ))
+        serial_ids = dict(db.execute(select(Tool.serial_number, Tool.id).where(Tool.serial_number.in_(available))).all())
+        return {
+            "mid_user": mid_user,
+            "mid_tool": mid_tool,
+            "busy_tool": busy_tool or 1,
+            "user_id": db.scalar(select(func.min(User.id))),
+            "tool_type_id": db.scalar(select(func.min(ToolType.id))),
+            "search": available[0][:9] if available else "MWD",
+            "board_cursor": crud.checkout_cursor(first_page[-1]) if first_page else "",
+            "available": [(serial, serial_ids[serial]) for serial in available],
+        }
+    finally:
+        db.close()
+
+
+def read_routes(fx):
+    """(name, method, url) for every GET route, with realistic parameters."""
+    return [
+        ("home", "GET", "/"),
+        ("users", "GET", "/users"),
+        ("users page", "GET", f"/users?after={fx['mid_user']}"),
+        ("tool types", "GET", "/tool-types"),
+        ("edit tool type", "GET", f"/tool-types/edit/{fx['tool_type_id']}"),
+        ("tools", "GET", "/tools"),
+        ("tools page", "GET", f"/tools?after={fx['mid_tool']}"),
+        ("tools search", "GET", f"/tools?search={fx['search']}"),
+        ("checkouts", "GET", "/checkouts"),
+        ("checkouts page 2", "GET", f"/checkouts?cursor={fx['board_cursor']}"),
+        ("new checkout form", "GET", "/checkouts/new"),
+        ("users export", "GET", "/users/export"),
+        ("tools export", "GET", "/tools/export"),
+        ("checkouts export", "GET", "/checkouts/export?format=jsonl"),
+        ("api tool types", "GET", "/api/v1/tool-types"),
+        ("api users", "GET", "/api/v1/users"),
+        ("api tools", "GET", "/api/v1/tools"),
+        ("api tools page", "GET", f"/api/v1/tools?after={fx['mid_tool']}"),
+        ("api checkouts", "GET", "/api/v1/checkouts"),
+        ("api history for tool", "GET", f"/api/v1/checkouts/history?tool_id={fx['busy_tool']}"),
+        ("api history", "GET", "/api/v1/checkouts/history"),
+        ("api availability", "GET",
+         f"/api/v1/availability?type_id={fx['tool_type_id']}&starts_at=2030-01-01T00:00:00&ends_at=2030-01-08T00:00:00"),
+        ("api utilisation by type", "GET", "/api/v1/reports/utilisation?group=type&starts_at=2024-01-01T00:00:00"),
+        ("metrics", "GET", "/metrics"),
+        ("debug pool", "GET", "/debug/pool"),
+    ]
+
+
+def _checkout_form(fx, tool_id):
+    return {"user_id": fx["user_id"], "tool_id": tool_id, "project_location": "Bench Rig", "due_date": "2099-01-01"}
+
+
+def write_routes(fx, batch_size=50):
+    """(name, request factory) pairs. Each factory takes a tool from `fx["available"]`
+    and returns the requests that check it out and back in again, so the fleet
+    ends where it started."""
+    return [
+        ("checkout + return", lambda serial, tool_id: [
+            ("POST", "/checkouts/checkout", {"data": _checkout_form(fx, tool_id)}),
+            ("POST", "/checkouts/return", {"data": {"tool_id": tool_id}}),
+        ], 1),
+        (f"api batch checkout + return x{batch_size}", lambda serials, _: [
+            ("POST", "/api/v1/checkouts/batch", {"json": {
+                "user_id": fx["user_id"], "project_location": "Bench Rig", "due_date": "2099-01-01",
+                "serial_numbers": serials,
+            }}),
+            ("POST", "/api/v1/returns/batch", {"json": {"serial_numbers": serials}}),
+        ], batch_size),
+    ]
+
+
+def _summarise(latencies, wall, errors, peak_bytes):
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "peak_memory_kb": round(peak_bytes / 1024, 1) if peak_bytes is not None else None,
+    }
+
+
+async def _timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    await response.aread()
+    return time.perf_counter() - start, response.status_code < 400
+
+
+async def _run_read(client, method, url, requests, concurrency):
+    for _ in range(WARMUP):
+        await _timed(client, method, url)
+    latencies, errors = [], 0
+    queue = iter(range(requests))
+    started = time.perf_counter()
+
+    async def worker():
+        nonlocal errors
+        for _ in queue:
+            elapsed, ok = await _timed(client, method, url)
+            latencies.append(elapsed)
+            errors += not ok
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    tracemalloc.start()
+    for _ in range(MEMORY_SAMPLES):
+        tracemalloc.reset_peak()
+        await _timed(client, method, url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return _summarise(latencies, wall, errors, peak)
+
+
+async def _run_write(client, factory, per_cycle, tools, cycles, concurrency):
+    groups = [tools[i:i + per_cycle] for i in range(0, len(tools) - per_cycle + 1, per_cycle)][:cycles]
+    queue = iter(groups)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+
+    async def worker():
+        nonlocal errors
+        for group in queue:
+            serials = [serial for serial, _ in group]
+            for method, url, kwargs in factory(serials if per_cycle > 1 else serials[0], group[0][1]):
+                elapsed, ok = await _timed(client, method, url, follow_redirects=False, **kwargs)
+                latencies.append(elapsed)
+                errors += not ok
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _summarise(latencies, time.perf_counter() - started, errors, None)
+
+
+def measure_startup(cwd=None):
+    """Seconds to import the app in a fresh interpreter (no database work happens on import)."""
+    out = subprocess.run(
+        [sys.executable, "-c", "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"],
+        cwd=cwd or os.getcwd(), capture_output=True, text=True, check=True,
+    )
+    return round(float(out.stdout.strip().splitlines()[-1]), 3)
+
+
+async def run(requests=200, concurrency=8, only=None, writes=True, log=print):
+    """Benchmarks every route. Returns the results document (see ``compare``)."""
+    from app import app
+
+    results = {}
+    lifespan_start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        lifespan_seconds = time.perf_counter() - lifespan_start
+        fx = await asyncio.to_thread(_fixtures)
+        # Server errors come back as 500s and count in the route's errors
+        # instead of aborting the run.
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, method, url in read_routes(fx):
+                if only and only not in name:
+                    continue
+                n = max(int(requests * EXPORT_SHARE), 3) if "export" in url else requests
+                results[name] = await _run_read(client, method, url, n, concurrency)
+                log(f"{name:32} {results[name]['throughput_rps']:>9} req/s  p95 {results[name]['p95_ms']:>9} ms")
+            if writes:
+                for name, factory, per_cycle in write_routes(fx):
+                    if only and only not in name:
+                        continue
+                    results[name] = await _run_write(client, factory, per_cycle, fx["available"], requests, concurrency)
+                    log(f"{name:32} {results[name]['throughput_rps']:>9} req/s  p95 {results[name]['p95_ms']:>9} ms")
+
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "database_url": engine.url.render_as_string(hide_password=True),
+            "db_async": os.environ.get("DB_ASYNC", ""),
+            "python": platform.python_version(),
+            "git_commit": _git_commit(),
+            "fleet": _fleet_size(),
+            "requests": requests,
+            "concurrency": concurrency,
+            "import_seconds": measure_startup(),
+            "lifespan_startup_seconds": round(lifespan_seconds, 3),
+        },
+        "routes": results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _fleet_size():
+    db = SessionLocal()
+    try:
+        return {
+            model.__tablename__: db.scalar(select(func.count()).select_from(model))
+            for model in (User, ToolType, Tool, Checkout)
+        }
+    finally:
+        db.close()
+
+
+def compare(current, baseline, tolerance=0.10):
+    """Returns [(route, metric, baseline value, current value)] for every regression beyond `tolerance`."""
+    regressions = []
+    for route, now in current["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if before.get(metric) and now.get(metric) and now[metric] > before[metric] * (1 + tolerance):
+                regressions.append((route, metric, before[metric], now[metric]))
+        if before.get("throughput_rps") and now.get("throughput_rps") \
+                and now["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append((route, "throughput_rps", before["throughput_rps"], now["throughput_rps"]))
+    return regressions
@@ -0,0 +1,76 @@
+"""Tool search in the database against the old in-Python filter.
+
+The old ``/tools?search=`` loaded every tool (and every tool type) and
+substring-matched name and serial number in a list comprehension.
+``crud.search_tools`` does the match in SQL, ranked and bounded. Both are
+run over the same terms against an existing fleet (``python -m bench
+generate --tools 100000``); the bounded results must all appear in the old
+path's matches.
+"""
+import statistics
+import time
+
+from sqlalchemy import func, select
+
+from lib.db import SessionLocal
+from lib.models import Tool
+from lib import crud
+from bench.fleet import SERIAL_PREFIX
+
+
+def naive_search(db, term):
+    """What the /tools route did before search moved into the database."""
+    all_tools = crud.get_tools(db)
+    crud.get_tool_types(db)
+    needle = term.lower()
+    return [tool for tool in all_tools if needle in tool.name.lower() or needle in tool.serial_number.lower()]
+
+
+def _terms(db):
+    total = db.scalar(select(func.count()).select_from(Tool))
+    middle = f"{SERIAL_PREFIX}{total // 2:07d}"
+    return {
+        "exact serial": middle,
+        "serial prefix": middle[:-2],
+        "name substring": "Tool 4242",
+        "no match": "zz-no-such-part",
+    }
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            result = fn(db)
+            samples.append(time.perf_counter() - start)
+        finally:
+            db.close()
+    return statistics.median(samples) * 1000, result
+
+
+def run(repeat=5):
+    """Returns {term kind: median ms for both paths and match counts}."""
+    db = SessionLocal()
+    try:
+        tools = db.scalar(select(func.count()).select_from(Tool))
+        terms = _terms(db)
+    finally:
+        db.close()
+
+    results = {"tools": tools}
+    for kind, term in terms.items():
+        ms_db, found = _time(lambda db: [tool.id for tool in crud.search_tools(db, term)], repeat)
+        ms_naive, expected = _time(lambda db: [tool.id for tool in naive_search(db, term)], repeat)
+        if not set(found) <= set(expected) or len(found) != min(len(expected), crud.SEARCH_LIMIT):
+            raise AssertionError(f"search mismatch for {term!r}")
+        results[kind] = {
+            "term": term,
+            "matches": len(expected),
+            "returned": len(found),
+            "database_ms_median": round(ms_db, 3),
+            "in_python_ms_median": round(ms_naive, 3),
+            "speedup": round(ms_naive / ms_db, 1) if ms_db else None,
+        }
+    return results
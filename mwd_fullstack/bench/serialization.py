@@ -0,0 +1,71 @@
+"""Serialization cost of the JSON API against the HTML pages for the same rows.
+
+For each page it fetches the rows once, then times only the step that turns
+them into a response body: the Jinja template for the HTML route, and
+response-model validation plus ``json.dumps`` or ``orjson.dumps`` for the API
+(``ORJSONResponse`` is what the API sends). End-to-end req/s for the same
+routes comes from ``python -m bench run``; this isolates the part the API
+change was about.
+"""
+import json
+import statistics
+import time
+
+import orjson
+from pydantic import TypeAdapter
+
+from lib import crud, refdata, summary
+from lib.db import SessionLocal
+from lib.schemas import CheckoutOut, Page, ToolOut
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def _pages(db):
+    """(name, template, template context, response model, API page) for each compared page."""
+    checkouts = crud.get_active_checkout_rows(db, limit=crud.PAGE_SIZE)
+    tools = crud.get_tools(db, limit=crud.PAGE_SIZE)
+    tool_rows = crud.get_tool_rows(db, limit=crud.PAGE_SIZE)
+    return [
+        ("checkouts", "checkouts.html", {
+            "checkouts": checkouts, "fleet": summary.fleet_summary(db), "first_page": True, "next_url": None,
+        }, Page[CheckoutOut], {"items": checkouts, "next": None}),
+        ("tools", "tools.html", {
+            "tools": tools, "types": refdata.tool_types(db).value, "search_query": "", "first_page": True, "next_url": None,
+        }, Page[ToolOut], {"items": tool_rows, "next": None}),
+    ]
+
+
+def run(repeat=200):
+    """Returns {page: {rows, html/json/orjson ms per response and bytes}}."""
+    from app import templates
+
+    db = SessionLocal()
+    try:
+        pages = _pages(db)
+    finally:
+        db.close()
+
+    results = {}
+    for name, template, context, model, page in pages:
+        template = templates.get_template(template)
+        adapter = TypeAdapter(model)
+        html = lambda: template.render(context)
+        as_json = lambda: json.dumps(adapter.dump_python(adapter.validate_python(page), mode="json")).encode()
+        as_orjson = lambda: orjson.dumps(adapter.dump_python(adapter.validate_python(page)))
+        results[name] = {
+            "rows": len(page["items"]),
+            "html_ms": _median_ms(html, repeat),
+            "json_ms": _median_ms(as_json, repeat),
+            "orjson_ms": _median_ms(as_orjson, repeat),
+            "html_bytes": len(html().encode()),
+            "json_bytes": len(as_orjson()),
+        }
+    return results
@@ -0,0 +1,166 @@
+"""Versioned JSON API for rig-site integrations.
+
+Handlers read column rows (never ORM instances) through the same crud and
+refdata functions as the HTML routes, page with keyset cursors and serialize
+with orjson. Batch endpoints check out or return many serials in one
+transaction: either every serial succeeds or nothing is written.
+"""
+from datetime import datetime, time
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+
+from lib.db import get_session, run_db
+from lib import crud, refdata, reports
+from lib.schemas import (
+    BATCH_LIMIT, BatchCheckoutIn, BatchResult, BatchReturnIn,
+    CheckoutHistoryOut, CheckoutOut, Page, ReservationIn, ReservationOut,
+    ToolOut, ToolTypeOut, UserOut, UtcDateTime, UtilisationOut,
+)
+
+DEFAULT_LIMIT = 100
+
+router = APIRouter(prefix="/api/v1", tags=["api"], default_response_class=ORJSONResponse)
+
+Limit = Query(DEFAULT_LIMIT, ge=1, le=BATCH_LIMIT)
+
+
+def _page(rows, limit, next_cursor):
+    """Builds a Page from a limit + 1 fetch; `next_cursor(last_row)` names the next page."""
+    items = rows[:limit]
+    return {"items": items, "next": next_cursor(items[-1]) if len(rows) > limit else None}
+
+
+@router.get("/tool-types", response_model=Page[ToolTypeOut])
+async def list_tool_types(after: int = None, limit: int = Limit, db=Depends(get_session)):
+    rows = refdata.page_after((await run_db(db, refdata.tool_types)).value, after, limit + 1)
+    return _page(rows, limit, lambda row: str(row.id))
+
+
+@router.get("/users", response_model=Page[UserOut])
+async def list_users(after: int = None, limit: int = Limit, db=Depends(get_session)):
+    rows = refdata.page_after((await run_db(db, refdata.users)).value, after, limit + 1)
+    return _page(rows, limit, lambda row: str(row.id))
+
+
+@router.get("/tools", response_model=Page[ToolOut])
+async def list_tools(
+    after: int = None,
+    limit: int = Limit,
+    status: str = None,
+    type_id: int = None,
+    db=Depends(get_session),
+):
+    rows = await run_db(db, crud.get_tool_rows, after_id=after, limit=limit + 1, status=status, type_id=type_id)
+    return _page(rows, limit, lambda row: str(row.id))
+
+
+@router.get("/checkouts", response_model=Page[CheckoutOut])
+async def list_active_checkouts(cursor: str = None, limit: int = Limit, db=Depends(get_session)):
+    rows = await run_db(db, crud.get_active_checkout_rows, cursor=cursor, limit=limit + 1)
+    return _page(rows, limit, crud.checkout_cursor)
+
+
+@router.get("/checkouts/history", response_model=Page[CheckoutHistoryOut])
+async def checkout_history(
+    tool_id: int = None,
+    user_id: int = None,
+    cursor: str = None,
+    limit: int = Limit,
+    db=Depends(get_session),
+):
+    """Open, returned and archived checkouts, newest first."""
+    rows = await run_db(db, crud.get_checkout_history, tool_id=tool_id, user_id=user_id, cursor=cursor, limit=limit + 1)
+    return _page(rows, limit, crud.checkout_cursor)
+
+
+@router.post("/checkouts/batch", response_model=BatchResult, status_code=201)
+async def batch_checkout(body: BatchCheckoutIn, db=Depends(get_session)):
+    rows, errors = await run_db(
+        db, crud.checkout_tools, body.user_id, body.serial_numbers,
+        body.project_location, datetime.combine(body.due_date, time()),
+    )
+    if errors == crud.USER_NOT_FOUND:
+        raise HTTPException(status_code=404, detail=errors)
+    if errors:
+        raise HTTPException(status_code=409, detail=errors)
+    return {"checkouts": rows, "count": len(rows)}
+
+
+@router.post("/returns/batch", response_model=BatchResult)
+async def batch_return(body: BatchReturnIn, db=Depends(get_session)):
+    rows, errors = await run_db(db, crud.return_tools, body.serial_numbers, body.condition)
+    if errors:
+        raise HTTPException(status_code=409, detail=errors)
+    return {"checkouts": rows, "count": len(rows)}
+
+
+@router.get("/reservations", response_model=Page[ReservationOut])
+async def list_reservations(
+    tool_id: int = None,
+    starts_at: UtcDateTime = None,
+    ends_at: UtcDateTime = None,
+    after: int = None,
+    limit: int = Limit,
+    db=Depends(get_session),
+):
+    """Reservations, optionally only those for one tool and/or meeting [starts_at, ends_at)."""
+    rows = await run_db(
+        db, crud.get_reservations, tool_id=tool_id, starts_at=starts_at, ends_at=ends_at,
+        after_id=after, limit=limit + 1,
+    )
+    return _page(rows, limit, lambda row: str(row.id))
+
+
+@router.post("/reservations", response_model=ReservationOut, status_code=201)
+async def create_reservation(body: ReservationIn, db=Depends(get_session)):
+    row, err = await run_db(
+        db, crud.create_reservation, body.tool_id, body.user_id, body.starts_at, body.ends_at, body.project_location,
+    )
+    if err in (crud.TOOL_NOT_FOUND, crud.USER_NOT_FOUND):
+        raise HTTPException(status_code=404, detail=err)
+    if err:
+        raise HTTPException(status_code=409 if err.startswith(crud.ALREADY_RESERVED) else 422, detail=err)
+    return row
+
+
+@router.delete("/reservations/{reservation_id}", status_code=204)
+async def cancel_reservation(reservation_id: int, db=Depends(get_session)):
+    if not await run_db(db, crud.cancel_reservation, reservation_id):
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+
+@router.get("/availability", response_model=Page[ToolOut])
+async def free_tools(
+    type_id: int,
+    starts_at: UtcDateTime,
+    ends_at: UtcDateTime,
+    after: int = None,
+    limit: int = Limit,
+    db=Depends(get_session),
+):
+    """Tools of one type that are neither reserved nor due back during [starts_at, ends_at)."""
+    if ends_at <= starts_at:
+        raise HTTPException(status_code=400, detail="ends_at must be after starts_at")
+    rows = await run_db(db, crud.get_free_tool_rows, type_id, starts_at, ends_at, after_id=after, limit=limit + 1)
+    return _page(rows, limit, lambda row: str(row.id))
+
+
+@router.get("/reports/utilisation", response_model=List[UtilisationOut])
+async def utilisation_report(
+    group: str = "tool",
+    starts_at: UtcDateTime = None,
+    ends_at: UtcDateTime = None,
+    tool_id: int = None,
+    db=Depends(get_session),
+):
+    """Hours checked out per tool or tool type per month, from the tool event log."""
+    if group not in reports.GROUPS:
+        raise HTTPException(status_code=400, detail=f"group must be one of {', '.join(reports.GROUPS)}")
+    if starts_at and ends_at and ends_at <= starts_at:
+        raise HTTPException(status_code=400, detail="ends_at must be after starts_at")
+    return await run_db(
+        db, reports.utilisation, group=group, starts_at=starts_at, ends_at=ends_at, tool_id=tool_id,
+    )
@@ -0,0 +1,66 @@
+"""Moves old returned checkouts out of the hot ``checkouts`` table.
+
+The active board, overdue scan and per-tool lookups only ever read open or
+recently returned checkouts, so years of history in the same table just make
+every page and index bigger. Returned checkouts older than
+``ARCHIVE_AFTER_DAYS`` are copied into ``checkout_archive`` and deleted from
+``checkouts`` in batches, one transaction per batch, so a long backlog never
+holds a lock for long. History reads union both tables (see
+``crud.get_checkout_history``).
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select
+
+from lib.db import SessionLocal
+from lib.models.checkout import Checkout
+from lib.models.checkout_archive import CheckoutArchive
+
+ARCHIVE_AFTER = timedelta(days=int(os.environ.get("ARCHIVE_AFTER_DAYS", 365)))
+BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 5000))
+INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", 3600))
+
+ARCHIVED_COLUMNS = (
+    "id", "user_id", "tool_id", "due_date", "project_location",
+    "checked_out_at", "returned_at", "condition_on_return",
+)
+
+
+def archive_batch(db, cutoff: datetime, batch_size: int = BATCH_SIZE, now: datetime = None):
+    """Moves up to `batch_size` checkouts returned before `cutoff`. Returns the number moved.
+
+    The newest checkout is never archived: SQLite hands out max(id) + 1 for
+    new rows, so deleting it would let a fresh checkout reuse an archived id.
+    """
+    ids = select(Checkout.id).where(
+        Checkout.returned_at < cutoff,
+        Checkout.id < select(func.max(Checkout.id)).scalar_subquery(),
+    ).limit(batch_size)
+    ids = list(db.scalars(ids))
+    if not ids:
+        return 0
+    db.execute(insert(CheckoutArchive).from_select(
+        ARCHIVED_COLUMNS + ("archived_at",),
+        select(*(Checkout.__table__.c[name] for name in ARCHIVED_COLUMNS), literal(now or datetime.utcnow()))
+        .where(Checkout.id.in_(ids)),
+    ))
+    db.execute(delete(Checkout).where(Checkout.id.in_(ids)).execution_options(synchronize_session=False))
+    db.commit()
+    return len(ids)
+
+
+def archive_returned(now: datetime = None, older_than: timedelta = ARCHIVE_AFTER, batch_size: int = BATCH_SIZE):
+    """Archives every checkout returned more than `older_than` ago. Returns the number moved."""
+    now = now or datetime.utcnow()
+    cutoff = now - older_than
+    moved = 0
+    db = SessionLocal()
+    try:
+        while True:
+            n = archive_batch(db, cutoff, batch_size, now)
+            moved += n
+            if n < batch_size:
+                return moved
+    finally:
+        db.close()
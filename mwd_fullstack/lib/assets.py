@@ -0,0 +1,216 @@
+"""Precompressed, fingerprinted static assets.
+
+``python manage.py build-assets`` copies every file under ``ROOTS`` into
+``BUILD_DIR``, adds a content-hashed copy of each (files whose names already
+carry a hash, like the frontend bundle, keep theirs), writes ``.gz`` (and,
+with the ``brotli`` package, ``.br``) siblings for text files and records
+logical name -> hashed name in ``manifest.json``.
+
+``PrecompressedStaticFiles`` serves the smallest sibling the client accepts,
+so nothing is compressed per request, and marks hashed files immutable.
+Templates link through ``asset_url``, so a changed file gets a new URL
+instead of needing to be revalidated. Without a build the app serves the
+source directories as before.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from mimetypes import guess_type
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+BUILD_DIR = os.environ.get("ASSETS_BUILD_DIR", os.path.join("build", "assets"))
+MANIFEST_NAME = "manifest.json"
+# URL prefix -> source directory.
+ROOTS = {"static": "static", "frontend": os.path.join("frontend", "dist")}
+COMPRESSIBLE = {".css", ".js", ".mjs", ".html", ".map", ".svg", ".json", ".txt", ".xml"}
+# Below this the gzip header outweighs the savings.
+MIN_COMPRESS_BYTES = 256
+# Best first; the suffix is appended to the file name.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+HASHED = re.compile(r"\.[0-9a-f]{8,}(\.[A-Za-z0-9]+)+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def content_hash(data: bytes):
+    return hashlib.blake2b(data, digest_size=4).hexdigest()
+
+
+def hashed_name(name: str, data: bytes):
+    """`css/style.css` -> `css/style.1a2b3c4d.css`; names that already carry a hash are kept."""
+    if HASHED.search(name) or name.endswith(".html"):
+        return name
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{content_hash(data)}{ext}"
+
+
+def _compressors():
+    compressors = [("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.insert(0, ("br", ".br", lambda data: brotli.compress(data, quality=11)))
+    return compressors
+
+
+def _write(path: str, data: bytes):
+    """Writes `path` plus any compressed siblings that come out smaller. Returns {encoding: bytes}."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    sizes = {"identity": len(data)}
+    if os.path.splitext(path)[1] not in COMPRESSIBLE or len(data) < MIN_COMPRESS_BYTES:
+        return sizes
+    for encoding, suffix, compress in _compressors():
+        packed = compress(data)
+        if len(packed) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(packed)
+            sizes[encoding] = len(packed)
+    return sizes
+
+
+def _rewrite(data: bytes, urls):
+    # Longest first, so /a/b.css.map is not rewritten as /a/b.css plus ".map".
+    for old in sorted(urls, key=len, reverse=True):
+        data = data.replace(old.encode(), urls[old].encode())
+    return data
+
+
+def build(roots=ROOTS, out_dir=BUILD_DIR):
+    """Rebuilds `out_dir` from `roots`. Returns {logical name: {"path": hashed name, encoding: bytes}}."""
+    shutil.rmtree(out_dir, ignore_errors=True)
+    manifest, report = {}, {}
+    for prefix, source in roots.items():
+        if not os.path.isdir(source):
+            continue
+        files = {}
+        for dirpath, _, filenames in os.walk(source):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                with open(full_path, "rb") as f:
+                    files[os.path.relpath(full_path, source).replace(os.sep, "/")] = f.read()
+        # Images before the stylesheets that use them, stylesheets before the
+        # pages that link them, so each reference can be rewritten to the
+        # hashed URL of a file that is already final.
+        order = lambda name: (name.endswith(".css") + 2 * name.endswith(".html"), name)
+        urls = {}
+        for name in sorted(files, key=order):
+            data = files[name]
+            if name.endswith(".css"):
+                data = _rewrite(data, urls)
+            elif name.endswith(".html"):
+                # The frontend build links its files from the site root.
+                data = _rewrite(data, {f'"/{old[len(prefix) + 2:]}"': f'"{new}"' for old, new in urls.items()})
+            hashed = hashed_name(name, data)
+            sizes = _write(os.path.join(out_dir, prefix, name), data)
+            if hashed != name:
+                _write(os.path.join(out_dir, prefix, hashed), data)
+            urls[f"/{prefix}/{name}"] = f"/{prefix}/{hashed}"
+            manifest[f"{prefix}/{name}"] = f"{prefix}/{hashed}"
+            report[f"{prefix}/{name}"] = {"path": f"{prefix}/{hashed}", **sizes}
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return report
+
+
+def load_manifest(out_dir=BUILD_DIR):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+manifest = load_manifest()
+
+
+def asset_url(name: str):
+    """URL for `name` (e.g. ``static/css/style.css``): the hashed copy once assets are built."""
+    return "/" + manifest.get(name, name)
+
+
+def accepted_encodings(header: str):
+    """Codings an Accept-Encoding header allows; ``*`` stands for any not refused with q=0."""
+    accepted, refused = set(), set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    refused.add(coding)
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    if "*" in accepted:
+        accepted.update(encoding for encoding, _ in ENCODINGS if encoding not in refused)
+    return accepted - refused
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that sends a prebuilt ``.br``/``.gz`` sibling when the client accepts it.
+
+    Files listed in `immutable` (paths relative to the directory) are cached
+    for a year; everything else is revalidated with its ETag on every use.
+    """
+
+    def __init__(self, *, directory: str, immutable=(), **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.root = os.path.realpath(directory)
+        self.immutable = frozenset(immutable)
+        # Siblings are only written at build time, so look them up once.
+        self.variants = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                    full_path = os.path.join(dirpath, filename)
+                    self.variants[full_path] = os.stat(full_path)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        relative = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+        headers = {"Cache-Control": IMMUTABLE if relative in self.immutable else "no-cache"}
+        media_type = guess_type(full_path)[0] or "text/plain"
+        if os.path.splitext(full_path)[1] in COMPRESSIBLE:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, suffix in ENCODINGS:
+                if encoding in accepted and full_path + suffix in self.variants:
+                    full_path += suffix
+                    stat_result = self.variants[full_path]
+                    headers["Content-Encoding"] = encoding
+                    break
+
+        response = FileResponse(
+            full_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def static_files(prefix: str, **kwargs):
+    """The app for /<prefix>: the built copy when there is one, else the source directory (or None)."""
+    built = os.path.join(BUILD_DIR, prefix)
+    if manifest and os.path.isdir(built):
+        immutable = {
+            path[len(prefix) + 1:]
+            for name, path in manifest.items()
+            if path.startswith(prefix + "/") and (path != name or HASHED.search(path))
+        }
+        return PrecompressedStaticFiles(directory=built, immutable=immutable, **kwargs)
+    if os.path.isdir(ROOTS[prefix]):
+        return PrecompressedStaticFiles(directory=ROOTS[prefix], **kwargs)
+    return None
@@ -0,0 +1,57 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+# `version` is a digest of the cached value, so two processes holding the same
+# data agree on it; `modified_at` is when this process first saw that version.
+CacheEntry = namedtuple("CacheEntry", "value version modified_at")
+
+
+def digest(value):
+    return hashlib.blake2b(repr(value).encode(), digest_size=8).hexdigest()
+
+
+class TTLCache:
+    """Small in-process read-through cache.
+
+    Entries expire after `ttl` seconds so that other worker processes, which
+    never see this process's invalidations, still converge quickly.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}
+        self._modified = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_entry(self, key, loader):
+        now = time.monotonic()
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        generation = self._generation
+        value = loader()
+        version = digest(value)
+        with self._lock:
+            seen_version, modified_at = self._modified.get(key, (None, None))
+            if seen_version != version:
+                modified_at = time.time()
+                self._modified[key] = (version, modified_at)
+            entry = CacheEntry(value, version, modified_at)
+            # Don't cache a value loaded before a concurrent invalidation.
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, entry)
+        return entry
+
+    def get_or_load(self, key, loader):
+        return self.get_entry(key, loader).value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -1,21 +1,53 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, exists, func, insert, literal, literal_column, or_, select, text, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 from lib.models.user import User
 from lib.models.tool_type import ToolType
 from lib.models.tool import Tool
 from lib.models.checkout import Checkout
+from lib.models.checkout_archive import CheckoutArchive
+from lib.models.reservation import Reservation
+from lib import events, refdata, summary
 from datetime import datetime
 
 
+PAGE_SIZE = 50
+EXPORT_BATCH_SIZE = 500
+TOOL_NOT_FOUND = "Tool not found"
+USER_NOT_FOUND = "User not found"
+# Prefix of every create_reservation error caused by an overlapping booking.
+ALREADY_RESERVED = "Tool is already reserved"
+# Postgres exclusion_violation, raised by ex_reservations_tool_overlap.
+EXCLUSION_VIOLATION = "23P01"
+
+def _keyset(query, column, after=None, limit=None):
+    """Applies an `after` cursor and a row limit to a query ordered by `column`."""
+    query = query.order_by(column)
+    if after is not None:
+        query = query.filter(column > after)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
 
 def create_user(db: Session, username: str, full_name: str = "", email: str = "", role: str = "technician"):
     u = User(username=username, full_name=full_name, email=email, role=role)
     db.add(u)
     db.commit()
+    refdata.invalidate(refdata.USERS)
     db.refresh(u)
     return u
 
-def get_users(db: Session):
-    return db.query(User).order_by(User.id).all()
+def get_user(db: Session, user_id: int):
+    return db.query(User).filter(User.id == user_id).first()
+
+def get_users(db: Session, after_id: int = None, limit: int = None):
+    return _keyset(db.query(User), User.id, after_id, limit).all()
+
+USER_EXPORT_COLUMNS = (User.id, User.username, User.full_name, User.email, User.role)
+
+def iter_users(db: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    return db.query(*USER_EXPORT_COLUMNS).order_by(User.id).yield_per(batch_size)
 
 def update_user(db: Session, user_id: int, username: str, full_name: str = None, email: str = "", role: str = "technician"):
     user = db.query(User).filter(User.id == user_id).first()
@@ -25,6 +57,7 @@ def update_user(db: Session, user_id: int, username: str, full_name: str = None,
         user.email = email
         user.role = role
         db.commit()
+        refdata.invalidate(refdata.USERS)
         db.refresh(user)
         return user
     return None
@@ -34,6 +67,7 @@ def delete_user(db: Session, user_id: int):
     if user:
         db.delete(user)
         db.commit()
+        refdata.invalidate(refdata.USERS)
         return True
     return False
 
@@ -43,11 +77,16 @@ def create_tool_type(db: Session, name: str, description: str = ""):
     tt = ToolType(name=name, description=description)
     db.add(tt)
     db.commit()
+    refdata.invalidate(refdata.TOOL_TYPES)
+    summary.invalidate()
     db.refresh(tt)
     return tt
 
-def get_tool_types(db: Session):
-    return db.query(ToolType).order_by(ToolType.id).all()
+def get_tool_type(db: Session, tool_type_id: int):
+    return db.query(ToolType).filter(ToolType.id == tool_type_id).first()
+
+def get_tool_types(db: Session, after_id: int = None, limit: int = None):
+    return _keyset(db.query(ToolType), ToolType.id, after_id, limit).all()
 
 def update_tool_type(db: Session, tool_type_id: int, name: str, description: str = ""):
     tt = db.query(ToolType).filter(ToolType.id == tool_type_id).first()
@@ -55,6 +94,8 @@ def update_tool_type(db: Session, tool_type_id: int, name: str, description: str
         tt.name = name
         tt.description = description
         db.commit()
+        refdata.invalidate(refdata.TOOL_TYPES)
+        summary.invalidate()
         db.refresh(tt)
         return tt
     return None
@@ -64,6 +105,8 @@ def delete_tool_type(db: Session, tool_type_id: int):
     if tt:
         db.delete(tt)
         db.commit()
+        refdata.invalidate(refdata.TOOL_TYPES)
+        summary.invalidate()
         return True
     return False
 
@@ -71,12 +114,87 @@ def delete_tool_type(db: Session, tool_type_id: int):
 def create_tool(db: Session, name: str, serial_number: str, type_id: int, location: str = ""):
     t = Tool(name=name, serial_number=serial_number, type_id=type_id, location=location, status="available") # Initialize status
     db.add(t)
+    summary.adjust(db, type_id, location, "available", 1)
+    db.flush()
+    events.record_many(db, [
+        events.event_row(t.id, events.STATUS, None, "available"),
+        events.event_row(t.id, events.LOCATION, None, location),
+    ])
     db.commit()
+    refdata.invalidate(refdata.AVAILABLE_TOOLS)
+    summary.invalidate()
     db.refresh(t)
     return t
 
-def get_tools(db: Session):
-    return db.query(Tool).order_by(Tool.id).all()
+def get_tools(db: Session, after_id: int = None, limit: int = None):
+    query = db.query(Tool).options(joinedload(Tool.tool_type).load_only(ToolType.id, ToolType.name))
+    return _keyset(query, Tool.id, after_id, limit).all()
+
+TOOL_EXPORT_COLUMNS = (
+    Tool.id, Tool.name, Tool.serial_number, Tool.type_id,
+    Tool.location, Tool.status, Tool.last_calibrated,
+)
+
+def iter_tools(db: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    return db.query(*TOOL_EXPORT_COLUMNS).order_by(Tool.id).yield_per(batch_size)
+
+TOOL_ROW_COLUMNS = TOOL_EXPORT_COLUMNS + (Tool.calibration_due,)
+
+def get_tool_rows(db: Session, after_id: int = None, limit: int = PAGE_SIZE, status: str = None, type_id: int = None):
+    """Column-only tool listing (no ORM instances), keyset-paginated on id."""
+    query = db.query(*TOOL_ROW_COLUMNS)
+    if status is not None:
+        query = query.filter(Tool.status == status)
+    if type_id is not None:
+        query = query.filter(Tool.type_id == type_id)
+    return _keyset(query, Tool.id, after_id, limit).all()
+
+SEARCH_LIMIT = 100
+
+def search_tools(db: Session, query: str, limit: int = SEARCH_LIMIT):
+    """Returns tools whose name or serial number contains `query`, best matches first."""
+    term = query.strip()
+    if not term:
+        return []
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    contains = f"%{escaped}%"
+    prefix = f"{escaped}%"
+    if db.get_bind().dialect.name == "sqlite" and len(term) >= 3:
+        # The trigram FTS table finds the candidates; a quoted phrase takes
+        # the term literally. Shorter terms have no trigram to look up.
+        phrase = '"' + term.replace('"', '""') + '"'
+        matches = Tool.id.in_(
+            select(literal_column("rowid"))
+            .select_from(text("tools_fts"))
+            .where(text("tools_fts MATCH :phrase").bindparams(phrase=phrase))
+        )
+    else:
+        matches = or_(
+            Tool.name.ilike(contains, escape="\\"),
+            Tool.serial_number.ilike(contains, escape="\\"),
+        )
+    rank = case(
+        (func.lower(Tool.serial_number) == term.lower(), 0),
+        (Tool.serial_number.ilike(prefix, escape="\\"), 1),
+        (Tool.name.ilike(prefix, escape="\\"), 2),
+        else_=3,
+    )
+    return (
+        db.query(Tool)
+        .options(joinedload(Tool.tool_type).load_only(ToolType.id, ToolType.name))
+        .filter(matches)
+        .order_by(rank, Tool.serial_number)
+        .limit(limit)
+        .all()
+    )
+
+def get_tool_with_type(db: Session, tool_id: int):
+    return (
+        db.query(Tool)
+        .options(joinedload(Tool.tool_type).load_only(ToolType.id, ToolType.name))
+        .filter(Tool.id == tool_id)
+        .first()
+    )
 
 def get_tool_by_id(db: Session, tool_id: int):
     return db.query(Tool).filter(Tool.id == tool_id).first()
@@ -85,69 +203,481 @@ def get_tool_by_serial(db: Session, serial: str):
     return db.query(Tool).filter(Tool.serial_number == serial).first()
 
 
-def get_available_tools(db: Session):
-    """Returns all tools whose status is 'available'."""
-    return db.query(Tool).filter(Tool.status == "available").order_by(Tool.serial_number).all()
+def get_available_tools(db: Session, after_serial: str = None, limit: int = None):
+    """Returns tools whose status is 'available', ordered by serial number."""
+    query = db.query(Tool).filter(Tool.status == "available")
+    return _keyset(query, Tool.serial_number, after_serial, limit).all()
 
-def checkout_tool(db: Session, user_id: int, tool_id: int, project_location: str, due_date: str):
+def _unavailable_reason(db: Session, tool_id: int):
     tool = get_tool_by_id(db, tool_id)
     if not tool:
-        return None, "Tool not found"
-    if tool.status != "available":
-        return None, f"Tool not available (status={tool.status})"
-    
-    
-    tool.status = "checked_out"
-    
-    
+        return TOOL_NOT_FOUND
+    return f"Tool not available (status={tool.status})"
+
+def _checkout_events(tool_id, user_id, checkout_id, home_location, project_location, occurred_at=None):
+    details = {"user_id": user_id, "checkout_id": checkout_id, "occurred_at": occurred_at or datetime.utcnow()}
+    return [
+        events.event_row(tool_id, events.STATUS, "available", "checked_out", **details),
+        events.event_row(tool_id, events.LOCATION, home_location, project_location, **details),
+    ]
+
+def _return_events(tool_id, user_id, checkout_id, project_location, home_location, occurred_at=None):
+    details = {"user_id": user_id, "checkout_id": checkout_id, "occurred_at": occurred_at or datetime.utcnow()}
+    return [
+        events.event_row(tool_id, events.STATUS, "checked_out", "available", **details),
+        events.event_row(tool_id, events.LOCATION, project_location, home_location, **details),
+    ]
+
+def checkout_tool(db: Session, user_id: int, tool_id: int, project_location: str, due_date: str):
+    """Claims an available tool and opens a checkout for it in one transaction.
+
+    The status flip is a conditional UPDATE, so of two concurrent checkouts
+    for the same tool only one can match the 'available' row.
+    """
     try:
-        
         due_date_dt = datetime.strptime(due_date, '%Y-%m-%d')
     except ValueError:
         return None, "Invalid due date format. Must be YYYY-MM-DD."
 
+    claimed = db.execute(
+        update(Tool)
+        .where(Tool.id == tool_id, Tool.status == "available")
+        .values(status="checked_out")
+        .returning(Tool.type_id, Tool.location)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if claimed is None:
+        db.rollback()
+        return None, _unavailable_reason(db, tool_id)
+    summary.move(db, claimed.type_id, claimed.location, "available", "checked_out")
+    summary.open_checkouts(db, [(user_id, claimed.type_id, claimed.location)])
+
     co = Checkout(
-        user_id=user_id, 
+        user_id=user_id,
         tool_id=tool_id,
-        project_location=project_location, 
-        due_date=due_date_dt                
+        project_location=project_location,
+        due_date=due_date_dt
     )
     db.add(co)
+    db.flush()
+    events.record_many(db, _checkout_events(tool_id, user_id, co.id, claimed.location, project_location, co.checked_out_at))
     db.commit()
-    db.refresh(co)
+    refdata.invalidate(refdata.AVAILABLE_TOOLS)
+    summary.invalidate()
     return co, None
 
 
 def return_tool(db: Session, tool_id: int, condition: str = None):
-    tool = get_tool_by_id(db, tool_id)
-    if not tool:
-        return None, "Tool not found"
-    
-  
+    """Closes the open checkout for a tool and marks the tool available again."""
     co = db.query(Checkout).filter(
-        Checkout.tool_id == tool_id, 
+        Checkout.tool_id == tool_id,
         Checkout.returned_at.is_(None)
     ).order_by(Checkout.checked_out_at.desc()).first()
-    
+
     if not co:
+        if not get_tool_by_id(db, tool_id):
+            return None, TOOL_NOT_FOUND
+        return None, "Tool is not currently checked out"
+
+    now = datetime.utcnow()
+    closed = db.execute(
+        update(Checkout)
+        .where(Checkout.id == co.id, Checkout.returned_at.is_(None))
+        .values(returned_at=now, condition_on_return=condition)
+        .returning(Checkout.user_id, Checkout.is_overdue)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if closed is None:
+        db.rollback()
         return None, "Tool is not currently checked out"
-        
-    co.returned_at = datetime.utcnow()
-    co.condition_on_return = condition
-    tool.status = "available"
+
+    released = db.execute(
+        update(Tool)
+        .where(Tool.id == tool_id, Tool.status == "checked_out")
+        .values(status="available")
+        .returning(Tool.type_id, Tool.location)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if released is not None:
+        summary.move(db, released.type_id, released.location, "checked_out", "available")
+        events.record_many(db, _return_events(tool_id, co.user_id, co.id, co.project_location, released.location, now))
+        tool = released
+    else:
+        # Calibrated while out: the tool is already available, the checkout was still open.
+        tool = db.execute(select(Tool.type_id, Tool.location).where(Tool.id == tool_id)).first()
+    summary.close_checkouts(db, [(closed.user_id, tool.type_id, tool.location, closed.is_overdue)])
     db.commit()
-    db.refresh(co)
+    refdata.invalidate(refdata.AVAILABLE_TOOLS)
+    summary.invalidate()
     return co, None
 
 def calibrate_tool(db: Session, tool_id: int):
-    tool = get_tool_by_id(db, tool_id)
-    if not tool:
-        return None, "Tool not found"
-    tool.last_calibrated = datetime.utcnow()
-    tool.status = "available"
+    """Records a calibration and makes the tool available again, even if it is out.
+
+    The status flip is a conditional UPDATE on the status just read, like
+    checkout_tool, so a checkout or return landing in between is never
+    overwritten with counters moved from a stale status; the read is
+    repeated instead.
+    """
+    while True:
+        seen = db.execute(select(Tool.status, Tool.last_calibrated).where(Tool.id == tool_id)).first()
+        if seen is None:
+            return None, TOOL_NOT_FOUND
+        now = datetime.utcnow()
+        calibrated = db.execute(
+            update(Tool)
+            .where(Tool.id == tool_id, Tool.status.is_not_distinct_from(seen.status))
+            .values(status="available", last_calibrated=now, calibration_due=False)
+            .returning(Tool.type_id, Tool.location)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if calibrated is not None:
+            break
+        db.rollback()
+    old_status = seen.status or "available"
+    summary.move(db, calibrated.type_id, calibrated.location, old_status, "available")
+    if old_status != "available":
+        events.record(db, tool_id, events.STATUS, old_status, "available", occurred_at=now)
+    events.record(
+        db, tool_id, events.CALIBRATION,
+        seen.last_calibrated.isoformat() if seen.last_calibrated else None, now.isoformat(), occurred_at=now,
+    )
     db.commit()
-    db.refresh(tool)
-    return tool, None
+    refdata.invalidate(refdata.AVAILABLE_TOOLS)
+    summary.invalidate()
+    return get_tool_by_id(db, tool_id), None
+
+def checkout_cursor(co: Checkout):
+    """Encodes the position of `co` in the active board ordering."""
+    return f"{co.checked_out_at.isoformat()}_{co.id}"
+
+def _parse_checkout_cursor(cursor: str):
+    ts, _, co_id = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(ts), int(co_id)
+    except ValueError:
+        return None
+
+def _before_checkout_cursor(query, cursor: str = None, model=Checkout):
+    position = _parse_checkout_cursor(cursor) if cursor else None
+    if position:
+        checked_out_at, co_id = position
+        query = query.filter(or_(
+            model.checked_out_at < checked_out_at,
+            and_(model.checked_out_at == checked_out_at, model.id < co_id),
+        ))
+    return query
 
-def get_active_checkouts(db: Session):
-    return db.query(Checkout).filter(Checkout.returned_at.is_(None)).order_by(Checkout.checked_out_at.desc()).all()
+CHECKOUT_EXPORT_COLUMNS = (
+    Checkout.id,
+    Tool.serial_number.label("tool_serial_number"),
+    User.username,
+    Checkout.project_location,
+    Checkout.checked_out_at,
+    Checkout.due_date,
+    Checkout.returned_at,
+    Checkout.condition_on_return,
+)
+
+def _checkout_export_select(model):
+    return (
+        select(
+            model.id,
+            Tool.serial_number.label("tool_serial_number"),
+            User.username,
+            model.project_location,
+            model.checked_out_at,
+            model.due_date,
+            model.returned_at,
+            model.condition_on_return,
+        )
+        .outerjoin(Tool, model.tool_id == Tool.id)
+        .outerjoin(User, model.user_id == User.id)
+    )
+
+def iter_checkouts(db: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    """Streams the full checkout history, archived rows included, oldest first."""
+    both = union_all(_checkout_export_select(Checkout), _checkout_export_select(CheckoutArchive)).subquery()
+    return db.execute(select(both).order_by(both.c.id).execution_options(yield_per=batch_size))
+
+ACTIVE_CHECKOUT_ROW_COLUMNS = (
+    Checkout.id,
+    Checkout.tool_id,
+    Tool.name.label("tool_name"),
+    Tool.serial_number.label("tool_serial_number"),
+    Checkout.user_id,
+    User.username,
+    User.full_name,
+    Checkout.project_location,
+    Checkout.checked_out_at,
+    Checkout.due_date,
+    Checkout.is_overdue,
+)
+
+def _active_checkout_rows(db: Session):
+    return (
+        db.query(*ACTIVE_CHECKOUT_ROW_COLUMNS)
+        .join(Tool, Checkout.tool_id == Tool.id)
+        .outerjoin(User, Checkout.user_id == User.id)
+        .filter(Checkout.returned_at.is_(None))
+    )
+
+def get_active_checkout_rows(db: Session, cursor: str = None, limit: int = PAGE_SIZE):
+    """Open checkouts, newest first, with the tool and user columns the board shows, in one query."""
+    query = _active_checkout_rows(db).order_by(Checkout.checked_out_at.desc(), Checkout.id.desc())
+    return _before_checkout_cursor(query, cursor).limit(limit).all()
+
+def get_active_checkout_row(db: Session, checkout_id: int):
+    return _active_checkout_rows(db).filter(Checkout.id == checkout_id).first()
+
+def get_open_checkout_row(db: Session, tool_id: int):
+    return _active_checkout_rows(db).filter(Checkout.tool_id == tool_id).first()
+
+
+def _history_select(model, tool_id=None, user_id=None, cursor: str = None, limit: int = PAGE_SIZE):
+    query = (
+        select(
+            model.id,
+            model.tool_id,
+            Tool.serial_number.label("tool_serial_number"),
+            model.user_id,
+            User.username,
+            model.project_location,
+            model.checked_out_at,
+            model.due_date,
+            model.returned_at,
+            model.condition_on_return,
+            literal(model is CheckoutArchive).label("archived"),
+        )
+        .outerjoin(Tool, model.tool_id == Tool.id)
+        .outerjoin(User, model.user_id == User.id)
+    )
+    if tool_id is not None:
+        query = query.where(model.tool_id == tool_id)
+    if user_id is not None:
+        query = query.where(model.user_id == user_id)
+    query = _before_checkout_cursor(query, cursor, model)
+    return query.order_by(model.checked_out_at.desc(), model.id.desc()).limit(limit)
+
+def get_checkout_history(db: Session, tool_id: int = None, user_id: int = None, cursor: str = None, limit: int = PAGE_SIZE):
+    """Checkouts from both the hot table and the archive, newest first.
+
+    Each side is limited before the union, so a page reads at most `limit`
+    rows per table through its (tool/user, checked_out_at, id) index, or
+    (checked_out_at, id) when unfiltered.
+    """
+    hot = _history_select(Checkout, tool_id, user_id, cursor, limit).subquery()
+    cold = _history_select(CheckoutArchive, tool_id, user_id, cursor, limit).subquery()
+    both = union_all(select(hot), select(cold)).subquery()
+    return db.execute(
+        select(both).order_by(both.c.checked_out_at.desc(), both.c.id.desc()).limit(limit)
+    ).all()
+
+
+def checkout_tools(db: Session, user_id: int, serial_numbers, project_location: str, due_date: datetime):
+    """Checks out several tools by serial number in one transaction, all or nothing.
+
+    Returns (checkout rows, None), (None, USER_NOT_FOUND) for an unknown
+    user, or (None, {serial: reason}) when any tool could not be claimed.
+    """
+    if db.get(User, user_id) is None:
+        return None, USER_NOT_FOUND
+    serials = list(dict.fromkeys(serial_numbers))
+    claimed = db.execute(
+        update(Tool)
+        .where(Tool.serial_number.in_(serials), Tool.status == "available")
+        .values(status="checked_out")
+        .returning(Tool.id, Tool.serial_number, Tool.type_id, Tool.location)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if len(claimed) != len(serials):
+        db.rollback()
+        claimed_serials = {row.serial_number for row in claimed}
+        statuses = dict(db.query(Tool.serial_number, Tool.status).filter(Tool.serial_number.in_(serials)).all())
+        return None, {
+            serial: f"not available (status={statuses[serial]})" if serial in statuses else "not found"
+            for serial in serials if serial not in claimed_serials
+        }
+
+    summary.move_many(db, claimed, "available", "checked_out")
+    summary.open_checkouts(db, [(user_id, tool.type_id, tool.location) for tool in claimed])
+    now = datetime.utcnow()
+    rows = db.execute(
+        insert(Checkout).returning(Checkout.id, Checkout.tool_id, Checkout.checked_out_at),
+        [
+            {
+                "user_id": user_id,
+                "tool_id": tool.id,
+                "project_location": project_location,
+                "due_date": due_date,
+                "checked_out_at": now,
+            }
+            for tool in claimed
+        ],
+    ).all()
+    locations = {tool.id: tool.location for tool in claimed}
+    events.record_many(db, [
+        event
+        for row in rows
+        for event in _checkout_events(row.tool_id, user_id, row.id, locations[row.tool_id], project_location, now)
+    ])
+    db.commit()
+    refdata.invalidate(refdata.AVAILABLE_TOOLS)
+    summary.invalidate()
+    return rows, None
+
+
+def return_tools(db: Session, serial_numbers, condition: str = None):
+    """Returns several tools by serial number in one transaction, all or nothing.
+
+    Returns (closed checkout rows, None) or (None, {serial: reason}).
+    """
+    serials = list(dict.fromkeys(serial_numbers))
+    now = datetime.utcnow()
+    tool_ids = select(Tool.id).where(Tool.serial_number.in_(serials)).scalar_subquery()
+    closed = db.execute(
+        update(Checkout)
+        .where(Checkout.tool_id.in_(tool_ids), Checkout.returned_at.is_(None))
+        .values(returned_at=now, condition_on_return=condition)
+        .returning(Checkout.id, Checkout.tool_id, Checkout.user_id, Checkout.project_location, Checkout.is_overdue)
+        .execution_options(synchronize_session=False)
+    ).all()
+    released = db.execute(
+        update(Tool)
+        .where(Tool.id.in_({row.tool_id for row in closed}), Tool.status == "checked_out")
+        .values(status="available")
+        .returning(Tool.id, Tool.serial_number, Tool.type_id, Tool.location)
+        .execution_options(synchronize_session=False)
+    ).all() if closed else []
+    returned_serials = {row.serial_number for row in released}
+    if len(returned_serials) != len(serials):
+        db.rollback()
+        known = {serial for (serial,) in db.query(Tool.serial_number).filter(Tool.serial_number.in_(serials))}
+        return None, {
+            serial: "not currently checked out" if serial in known else "not found"
+            for serial in serials if serial not in returned_serials
+        }
+
+    summary.move_many(db, released, "checked_out", "available")
+    tools = {tool.id: tool for tool in released}
+    summary.close_checkouts(db, [
+        (row.user_id, tools[row.tool_id].type_id, tools[row.tool_id].location, row.is_overdue) for row in closed
+    ])
+    locations = {tool.id: tool.location for tool in released}
+    events.record_many(db, [
+        event
+        for row in closed
+        for event in _return_events(row.tool_id, row.user_id, row.id, row.project_location, locations[row.tool_id], now)
+    ])
+    db.commit()
+    refdata.invalidate(refdata.AVAILABLE_TOOLS)
+    summary.invalidate()
+    return closed, None
+
+
+RESERVATION_COLUMNS = (
+    Reservation.id,
+    Reservation.tool_id,
+    Tool.serial_number.label("tool_serial_number"),
+    Reservation.user_id,
+    User.username,
+    Reservation.starts_at,
+    Reservation.ends_at,
+    Reservation.project_location,
+)
+
+def _overlapping(tool_id, starts_at: datetime, ends_at: datetime):
+    """Reservations of `tool_id` whose [starts_at, ends_at) window meets the given one."""
+    return (
+        Reservation.tool_id == tool_id,
+        Reservation.starts_at < ends_at,
+        Reservation.ends_at > starts_at,
+    )
+
+def _reservation_rows(db: Session):
+    return (
+        db.query(*RESERVATION_COLUMNS)
+        .join(Tool, Reservation.tool_id == Tool.id)
+        .outerjoin(User, Reservation.user_id == User.id)
+    )
+
+def get_reservations(db: Session, tool_id: int = None, starts_at: datetime = None, ends_at: datetime = None,
+                     after_id: int = None, limit: int = PAGE_SIZE):
+    """Reservations, optionally for one tool and/or meeting a window, keyset-paginated on id."""
+    query = _reservation_rows(db)
+    if tool_id is not None:
+        query = query.filter(Reservation.tool_id == tool_id)
+    if ends_at is not None:
+        query = query.filter(Reservation.starts_at < ends_at)
+    if starts_at is not None:
+        query = query.filter(Reservation.ends_at > starts_at)
+    return _keyset(query, Reservation.id, after_id, limit).all()
+
+def _sqlstate(error: IntegrityError):
+    # psycopg2 calls it pgcode, asyncpg sqlstate.
+    return getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+
+def create_reservation(db: Session, tool_id: int, user_id: int, starts_at: datetime, ends_at: datetime,
+                       project_location: str = None):
+    """Books a tool for [starts_at, ends_at). Returns (row, None) or (None, error).
+
+    The insert only happens if no overlapping reservation exists, checked in
+    the same statement. On Postgres the exclusion constraint also stops two
+    concurrent bookings that both passed that check. Only those two cases
+    produce an ALREADY_RESERVED error; any other integrity error is
+    reported as it is.
+    """
+    if ends_at <= starts_at:
+        return None, "Reservation must end after it starts."
+    if get_tool_by_id(db, tool_id) is None:
+        return None, TOOL_NOT_FOUND
+    if db.get(User, user_id) is None:
+        return None, USER_NOT_FOUND
+    values = select(
+        literal(tool_id), literal(user_id), literal(starts_at), literal(ends_at),
+        literal(project_location), literal(datetime.utcnow()),
+    ).where(~exists().where(*_overlapping(tool_id, starts_at, ends_at)))
+    try:
+        new_id = db.execute(
+            insert(Reservation)
+            .from_select(["tool_id", "user_id", "starts_at", "ends_at", "project_location", "created_at"], values)
+            .returning(Reservation.id)
+        ).scalar()
+    except IntegrityError as e:
+        db.rollback()
+        if _sqlstate(e) != EXCLUSION_VIOLATION:
+            return None, f"Reservation rejected: {e.orig}"
+        new_id = None
+    if new_id is None:
+        db.rollback()
+        clash = _reservation_rows(db).filter(*_overlapping(tool_id, starts_at, ends_at)).order_by(Reservation.starts_at).first()
+        return None, (
+            f"{ALREADY_RESERVED} from {clash.starts_at} to {clash.ends_at} (reservation {clash.id})"
+            if clash else f"{ALREADY_RESERVED} for that window"
+        )
+    db.commit()
+    return _reservation_rows(db).filter(Reservation.id == new_id).first(), None
+
+def cancel_reservation(db: Session, reservation_id: int):
+    deleted = db.query(Reservation).filter(Reservation.id == reservation_id).delete(synchronize_session=False)
+    db.commit()
+    return bool(deleted)
+
+def get_free_tool_rows(db: Session, type_id: int, starts_at: datetime, ends_at: datetime,
+                       after_id: int = None, limit: int = PAGE_SIZE):
+    """Tools of `type_id` with no reservation meeting [starts_at, ends_at) and not due back after it starts.
+
+    Walks the type's tools through ix_tools_type_id_id and probes
+    ix_reservations_tool_ends_at once per tool. Each probe skips the tool's
+    past bookings but still reads every booking that ends after `starts_at`,
+    so the cost follows the number of tools of that type times their
+    upcoming reservations, not the full reservation history.
+    """
+    reserved = exists().where(*_overlapping(Tool.id, starts_at, ends_at))
+    still_out = exists().where(
+        Checkout.tool_id == Tool.id,
+        Checkout.returned_at.is_(None),
+        Checkout.due_date > starts_at,
+    )
+    query = db.query(*TOOL_ROW_COLUMNS).filter(Tool.type_id == type_id, ~reserved, ~still_out)
+    return _keyset(query, Tool.id, after_id, limit).all()
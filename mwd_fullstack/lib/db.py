@@ -1,6 +1,16 @@
+import asyncio
 import os
-from sqlalchemy import create_engine
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+
+from lib import metrics
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if not DATABASE_URL:
@@ -9,13 +19,212 @@ if not DATABASE_URL:
     DATABASE_PATH = os.path.join(BASE_DIR, "mwd.db")
     DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith('sqlite') else {})
+# DB_ASYNC=1 serves the HTML routes from an AsyncEngine (aiosqlite/asyncpg)
+# instead of the blocking engine on the threadpool.
+DB_ASYNC = os.environ.get("DB_ASYNC", "").lower() in ("1", "true", "yes")
+
+# Pool sizing, per worker process. Render's starter Postgres allows ~100
+# connections, so workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay below it.
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+# How often run_db starts a call again after SQLite gave up on its write lock.
+SQLITE_LOCK_RETRIES = int(os.environ.get("SQLITE_LOCK_RETRIES", 5))
+
+# WAL lets the checkout board keep reading while a checkout is being written.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class _PoolWaitStats:
+    """Records how long callers wait to get a connection out of the pool."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_count = getattr(self, "wait_count", 0) + 1
+            self.wait_seconds_total = getattr(self, "wait_seconds_total", 0.0) + waited
+            self.wait_seconds_max = max(getattr(self, "wait_seconds_max", 0.0), waited)
+
+
+class TimedQueuePool(_PoolWaitStats, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_PoolWaitStats, AsyncAdaptedQueuePool):
+    pass
+
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str):
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+def sync_database_url(url: str):
+    # Render hands out postgres:// URLs, which SQLAlchemy no longer accepts.
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def make_engine(url: str = DATABASE_URL, use_async: bool = False):
+    """Builds the sync or async engine for `url` with the tuned pool and pragmas."""
+    is_sqlite = url.startswith("sqlite")
+    in_memory = is_sqlite and (url.endswith(":memory:") or url.rstrip("/").endswith("sqlite:"))
+    options = {}
+    if is_sqlite:
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = POOL_RECYCLE
+    if not in_memory:
+        options["poolclass"] = TimedAsyncQueuePool if use_async else TimedQueuePool
+        options["pool_size"] = POOL_SIZE
+        options["max_overflow"] = MAX_OVERFLOW
+        options["pool_timeout"] = POOL_TIMEOUT
+
+    if use_async:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        new_engine = create_async_engine(async_database_url(url), **options)
+        sync_engine = new_engine.sync_engine
+    else:
+        new_engine = sync_engine = create_engine(sync_database_url(url), **options)
+
+    if is_sqlite:
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+    event.listen(sync_engine, "before_cursor_execute", metrics.before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", metrics.after_cursor_execute)
+    return new_engine
+
+
+def pool_stats(target_engine=None):
+    """Snapshot of pool occupancy and checkout wait times for sizing."""
+    target_engine = target_engine or engine
+    pool = getattr(target_engine, "sync_engine", target_engine).pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=MAX_OVERFLOW,
+        )
+    waits = getattr(pool, "wait_count", 0)
+    stats.update(
+        waits=waits,
+        wait_ms_avg=round(1000 * getattr(pool, "wait_seconds_total", 0.0) / waits, 3) if waits else 0.0,
+        wait_ms_max=round(1000 * getattr(pool, "wait_seconds_max", 0.0), 3),
+    )
+    return stats
+
+
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = make_engine(DATABASE_URL, use_async=True)
+    # Templates read attributes after commit; with an AsyncSession an expired
+    # attribute would need awaiting, so keep loaded state around.
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+# A request's Session keeps its connection across threadpool calls (run_db,
+# streamed export chunks), and each call needs a free thread. With more
+# requests in flight than the pool has connections, every thread can end up
+# blocked in checkout while the requests holding connections wait for a
+# thread, so only admit as many sessions as the pool can serve. An asyncio
+# semaphore belongs to one event loop, so each loop (a server has one; tests
+# and the bench start several) gets its own.
+_sync_session_slots = weakref.WeakKeyDictionary()
+
+
+def _session_slots():
+    loop = asyncio.get_running_loop()
+    slots = _sync_session_slots.get(loop)
+    if slots is None:
+        slots = _sync_session_slots[loop] = asyncio.Semaphore(POOL_SIZE + MAX_OVERFLOW)
+    return slots
+
+
+@asynccontextmanager
+async def _sync_session():
+    async with _session_slots():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_db():
+    async with _sync_session() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_session():
+    """Yields an AsyncSession when DB_ASYNC is set, otherwise a regular Session."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        async with _sync_session() as db:
+            yield db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """Calls a sync crud function without blocking the event loop.
+
+    An AsyncSession runs it through ``run_sync``, so the same crud code
+    drives the async driver directly; a regular Session runs it on the
+    threadpool as a sync route would.
+
+    On SQLite, a write that waited out busy_timeout for the database lock
+    (many writers at once, or a transaction that read before writing) is
+    rolled back and run again, up to SQLITE_LOCK_RETRIES times. The crud
+    functions commit once, at the end, so nothing was written by then.
+    """
+    for attempt in range(SQLITE_LOCK_RETRIES + 1):
+        try:
+            if AsyncSessionLocal is not None:
+                return await db.run_sync(fn, *args, **kwargs)
+            return await run_in_threadpool(fn, db, *args, **kwargs)
+        except OperationalError as e:
+            if attempt == SQLITE_LOCK_RETRIES or "database is locked" not in str(e.orig):
+                raise
+        if AsyncSessionLocal is not None:
+            await db.rollback()
+        else:
+            await run_in_threadpool(db.rollback)
+        await asyncio.sleep(random.uniform(0, 0.05 * 2 ** attempt))
@@ -0,0 +1,251 @@
+"""Append-only tool event log with write-behind batching.
+
+Crud write paths call ``record`` inside their transaction. By default the
+events are held on the session and, once it commits, handed to a bounded
+in-process queue; a background thread drains the queue in batched inserts,
+so the request never waits on the log. A rolled-back transaction drops its
+events. The writer is woken early once a batch is waiting. When the queue
+is full the caller wakes it and dead-letters what does not fit, without
+flushing or waiting: ``after_commit`` can run on the event loop thread
+(``DB_ASYNC=1``), so a backed-up log must never block it.
+
+A batch whose insert fails for a transient reason (the database is down)
+is retried on later flushes, up to ``EVENT_MAX_ATTEMPTS`` times. A batch
+rejected for its data (a constraint or type error) is split in half until
+the bad rows are isolated, so one bad row cannot stop the log. Rows that
+cannot be written are appended as JSON lines to ``EVENT_DEAD_LETTER_PATH``
+and logged.
+
+``EVENT_LOG_SYNC=1`` writes events in the same transaction as the change
+instead, trading a little latency for never losing one on a crash.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+
+from sqlalchemy import event, exists, insert, literal, select
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+from sqlalchemy.orm import Session
+
+from lib.db import engine
+from lib.models.checkout import Checkout
+from lib.models.checkout_archive import CheckoutArchive
+from lib.models.tool import Tool
+from lib.models.tool_event import ToolEvent
+
+logger = logging.getLogger(__name__)
+
+SYNC = os.environ.get("EVENT_LOG_SYNC", "").lower() in ("1", "true", "yes")
+QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", 10000))
+BATCH_SIZE = int(os.environ.get("EVENT_BATCH_SIZE", 500))
+FLUSH_INTERVAL_SECONDS = float(os.environ.get("EVENT_FLUSH_INTERVAL_SECONDS", 1.0))
+MAX_ATTEMPTS = int(os.environ.get("EVENT_MAX_ATTEMPTS", 5))
+DEAD_LETTER_PATH = os.environ.get("EVENT_DEAD_LETTER_PATH", "tool_events.deadletter.jsonl")
+
+STATUS = "status"
+LOCATION = "location"
+CALIBRATION = "calibration"
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_flush_lock = threading.Lock()
+# [rows, failed attempts] batches held back after a failed insert; written
+# before anything newer. Only ever holds pieces of one drained batch.
+_retry = []
+_worker = None
+_stopping = threading.Event()
+_wake = threading.Event()
+_PENDING = "pending_tool_events"
+
+
+def event_row(tool_id, kind, old_value, new_value, user_id=None, checkout_id=None, occurred_at=None):
+    return {
+        "tool_id": tool_id,
+        "kind": kind,
+        "old_value": None if old_value is None else str(old_value),
+        "new_value": None if new_value is None else str(new_value),
+        "user_id": user_id,
+        "checkout_id": checkout_id,
+        "occurred_at": occurred_at or datetime.utcnow(),
+    }
+
+
+def record(db, tool_id, kind, old_value, new_value, **details):
+    """Logs one change as part of `db`'s current transaction. Call before committing."""
+    record_many(db, [event_row(tool_id, kind, old_value, new_value, **details)])
+
+
+def record_many(db, rows):
+    if not rows:
+        return
+    if SYNC:
+        db.execute(insert(ToolEvent), rows)
+    else:
+        db.info.setdefault(_PENDING, []).extend(rows)
+
+
+def record_new_tools(db, tool_ids):
+    """Logs the create events (status, location) of freshly inserted tools in one INSERT ... SELECT.
+
+    Used by bulk import, where queueing two rows per tool would cost more
+    than the insert itself; written in `db`'s transaction either way.
+    """
+    if not tool_ids:
+        return
+    now = datetime.utcnow()
+    columns = ["tool_id", "kind", "old_value", "new_value", "occurred_at"]
+    for kind, column in ((STATUS, Tool.status), (LOCATION, Tool.location)):
+        db.execute(insert(ToolEvent).from_select(
+            columns,
+            select(Tool.id, literal(kind), literal(None), column, literal(now)).where(Tool.id.in_(tool_ids)),
+        ))
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session):
+    rows = session.info.pop(_PENDING, None)
+    if rows:
+        enqueue(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session):
+    session.info.pop(_PENDING, None)
+
+
+def enqueue(rows):
+    """Queues committed events for the writer thread. Never blocks."""
+    _ensure_worker()
+    overflow = []
+    for row in rows:
+        try:
+            _queue.put_nowait(row)
+        except queue.Full:
+            overflow.append(row)
+    if overflow or _queue.qsize() >= BATCH_SIZE:
+        _wake.set()
+    if overflow:
+        dead_letter(overflow, "event queue full")
+
+
+def _drain(limit):
+    rows = []
+    while len(rows) < limit:
+        try:
+            rows.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+
+def dead_letter(rows, reason):
+    """Sets aside events that cannot be written, in the log and in DEAD_LETTER_PATH."""
+    logger.error("Dead-lettering %d tool events (%s)", len(rows), reason)
+    try:
+        with open(DEAD_LETTER_PATH, "a") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "reason": reason}, default=str) + "\n")
+    except OSError:
+        logger.exception("Could not write dead-lettered tool events: %r", rows)
+
+
+def _bad_data(error):
+    # Errors the same rows will hit again; anything else (connection loss,
+    # lock timeouts) is worth retrying as is.
+    return isinstance(error, (IntegrityError, DataError)) or (
+        isinstance(error, StatementError) and not isinstance(error, DBAPIError)
+    )
+
+
+def flush():
+    """Writes everything queued so far. Returns the number of events written.
+
+    Stops early, keeping the failed batch for the next call, when the
+    database cannot be reached.
+    """
+    written = 0
+    with _flush_lock:
+        while True:
+            if _retry:
+                rows, attempts = _retry.pop(0)
+            else:
+                rows, attempts = _drain(BATCH_SIZE), 0
+            if not rows:
+                return written
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(ToolEvent), rows)
+            except Exception as e:
+                if _bad_data(e):
+                    if len(rows) == 1:
+                        dead_letter(rows, f"rejected: {e}")
+                    else:
+                        middle = len(rows) // 2
+                        _retry[:0] = [[rows[:middle], attempts], [rows[middle:], attempts]]
+                    continue
+                attempts += 1
+                if attempts >= MAX_ATTEMPTS:
+                    dead_letter(rows, f"failed {attempts} times: {e}")
+                    continue
+                logger.warning("Could not write %d tool events (attempt %d): %s", len(rows), attempts, e)
+                _retry.insert(0, [rows, attempts])
+                return written
+            written += len(rows)
+
+
+def _run():
+    while not _stopping.is_set():
+        _wake.wait(FLUSH_INTERVAL_SECONDS)
+        _wake.clear()
+        flush()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        with _flush_lock:
+            if _worker is None or not _worker.is_alive():
+                _stopping.clear()
+                _worker = threading.Thread(target=_run, name="tool-event-writer", daemon=True)
+                _worker.start()
+
+
+def backfill(conn):
+    """Seeds the log with the status changes implied by checkout history. Returns rows inserted.
+
+    Does nothing once any checkout event is logged; tool create events (the
+    demo seed writes some) do not count.
+    """
+    if conn.scalar(select(exists().where(ToolEvent.checkout_id.isnot(None)))):
+        return 0
+    columns = ["tool_id", "kind", "old_value", "new_value", "user_id", "checkout_id", "occurred_at"]
+    inserted = 0
+    for model in (CheckoutArchive, Checkout):
+        out = select(
+            model.tool_id, literal(STATUS), literal("available"), literal("checked_out"),
+            model.user_id, model.id, model.checked_out_at,
+        )
+        back = select(
+            model.tool_id, literal(STATUS), literal("checked_out"), literal("available"),
+            model.user_id, model.id, model.returned_at,
+        ).where(model.returned_at.isnot(None))
+        for query in (out, back):
+            inserted += conn.execute(insert(ToolEvent).from_select(columns, query)).rowcount
+    return inserted
+
+
+def stop():
+    """Stops the writer thread and flushes whatever is still queued."""
+    global _worker
+    _stopping.set()
+    _wake.set()
+    if _worker is not None:
+        _worker.join(timeout=FLUSH_INTERVAL_SECONDS * 2)
+        _worker = None
+    flush()
+
+
+atexit.register(stop)
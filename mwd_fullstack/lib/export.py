@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from fastapi.responses import StreamingResponse
+
+ROWS_PER_CHUNK = 500
+
+
+def iter_csv(header, rows, rows_per_chunk: int = ROWS_PER_CHUNK):
+    """Yields CSV text in chunks so large exports never sit in memory at once."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def iter_jsonl(header, rows, rows_per_chunk: int = ROWS_PER_CHUNK):
+    """Yields one JSON object per line, in chunks of `rows_per_chunk` lines."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(header, row)), default=_json_default))
+        if len(lines) >= rows_per_chunk:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+WRITERS = {
+    "csv": (iter_csv, "text/csv"),
+    "jsonl": (iter_jsonl, "application/x-ndjson"),
+}
+
+
+def iter_export(columns, rows, fmt: str = "csv"):
+    writer, _ = WRITERS[fmt]
+    return writer([column.key for column in columns], rows)
+
+
+def export_response(name: str, columns, rows, fmt: str = "csv"):
+    _, media_type = WRITERS[fmt]
+    return StreamingResponse(
+        iter_export(columns, rows, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
@@ -0,0 +1,53 @@
+"""Rendered-fragment cache for table rows.
+
+Board pages render the same rows over and over while only a few change
+between requests. ``cached_fragment`` (a Jinja global) renders a row
+template once per (template, key) and reuses the HTML afterwards. The key
+is the row's id plus every value the template shows, so a changed row gets
+a new key instead of needing an invalidation. Old keys fall out of the LRU.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import pass_environment
+from markupsafe import Markup
+
+MAX_ENTRIES = int(os.environ.get("FRAGMENT_CACHE_SIZE", 20000))
+
+
+class FragmentCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, env, template_name, key, **context):
+        cache_key = (template_name, key)
+        with self._lock:
+            html = self._entries.get(cache_key)
+            if html is not None:
+                self._entries.move_to_end(cache_key)
+                return html
+        html = Markup(env.get_template(template_name).render(**context))
+        with self._lock:
+            self._entries[cache_key] = html
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = FragmentCache()
+
+
+@pass_environment
+def cached_fragment(env, template_name, key, **context):
+    return cache.render(env, template_name, tuple(key), **context)
+
+
+def install(env):
+    env.globals["cached_fragment"] = cached_fragment
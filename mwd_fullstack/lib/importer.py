@@ -0,0 +1,313 @@
+import csv
+import json
+from datetime import datetime, timezone
+from itertools import islice
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from lib.models.user import User
+from lib.models.tool_type import ToolType
+from lib.models.tool import Tool
+from lib.models.checkout import Checkout
+from lib import events, refdata, summary
+
+BATCH_SIZE = 500
+FORMATS = ("csv", "jsonl")
+TOOL_STATUSES = ("available", "checked_out")
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _int(value):
+    value = _text(value)
+    return int(value) if value is not None else None
+
+def _datetime(value):
+    """Parses ISO 8601; offsets are converted to naive UTC, like every stored timestamp."""
+    value = _text(value)
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _tool_status(value):
+    """Accepts an exported status but always imports the tool as available.
+
+    A checked-out tool becomes checked out again when its open checkout is
+    imported, which is what keeps the status and the checkouts in step.
+    """
+    value = _text(value)
+    if value is None:
+        return None
+    if value not in TOOL_STATUSES:
+        raise ValueError(f"expected one of {', '.join(TOOL_STATUSES)}")
+    return "available"
+
+
+# kind -> (model, unique column, {field: (parser, required)})
+SPECS = {
+    "users": (User, "username", {
+        "username": (_text, True),
+        "full_name": (_text, False),
+        "email": (_text, False),
+        "role": (_text, False),
+    }),
+    "tool_types": (ToolType, "name", {
+        "name": (_text, True),
+        "description": (_text, False),
+    }),
+    "tools": (Tool, "serial_number", {
+        "name": (_text, True),
+        "serial_number": (_text, True),
+        "type_id": (_int, True),
+        "location": (_text, False),
+        "status": (_tool_status, False),
+        "last_calibrated": (_datetime, False),
+    }),
+    "checkouts": (Checkout, None, {
+        "tool_serial_number": (_text, True),
+        "username": (_text, True),
+        "project_location": (_text, True),
+        "due_date": (_datetime, True),
+        "checked_out_at": (_datetime, False),
+        "returned_at": (_datetime, False),
+        "condition_on_return": (_text, False),
+    }),
+}
+
+# Cached reference data made stale by importing each kind.
+INVALIDATES = {
+    "users": (refdata.USERS,),
+    "tool_types": (refdata.TOOL_TYPES,),
+    "tools": (refdata.AVAILABLE_TOOLS,),
+    "checkouts": (refdata.AVAILABLE_TOOLS,),
+}
+
+DEFAULTS = {
+    "users": {"role": "technician"},
+    "tools": {"status": "available"},
+}
+
+
+def read_rows(stream, fmt: str):
+    """Yields (line number, record) for each record of a CSV or JSONL text stream.
+
+    Line numbers are the file's own: the header and blank lines count, and a
+    CSV record with quoted newlines is numbered by the line it ends on. A
+    JSONL line that does not decode is yielded as a ValueError instead, so
+    import_rows reports it against its line and carries on.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, ValueError(f"invalid JSON: {e}")
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+
+
+def _parse(kind: str, raw: dict):
+    if isinstance(raw, ValueError):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError(f"expected an object, got {type(raw).__name__}")
+    _, _, fields = SPECS[kind]
+    record = dict(DEFAULTS.get(kind, {}))
+    for field, (parser, required) in fields.items():
+        try:
+            value = parser(raw.get(field))
+        except ValueError as e:
+            raise ValueError(f"invalid {field}: {raw.get(field)!r}") from e
+        if value is None:
+            if required:
+                raise ValueError(f"missing {field}")
+            continue
+        record[field] = value
+    if "returned_at" in record:
+        # checked_out_at would default to now, after the return.
+        if "checked_out_at" not in record:
+            raise ValueError("returned_at needs checked_out_at")
+        if record["returned_at"] < record["checked_out_at"]:
+            raise ValueError("returned_at is before checked_out_at")
+    return record
+
+
+def _lookup(db: Session, key_column, id_column, keys):
+    if not keys:
+        return {}
+    return dict(db.execute(select(key_column, id_column).where(key_column.in_(keys))).all())
+
+
+def _check_tool_types(db: Session, records, errors):
+    """Rejects tools whose type_id is not a tool type, one lookup query per batch."""
+    type_ids = {record["type_id"] for _, record in records}
+    known = set(db.scalars(select(ToolType.id).where(ToolType.id.in_(type_ids)))) if type_ids else set()
+    accepted = []
+    for line_no, record in records:
+        if record["type_id"] in known:
+            accepted.append((line_no, record))
+        else:
+            errors.append({"line": line_no, "error": f"unknown type_id {record['type_id']!r}"})
+    return accepted
+
+
+def _resolve_checkouts(db: Session, records, errors):
+    """Swaps serial numbers and usernames for ids, one lookup query each per batch."""
+    tool_ids = _lookup(db, Tool.serial_number, Tool.id, {r["tool_serial_number"] for _, r in records})
+    user_ids = _lookup(db, User.username, User.id, {r["username"] for _, r in records})
+    resolved = []
+    for line_no, record in records:
+        serial = record.pop("tool_serial_number")
+        username = record.pop("username")
+        if serial not in tool_ids:
+            errors.append({"line": line_no, "error": f"unknown tool serial {serial!r}"})
+        elif username not in user_ids:
+            errors.append({"line": line_no, "error": f"unknown username {username!r}"})
+        else:
+            record["tool_id"] = tool_ids[serial]
+            record["user_id"] = user_ids[username]
+            resolved.append((line_no, record))
+    return resolved
+
+
+def _claim_tools(db: Session, records, errors):
+    """Marks the tools of open (unreturned) checkouts as checked out, like crud.checkout_tool.
+
+    Uses the same conditional UPDATE, so a tool that is already out (or is
+    opened twice in one batch) keeps a single open checkout; those rows are
+    rejected. Call inside the batch's transaction.
+    """
+    open_tools = {record["tool_id"] for _, record in records if record.get("returned_at") is None}
+    if not open_tools:
+        return records
+    claimed = db.execute(
+        update(Tool)
+        .where(Tool.id.in_(open_tools), Tool.status == "available")
+        .values(status="checked_out")
+        .returning(Tool.id, Tool.type_id, Tool.location)
+        .execution_options(synchronize_session=False)
+    ).all()
+    summary.move_many(db, claimed, "available", "checked_out")
+    free = {row.id for row in claimed}
+    accepted = []
+    for line_no, record in records:
+        if record.get("returned_at") is not None:
+            accepted.append((line_no, record))
+        elif record["tool_id"] in free:
+            free.discard(record["tool_id"])
+            accepted.append((line_no, record))
+        else:
+            errors.append({"line": line_no, "error": "tool is not available for an open checkout"})
+    tools = {row.id: row for row in claimed}
+    summary.open_checkouts(db, [
+        (record["user_id"], tools[record["tool_id"]].type_id, tools[record["tool_id"]].location)
+        for _, record in accepted if record.get("returned_at") is None
+    ])
+    return accepted
+
+
+def _checkout_status_events(created):
+    """Status changes implied by imported checkouts, the same ones events.backfill derives."""
+    rows = []
+    for checkout in created:
+        details = {"user_id": checkout.user_id, "checkout_id": checkout.id}
+        rows.append(events.event_row(
+            checkout.tool_id, events.STATUS, "available", "checked_out", occurred_at=checkout.checked_out_at, **details,
+        ))
+        if checkout.returned_at is not None:
+            rows.append(events.event_row(
+                checkout.tool_id, events.STATUS, "checked_out", "available", occurred_at=checkout.returned_at, **details,
+            ))
+    return rows
+
+
+def import_rows(db: Session, kind: str, rows, batch_size: int = BATCH_SIZE):
+    """Validates and inserts rows in batches, one executemany and commit per batch.
+
+    `rows` yields (line number, record) pairs, as read_rows does; errors are
+    reported against those numbers. Duplicate keys are rejected whether they clash with the database or with
+    an earlier row of the same import. Returns one report entry per batch.
+    """
+    model, unique, _ = SPECS[kind]
+    key_column = getattr(model, unique) if unique else None
+    seen = set()
+    report = []
+    numbered = iter(rows)
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+        errors = []
+        records = []
+        for line_no, raw in batch:
+            try:
+                records.append((line_no, _parse(kind, raw)))
+            except ValueError as e:
+                errors.append({"line": line_no, "error": str(e)})
+
+        if kind == "tools":
+            records = _check_tool_types(db, records, errors)
+        if key_column is not None:
+            keys = {record[unique] for _, record in records}
+            taken = set(db.scalars(select(key_column).where(key_column.in_(keys)))) if keys else set()
+            unique_records = []
+            for line_no, record in records:
+                key = record[unique]
+                if key in taken or key in seen:
+                    errors.append({"line": line_no, "error": f"duplicate {unique} {key!r}"})
+                else:
+                    seen.add(key)
+                    unique_records.append((line_no, record))
+            records = unique_records
+        else:
+            records = _claim_tools(db, _resolve_checkouts(db, records, errors), errors)
+
+        if records:
+            try:
+                values = [record for _, record in records]
+                if kind == "tools":
+                    created = db.scalars(insert(model.__table__).returning(model.id), values).all()
+                    summary.count_new_tools(db, values)
+                    events.record_new_tools(db, created)
+                elif kind == "checkouts":
+                    created = db.execute(
+                        insert(model).returning(
+                            model.id, model.tool_id, model.user_id, model.checked_out_at, model.returned_at,
+                        ),
+                        values,
+                    ).all()
+                    events.record_many(db, _checkout_status_events(created))
+                else:
+                    db.execute(insert(model.__table__), values)
+                db.commit()
+            except IntegrityError as e:
+                db.rollback()
+                errors.append({"line": batch[0][0], "error": f"batch rejected: {e.orig}"})
+                if key_column is not None:
+                    # Nothing was written, so a later batch may still bring these keys.
+                    seen.difference_update(record[unique] for _, record in records)
+                records = []
+        if records:
+            summary.invalidate()
+            refdata.invalidate(*INVALIDATES.get(kind, ()))
+        report.append({
+            "batch": len(report) + 1,
+            "first_line": batch[0][0],
+            "inserted": len(records),
+            "errors": errors,
+        })
+    return report
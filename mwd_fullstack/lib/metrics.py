@@ -0,0 +1,181 @@
+"""Per-request timing: wall time, DB time, SQL statements, SQL rows and template render.
+
+``MetricsMiddleware`` opens a ``RequestStats`` for each HTTP request in a
+context variable. The engine hooks installed by ``lib.db.make_engine`` and
+``TimedTemplates`` add to it from wherever the work runs (threadpool or
+``run_sync`` greenlet both see the same object), and the middleware
+observes the totals into Prometheus histograms labelled by route template.
+
+``SLOW_REQUEST_MS`` turns on a warning log, with every statement and its
+duration, for requests slower than that many milliseconds.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from fastapi.templating import Jinja2Templates
+from sqlalchemy.engine.cursor import CursorFetchStrategy
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 0))
+# Debug output, like /debug/pool: off unless set.
+SQL_COUNT_HEADER = os.environ.get("SQL_COUNT_HEADER", "").lower() in ("1", "true", "yes")
+# Statements kept per request for the slow log.
+MAX_LOGGED_STATEMENTS = 50
+
+LABELS = ("method", "route")
+
+REQUEST_SECONDS = Histogram("mwd_request_seconds", "Request wall time", LABELS)
+DB_SECONDS = Histogram("mwd_request_db_seconds", "Time spent executing SQL per request", LABELS)
+SQL_STATEMENTS = Histogram(
+    "mwd_request_sql_statements", "SQL statements executed per request", LABELS,
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000),
+)
+SQL_ROWS = Histogram(
+    "mwd_request_sql_rows", "Rows returned or changed by SQL per request", LABELS,
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+TEMPLATE_SECONDS = Histogram("mwd_request_template_seconds", "Template render time per request", LABELS)
+POOL = Gauge("mwd_db_pool", "Connection pool state", ("engine", "stat"))
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "db_seconds", "rows", "template_seconds", "statements")
+
+    def __init__(self, keep_statements: bool = False):
+        self.sql_count = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.template_seconds = 0.0
+        self.statements = [] if keep_statements else None
+
+
+_current: ContextVar = ContextVar("request_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+class _CountingFetch(CursorFetchStrategy):
+    """The default fetch strategy, adding each row fetched to a request's stats."""
+
+    __slots__ = ("stats",)
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def fetchone(self, result, dbapi_cursor, hard_close=False):
+        row = super().fetchone(result, dbapi_cursor, hard_close)
+        if row is not None:
+            self.stats.rows += 1
+        return row
+
+    def fetchmany(self, result, dbapi_cursor, size=None):
+        rows = super().fetchmany(result, dbapi_cursor, size)
+        self.stats.rows += len(rows or ())
+        return rows
+
+    def fetchall(self, result, dbapi_cursor):
+        rows = super().fetchall(result, dbapi_cursor)
+        self.stats.rows += len(rows or ())
+        return rows
+
+
+def _count_rows(stats, cursor, context):
+    # DML reports its rowcount everywhere, SELECT only on some drivers
+    # (psycopg2); elsewhere the rows are counted as they are fetched.
+    # Streamed results keep their own buffered strategy and go uncounted.
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        stats.rows += cursor.rowcount
+    elif (
+        cursor.description is not None
+        and context is not None
+        and type(context.cursor_fetch_strategy) is CursorFetchStrategy
+        and not context.execution_options.get("stream_results")
+    ):
+        context.cursor_fetch_strategy = _CountingFetch(stats)
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.sql_count += 1
+    stats.db_seconds += elapsed
+    _count_rows(stats, cursor, context)
+    if stats.statements is not None and len(stats.statements) < MAX_LOGGED_STATEMENTS:
+        stats.statements.append((elapsed, statement))
+
+
+class TimedTemplates(Jinja2Templates):
+    """Jinja2Templates that adds render time to the current request's stats."""
+
+    def TemplateResponse(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().TemplateResponse(*args, **kwargs)
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.template_seconds += time.perf_counter() - start
+
+
+def _route_label(scope):
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are not buffered."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(keep_statements=SLOW_REQUEST_MS > 0)
+        token = _current.set(stats)
+
+        async def send_with_header(message):
+            if SQL_COUNT_HEADER and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-sql-count", str(stats.sql_count).encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            self._observe(scope, stats, elapsed)
+
+    def _observe(self, scope, stats, elapsed):
+        labels = (scope["method"], _route_label(scope))
+        REQUEST_SECONDS.labels(*labels).observe(elapsed)
+        DB_SECONDS.labels(*labels).observe(stats.db_seconds)
+        SQL_STATEMENTS.labels(*labels).observe(stats.sql_count)
+        SQL_ROWS.labels(*labels).observe(stats.rows)
+        TEMPLATE_SECONDS.labels(*labels).observe(stats.template_seconds)
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            logger.warning(
+                "Slow request %s %s: %.1f ms, %d statements (%.1f ms in SQL), %d rows, %.1f ms rendering\n%s",
+                scope["method"], scope["path"], elapsed * 1000, stats.sql_count, stats.db_seconds * 1000,
+                stats.rows, stats.template_seconds * 1000,
+                "\n".join(f"  {seconds * 1000:8.2f} ms  {sql}" for seconds, sql in stats.statements),
+            )
+
+
+def render_latest(pool_snapshots):
+    """Prometheus exposition text; `pool_snapshots` maps engine name to lib.db.pool_stats()."""
+    for name, snapshot in pool_snapshots.items():
+        for stat, value in snapshot.items():
+            if isinstance(value, (int, float)):
+                POOL.labels(name, stat).set(value)
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,263 @@
+"""Versioned schema migrations.
+
+``Base.metadata.create_all`` only creates missing tables, so indexes and
+columns added to existing tables never reach deployed databases. Each entry
+in ``MIGRATIONS`` is applied once, in order, and recorded in
+``schema_migrations``. Steps must be idempotent because a fresh database
+already gets the current schema from ``create_all``.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, inspect, select, text
+
+from lib.db import Base, engine
+from lib import events, models, summary
+from lib.models.tool import TOOL_SEARCH_DDL
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+def _create_indexes(conn, model, *names):
+    for index in model.__table__.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+
+def _add_columns(conn, model, *names):
+    table = model.__table__
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    ddl = conn.dialect.ddl_compiler(conn.dialect, None)
+    for name in names:
+        if name not in existing:
+            spec = ddl.get_column_specification(table.c[name])
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {spec}"))
+
+
+def _search_indexes(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    _create_indexes(conn, models.Tool, "ix_tools_name_trgm", "ix_tools_serial_number_trgm")
+
+
+def _hot_filter_indexes(conn):
+    _create_indexes(conn, models.Tool, "ix_tools_status_serial_number")
+    _create_indexes(conn, models.Checkout, "ix_checkouts_open_tool_id", "ix_checkouts_open_checked_out_at")
+
+
+def _fleet_counts(conn):
+    # Only fleet_counts: checkout counters read checkouts.is_overdue, which
+    # migration 4 adds, so _checkout_counts fills them later.
+    summary.rebuild_fleet(conn)
+
+
+def _due_date_flags(conn):
+    _add_columns(conn, models.Checkout, "is_overdue")
+    _add_columns(conn, models.Tool, "calibration_due")
+    _create_indexes(conn, models.Checkout, "ix_checkouts_open_due_date")
+    _create_indexes(conn, models.Tool, "ix_tools_last_calibrated")
+
+
+def _checkout_archive(conn):
+    # checkout_archive itself comes from create_all; rows move in the background.
+    _create_indexes(conn, models.Checkout, "ix_checkouts_returned_at")
+
+
+def _reservations(conn):
+    # reservations (with its Postgres exclusion constraint) comes from create_all.
+    _create_indexes(conn, models.Tool, "ix_tools_type_id_id")
+
+
+def _reservation_ends_at_index(conn):
+    # Replaces (tool_id, starts_at, ends_at), whose starts_at range matched every past booking.
+    conn.execute(text("DROP INDEX IF EXISTS ix_reservations_tool_window"))
+    _create_indexes(conn, models.Reservation, "ix_reservations_tool_ends_at")
+
+
+def _checkout_counts(conn):
+    # checkout_counts comes from create_all; fill it (and refresh fleet_counts) from current rows.
+    summary.rebuild(conn)
+
+
+def _checkout_history_indexes(conn):
+    _create_indexes(
+        conn, models.Checkout,
+        "ix_checkouts_checked_out_at", "ix_checkouts_tool_checked_out_at", "ix_checkouts_user_checked_out_at",
+    )
+
+
+def _sqlite_search_table(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in TOOL_SEARCH_DDL:
+        conn.execute(text(statement))
+    # Index the tools that predate the table.
+    conn.execute(text("INSERT INTO tools_fts(tools_fts) VALUES ('rebuild')"))
+
+
+def _tool_events(conn):
+    # tool_events comes from create_all; seed it from the checkouts we already have.
+    events.backfill(conn)
+
+
+MIGRATIONS = [
+    (1, "Trigram search indexes on tools", _search_indexes),
+    (2, "Indexes for open checkouts and available tools", _hot_filter_indexes),
+    (3, "Populate fleet_counts from existing tools", _fleet_counts),
+    (4, "Overdue and calibration-due flags with due-date indexes", _due_date_flags),
+    (5, "Checkout archive table and returned-at index", _checkout_archive),
+    (6, "Tool reservations and per-type tool index", _reservations),
+    (7, "Tool event log, backfilled from checkout history", _tool_events),
+    (8, "Reservation overlap index led by ends_at", _reservation_ends_at_index),
+    (9, "Open checkout counters per user, type and location", _checkout_counts),
+    (10, "Checkout history indexes by tool, user and checkout time", _checkout_history_indexes),
+    (11, "FTS5 trigram search table on tools for SQLite", _sqlite_search_table),
+]
+
+
+def upgrade(bind=engine):
+    """Creates missing tables, then applies pending migrations. Returns the versions applied."""
+    applied_now = []
+    with bind.begin() as conn:
+        Base.metadata.create_all(conn)
+        migration_metadata.create_all(conn)
+        done = set(conn.scalars(select(schema_migrations.c.version)))
+        for version, description, step in MIGRATIONS:
+            if version in done:
+                continue
+            step(conn)
+            conn.execute(insert(schema_migrations).values(version=version, description=description))
+            applied_now.append(version)
+    return applied_now
+
+
+def current_version(bind=engine):
+    with bind.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return 0
+        return max(conn.scalars(select(schema_migrations.c.version)), default=0)
+
+
+def _hot_queries():
+    Tool, Checkout = models.Tool, models.Checkout
+    return {
+        "active checkouts board": (
+            select(Checkout)
+            .where(Checkout.returned_at.is_(None))
+            .order_by(Checkout.checked_out_at.desc(), Checkout.id.desc())
+            .limit(51)
+        ),
+        "open checkout for tool": (
+            select(Checkout)
+            .where(Checkout.tool_id == 1, Checkout.returned_at.is_(None))
+        ),
+        "checkout history": (
+            select(Checkout.id)
+            .order_by(Checkout.checked_out_at.desc(), Checkout.id.desc())
+            .limit(51)
+        ),
+        "checkout history for tool": (
+            select(Checkout.id)
+            .where(Checkout.tool_id == 1)
+            .order_by(Checkout.checked_out_at.desc(), Checkout.id.desc())
+            .limit(51)
+        ),
+        "checkout history for user": (
+            select(Checkout.id)
+            .where(Checkout.user_id == 1, Checkout.checked_out_at < datetime(2000, 1, 1))
+            .order_by(Checkout.checked_out_at.desc(), Checkout.id.desc())
+            .limit(51)
+        ),
+        "overdue scan": (
+            select(Checkout.id)
+            .where(Checkout.returned_at.is_(None), Checkout.due_date < datetime(2000, 1, 1))
+        ),
+        "archive age scan": (
+            select(Checkout.id)
+            .where(Checkout.returned_at < datetime(2000, 1, 1))
+            .limit(5000)
+        ),
+        "reservation overlap probe": (
+            select(models.Reservation.id)
+            .where(
+                models.Reservation.tool_id == 1,
+                models.Reservation.starts_at < datetime(2000, 1, 8),
+                models.Reservation.ends_at > datetime(2000, 1, 1),
+            )
+        ),
+        "tool event history": (
+            select(models.ToolEvent.id)
+            .where(models.ToolEvent.tool_id == 1)
+            .order_by(models.ToolEvent.occurred_at)
+        ),
+        "utilisation status scan": (
+            select(models.ToolEvent.id)
+            .where(
+                models.ToolEvent.kind == "status",
+                models.ToolEvent.occurred_at >= datetime(2000, 1, 1),
+                models.ToolEvent.occurred_at < datetime(2000, 2, 1),
+            )
+        ),
+        "utilisation seek before window": (
+            select(models.ToolEvent.id)
+            .where(
+                models.ToolEvent.tool_id == 1,
+                models.ToolEvent.kind == "status",
+                models.ToolEvent.occurred_at < datetime(2000, 1, 1),
+            )
+            .order_by(models.ToolEvent.occurred_at.desc(), models.ToolEvent.id.desc())
+            .limit(1)
+        ),
+        "tools of one type": (
+            select(Tool.id)
+            .where(Tool.type_id == 1)
+            .order_by(Tool.id)
+            .limit(51)
+        ),
+        "calibration scan": (
+            select(Tool.id)
+            .where(Tool.last_calibrated < datetime(2000, 1, 1))
+        ),
+        "available tools": (
+            select(Tool)
+            .where(Tool.status == "available")
+            .order_by(Tool.serial_number)
+            .limit(51)
+        ),
+    }
+
+
+def _full_scans(conn, sql):
+    if conn.dialect.name == "sqlite":
+        plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        return [
+            step for step in plan
+            if step.startswith("SCAN ") and "USING" not in step
+        ]
+    if conn.dialect.name == "postgresql":
+        # Small tables are always cheaper to seq-scan; discourage that so the
+        # plan reflects whether a usable index exists at all.
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}")]
+        return [step.strip() for step in plan if "Seq Scan" in step]
+    return []
+
+
+def check_query_plans(bind=engine):
+    """Returns {query name: [full-scan plan steps]} for hot queries that are not index-backed."""
+    problems = {}
+    with bind.connect() as conn:
+        for name, stmt in _hot_queries().items():
+            sql = str(stmt.compile(conn, compile_kwargs={"literal_binds": True}))
+            scans = _full_scans(conn, sql)
+            if scans:
+                problems[name] = scans
+    return problems
@@ -2,3 +2,8 @@ from .user import User
 from .tool_type import ToolType
 from .tool import Tool
 from .checkout import Checkout
+from .fleet_count import FleetCount
+from .checkout_archive import CheckoutArchive
+from .reservation import Reservation
+from .tool_event import ToolEvent
+from .checkout_count import CheckoutCount
@@ -1,10 +1,40 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Boolean, Index, text, false
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from lib.db import Base
 
 class Checkout(Base):
     __tablename__ = "checkouts"
+    __table_args__ = (
+        # Partial indexes over open checkouts only; returned history never
+        # touches them.
+        Index(
+            "ix_checkouts_open_tool_id", "tool_id",
+            sqlite_where=text("returned_at IS NULL"),
+            postgresql_where=text("returned_at IS NULL"),
+        ),
+        Index(
+            "ix_checkouts_open_checked_out_at", "checked_out_at", "id",
+            sqlite_where=text("returned_at IS NULL"),
+            postgresql_where=text("returned_at IS NULL"),
+        ),
+        Index(
+            "ix_checkouts_open_due_date", "due_date",
+            sqlite_where=text("returned_at IS NULL"),
+            postgresql_where=text("returned_at IS NULL"),
+        ),
+        # Full indexes for history reads, which page open and returned
+        # checkouts together newest first (crud.get_checkout_history).
+        Index("ix_checkouts_checked_out_at", "checked_out_at", "id"),
+        Index("ix_checkouts_tool_checked_out_at", "tool_id", "checked_out_at", "id"),
+        Index("ix_checkouts_user_checked_out_at", "user_id", "checked_out_at", "id"),
+        # Returned rows only, for the archiver's age scan (lib/archive.py).
+        Index(
+            "ix_checkouts_returned_at", "returned_at",
+            sqlite_where=text("returned_at IS NOT NULL"),
+            postgresql_where=text("returned_at IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -20,6 +50,8 @@ class Checkout(Base):
     checked_out_at = Column(DateTime, default=datetime.utcnow)
     returned_at = Column(DateTime, nullable=True)
     condition_on_return = Column(String, nullable=True)
+    # Set by the due-date scheduler (lib/scheduler.py), not computed per render.
+    is_overdue = Column(Boolean, nullable=False, default=False, server_default=false())
 
     user = relationship("User")
-    tool = relationship("Tool", back_populates="checkouts")
\ No newline at end of file
+    tool = relationship("Tool", back_populates="checkouts")
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Index
+from datetime import datetime
+from lib.db import Base
+
+class CheckoutArchive(Base):
+    """Returned checkouts moved out of ``checkouts`` by lib/archive.py.
+
+    Rows keep their original checkout id, so history reads can union both
+    tables and page them with the same cursor.
+    """
+    __tablename__ = "checkout_archive"
+    __table_args__ = (
+        Index("ix_checkout_archive_checked_out_at", "checked_out_at", "id"),
+        Index("ix_checkout_archive_tool_checked_out_at", "tool_id", "checked_out_at", "id"),
+        Index("ix_checkout_archive_user_checked_out_at", "user_id", "checked_out_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    tool_id = Column(Integer, ForeignKey("tools.id"))
+    due_date = Column(DateTime, nullable=False)
+    project_location = Column(String, nullable=False)
+    checked_out_at = Column(DateTime)
+    returned_at = Column(DateTime, nullable=False)
+    condition_on_return = Column(String, nullable=True)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
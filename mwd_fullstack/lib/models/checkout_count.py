@@ -0,0 +1,17 @@
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, UniqueConstraint
+from lib.db import Base
+
+class CheckoutCount(Base):
+    """Open checkouts per (user, tool type, tool location, overdue), kept in step with checkout writes."""
+    __tablename__ = "checkout_counts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "type_id", "location", "overdue", name="uq_checkout_counts_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    type_id = Column(Integer, ForeignKey("tool_types.id"), nullable=True)
+    # Tools without a location are counted under "".
+    location = Column(String, nullable=False, default="")
+    overdue = Column(Boolean, nullable=False, default=False)
+    count = Column(Integer, nullable=False, default=0)
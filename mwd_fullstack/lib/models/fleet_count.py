@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+from lib.db import Base
+
+class FleetCount(Base):
+    """Number of tools per (type, location, status), kept in step with tool writes."""
+    __tablename__ = "fleet_counts"
+    __table_args__ = (
+        UniqueConstraint("type_id", "location", "status", name="uq_fleet_counts_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    type_id = Column(Integer, ForeignKey("tool_types.id"), nullable=True)
+    # Tools without a location are counted under "".
+    location = Column(String, nullable=False, default="")
+    status = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, CheckConstraint, DDL, event, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from datetime import datetime
+from lib.db import Base
+
+class Reservation(Base):
+    """A tool booked for the half-open window [starts_at, ends_at)."""
+    __tablename__ = "reservations"
+    __table_args__ = (
+        CheckConstraint("ends_at > starts_at", name="ck_reservations_window"),
+        # Overlap probes: equality on tool_id, range on ends_at, so bookings
+        # that ended before the window are skipped however much history piles
+        # up; starts_at is carried along to test the other bound in the index.
+        Index("ix_reservations_tool_ends_at", "tool_id", "ends_at", "starts_at"),
+        # On Postgres the database itself refuses overlapping bookings, even
+        # between concurrent transactions.
+        ExcludeConstraint(
+            ("tool_id", "="),
+            (text("tsrange(starts_at, ends_at, '[)')"), "&&"),
+            name="ex_reservations_tool_overlap",
+            using="gist",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tool_id = Column(Integer, ForeignKey("tools.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)
+    project_location = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+event.listen(
+    Reservation.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
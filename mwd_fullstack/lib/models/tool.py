@@ -1,10 +1,27 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index, DDL, event, false
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from lib.db import Base
 
 class Tool(Base):
     __tablename__ = "tools"
+    __table_args__ = (
+        # Trigram indexes back ILIKE '%term%' searches on Postgres.
+        Index(
+            "ix_tools_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_tools_serial_number_trgm", "serial_number",
+            postgresql_using="gin", postgresql_ops={"serial_number": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # Available-tools listing: filter on status, keyset on serial number.
+        Index("ix_tools_status_serial_number", "status", "serial_number"),
+        # Range scans for tools past their calibration interval.
+        Index("ix_tools_last_calibrated", "last_calibrated"),
+        # Per-type listings (reservation availability), keyset on id.
+        Index("ix_tools_type_id_id", "type_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -13,7 +30,37 @@ class Tool(Base):
     location = Column(String, nullable=True)
     status = Column(String, default="available")
     last_calibrated = Column(DateTime, default=datetime.utcnow)
+    # Set by the due-date scheduler, cleared by calibrate_tool.
+    calibration_due = Column(Boolean, nullable=False, default=False, server_default=false())
 
     tool_type = relationship("ToolType", back_populates="tools")
 
     checkouts = relationship("Checkout", back_populates="tool")
+
+
+event.listen(
+    Tool.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# SQLite has no trigram index, so search goes through an FTS5 table with the
+# trigram tokenizer (SQLite 3.34+), which serves substring MATCH. It reads its
+# content from tools; the triggers keep it in step with every write, including
+# the bulk importer's core inserts. Status and location updates skip it.
+TOOL_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tools_fts USING fts5("
+    "name, serial_number, content='tools', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS tools_fts_insert AFTER INSERT ON tools BEGIN "
+    "INSERT INTO tools_fts(rowid, name, serial_number) VALUES (new.id, new.name, new.serial_number); END",
+    "CREATE TRIGGER IF NOT EXISTS tools_fts_delete AFTER DELETE ON tools BEGIN "
+    "INSERT INTO tools_fts(tools_fts, rowid, name, serial_number) "
+    "VALUES ('delete', old.id, old.name, old.serial_number); END",
+    "CREATE TRIGGER IF NOT EXISTS tools_fts_update AFTER UPDATE OF name, serial_number ON tools BEGIN "
+    "INSERT INTO tools_fts(tools_fts, rowid, name, serial_number) "
+    "VALUES ('delete', old.id, old.name, old.serial_number); "
+    "INSERT INTO tools_fts(rowid, name, serial_number) VALUES (new.id, new.name, new.serial_number); END",
+)
+
+for statement in TOOL_SEARCH_DDL:
+    event.listen(Tool.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from datetime import datetime
+from lib.db import Base
+
+class ToolEvent(Base):
+    """Append-only record of a tool's status, location and calibration changes (lib/events.py)."""
+    __tablename__ = "tool_events"
+    __table_args__ = (
+        Index("ix_tool_events_tool_occurred_at", "tool_id", "occurred_at"),
+        Index("ix_tool_events_kind_occurred_at", "kind", "occurred_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tool_id = Column(Integer, ForeignKey("tools.id"), nullable=False)
+    # "status", "location" or "calibration".
+    kind = Column(String, nullable=False)
+    old_value = Column(String, nullable=True)
+    new_value = Column(String, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    checkout_id = Column(Integer, nullable=True)
+    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,58 @@
+"""Read-through cache for reference data.
+
+Tool types, users and the available-tools list change a few times a day but
+are read on almost every page. They are cached as plain column rows (no ORM
+instances, so nothing is tied to the session that loaded them) and dropped
+by the crud write paths that change them.
+"""
+import os
+from bisect import bisect_right
+
+from sqlalchemy import select
+
+from lib.cache import TTLCache
+from lib.models.user import User
+from lib.models.tool_type import ToolType
+from lib.models.tool import Tool
+
+cache = TTLCache(ttl=float(os.environ.get("REFDATA_CACHE_TTL", 300)))
+
+TOOL_TYPES = "tool_types"
+USERS = "users"
+AVAILABLE_TOOLS = "available_tools"
+
+_QUERIES = {
+    TOOL_TYPES: lambda: select(ToolType.id, ToolType.name, ToolType.description).order_by(ToolType.id),
+    USERS: lambda: select(User.id, User.username, User.full_name, User.email, User.role).order_by(User.id),
+    AVAILABLE_TOOLS: lambda: (
+        select(Tool.id, Tool.name, Tool.serial_number)
+        .where(Tool.status == "available")
+        .order_by(Tool.serial_number)
+    ),
+}
+
+
+def entry(db, name: str):
+    """Returns the CacheEntry (rows, version, modified_at) for one data set."""
+    return cache.get_entry(name, lambda: db.execute(_QUERIES[name]()).all())
+
+
+def tool_types(db):
+    return entry(db, TOOL_TYPES)
+
+def users(db):
+    return entry(db, USERS)
+
+def available_tools(db):
+    return entry(db, AVAILABLE_TOOLS)
+
+
+def invalidate(*names):
+    for name in names:
+        cache.invalidate(name)
+
+
+def page_after(rows, after_id, size):
+    """Keyset page over cached rows sorted by id: up to `size` rows with id > after_id."""
+    start = 0 if after_id is None else bisect_right(rows, after_id, key=lambda row: row.id)
+    return rows[start:start + size]
@@ -0,0 +1,135 @@
+"""Utilisation report built from the tool event log.
+
+Hours out are the time between a tool's "checked_out" status event and the
+status event after it. Only the status events inside the report window are
+read (a range on ``ix_tool_events_kind_occurred_at``), plus, per tool, a seek
+through ``ix_tool_events_tool_occurred_at`` to the last one before the
+window, which says whether the tool was already out when it opened. One
+windowed query (``LEAD`` over those events per tool) turns them into
+out-intervals, with each tool's type joined in SQL; the intervals are then
+clipped to the window, split at month boundaries and summed per (tool or
+type, month) in a single pass. The cost grows with the status events in
+range plus one index seek per tool, not with the length of the log.
+"""
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import func, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from lib.models.fleet_count import FleetCount
+from lib.models.tool import Tool
+from lib.models.tool_type import ToolType
+from lib.models.tool_event import ToolEvent
+from lib import events
+
+GROUPS = ("tool", "type")
+
+
+def _month_start(moment: datetime):
+    return datetime(moment.year, moment.month, 1)
+
+
+def _next_month(moment: datetime):
+    return datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+
+
+def split_by_month(start: datetime, end: datetime):
+    """Yields (first day of month, seconds) for every month that [start, end) touches."""
+    month = _month_start(start)
+    while start < end:
+        boundary = min(_next_month(month), end)
+        yield month, (boundary - start).total_seconds()
+        start, month = boundary, _next_month(month)
+
+
+def _status_events(starts_at: datetime, ends_at: datetime, tool_id: int = None):
+    columns = (ToolEvent.id, ToolEvent.tool_id, ToolEvent.new_value, ToolEvent.occurred_at)
+    in_range = select(*columns).where(ToolEvent.kind == events.STATUS, ToolEvent.occurred_at < ends_at)
+    if tool_id is not None:
+        in_range = in_range.where(ToolEvent.tool_id == tool_id)
+    if starts_at is None:
+        return in_range.subquery()
+
+    last_before = (
+        select(ToolEvent.id)
+        .where(ToolEvent.tool_id == Tool.id, ToolEvent.kind == events.STATUS, ToolEvent.occurred_at < starts_at)
+        .order_by(ToolEvent.occurred_at.desc(), ToolEvent.id.desc())
+        .limit(1)
+        .correlate(Tool)
+        .scalar_subquery()
+    )
+    seeks = select(last_before).select_from(Tool)
+    if tool_id is not None:
+        seeks = seeks.where(Tool.id == tool_id)
+    before = select(*columns).where(ToolEvent.id.in_(seeks))
+    return union_all(in_range.where(ToolEvent.occurred_at >= starts_at), before).subquery()
+
+
+def _out_intervals(db: Session, starts_at: datetime, ends_at: datetime, tool_id: int = None):
+    """(tool_id, type_id, started_at, ended_at) for every out-interval that can meet the window."""
+    status = _status_events(starts_at, ends_at, tool_id)
+    windowed = select(
+        status.c.tool_id,
+        status.c.new_value,
+        status.c.occurred_at.label("started_at"),
+        func.lead(status.c.occurred_at, type_=ToolEvent.occurred_at.type)
+        .over(partition_by=status.c.tool_id, order_by=(status.c.occurred_at, status.c.id))
+        .label("ended_at"),
+    ).subquery()
+    intervals = (
+        select(windowed.c.tool_id, Tool.type_id, windowed.c.started_at, windowed.c.ended_at)
+        .join(Tool, Tool.id == windowed.c.tool_id)
+        .where(windowed.c.new_value == "checked_out")
+    )
+    if starts_at is not None:
+        intervals = intervals.where(or_(windowed.c.ended_at.is_(None), windowed.c.ended_at > starts_at))
+    return db.execute(intervals)
+
+
+def utilisation(db: Session, group: str = "tool", starts_at: datetime = None, ends_at: datetime = None,
+                tool_id: int = None):
+    """Hours checked out per tool (or tool type) per month within [starts_at, ends_at).
+
+    An interval without a following status event is still open and counts up
+    to `ends_at` (default now). Returns dicts sorted by month, then key.
+    """
+    ends_at = min(ends_at or datetime.utcnow(), datetime.utcnow())
+    intervals = _out_intervals(db, starts_at, ends_at, tool_id)
+    starts_at = starts_at or datetime.min
+
+    seconds = Counter()
+    checkouts = Counter()
+    for tool, type_id, started_at, ended_at in intervals:
+        start = max(started_at, starts_at)
+        end = min(ended_at or ends_at, ends_at)
+        if start >= end:
+            continue
+        key = type_id if group == "type" else tool
+        for month, spent in split_by_month(start, end):
+            seconds[key, month] += spent
+            checkouts[key, month] += 1
+
+    if group == "type":
+        names = dict(db.execute(select(ToolType.id, ToolType.name)).all())
+        # Tools per type from the dashboard counters: O(types x locations), not a scan of tools.
+        fleet = Counter(dict(db.execute(
+            select(FleetCount.type_id, func.sum(FleetCount.count)).group_by(FleetCount.type_id)
+        ).all()))
+    else:
+        names = dict(db.execute(select(Tool.id, Tool.serial_number).where(Tool.id.in_({key for key, _ in seconds}))).all())
+        fleet = Counter()
+
+    rows = []
+    for (key, month), spent in sorted(seconds.items(), key=lambda item: (item[0][1], item[0][0] or 0)):
+        window = (min(_next_month(month), ends_at) - max(month, starts_at)).total_seconds()
+        capacity = window * (fleet[key] if group == "type" else 1)
+        rows.append({
+            "key": key,
+            "name": names.get(key),
+            "month": month.strftime("%Y-%m"),
+            "hours_out": round(spent / 3600, 2),
+            "checkouts": checkouts[key, month],
+            "utilisation": round(spent / capacity, 4) if capacity else None,
+        })
+    return rows
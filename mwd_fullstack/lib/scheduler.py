@@ -0,0 +1,117 @@
+"""Background due-date checks.
+
+Periodically flags open checkouts that are past their due date and tools
+that are past their calibration interval, so pages read a stored flag
+instead of comparing dates per row. Both scans are range queries on indexed
+columns (``ix_checkouts_open_due_date``, ``ix_tools_last_calibrated``) and
+only write rows whose flag actually changes.
+
+Every ``ARCHIVE_INTERVAL_SECONDS`` the same loop also moves old returned
+checkouts into the archive table (lib/archive.py).
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+
+from lib.db import SessionLocal
+from lib.models.tool import Tool
+from lib.models.checkout import Checkout
+from lib import archive, summary
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("SCHEDULER_ENABLED", "1").lower() in ("1", "true", "yes")
+INTERVAL_SECONDS = float(os.environ.get("SCHEDULER_INTERVAL_SECONDS", 300))
+CALIBRATION_INTERVAL = timedelta(days=int(os.environ.get("CALIBRATION_INTERVAL_DAYS", 180)))
+
+
+def flag_overdue_checkouts(db, now: datetime):
+    flagged = db.execute(
+        update(Checkout)
+        .where(
+            Checkout.returned_at.is_(None),
+            Checkout.due_date < now,
+            Checkout.is_overdue.is_(False),
+        )
+        .values(is_overdue=True)
+        .returning(Checkout.user_id, Checkout.tool_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if flagged:
+        tools = {
+            tool_id: (type_id, location)
+            for tool_id, type_id, location in db.execute(
+                select(Tool.id, Tool.type_id, Tool.location).where(Tool.id.in_({row.tool_id for row in flagged}))
+            )
+        }
+        summary.flag_overdue(db, [(row.user_id, *tools[row.tool_id]) for row in flagged])
+    return len(flagged)
+
+
+def flag_calibration_due(db, now: datetime):
+    return db.execute(
+        update(Tool)
+        .where(
+            Tool.last_calibrated < now - CALIBRATION_INTERVAL,
+            Tool.calibration_due.is_(False),
+        )
+        .values(calibration_due=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def run_due_checks(now: datetime = None):
+    """Runs one pass of both checks in a single transaction. Returns the rows flagged."""
+    now = now or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        overdue = flag_overdue_checkouts(db, now)
+        calibration = flag_calibration_due(db, now)
+        db.commit()
+    finally:
+        db.close()
+    if overdue or calibration:
+        summary.invalidate()
+    return overdue, calibration
+
+
+async def _run_forever(interval: float):
+    loop = asyncio.get_running_loop()
+    next_archive = loop.time()
+    while True:
+        try:
+            overdue, calibration = await run_in_threadpool(run_due_checks)
+            if overdue or calibration:
+                logger.info("Flagged %d overdue checkouts, %d tools due for calibration", overdue, calibration)
+        except Exception:
+            logger.exception("Due-date check failed")
+        if loop.time() >= next_archive:
+            next_archive = loop.time() + archive.INTERVAL_SECONDS
+            try:
+                moved = await run_in_threadpool(archive.archive_returned)
+                if moved:
+                    logger.info("Archived %d returned checkouts", moved)
+            except Exception:
+                logger.exception("Checkout archiving failed")
+        await asyncio.sleep(interval)
+
+
+def start(interval: float = INTERVAL_SECONDS):
+    """Starts the periodic checks on the running event loop, unless disabled."""
+    if not ENABLED:
+        return None
+    return asyncio.create_task(_run_forever(interval), name="due-date-scheduler")
+
+
+async def stop(task):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
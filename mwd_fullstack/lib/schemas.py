@@ -0,0 +1,137 @@
+"""Request and response models for the JSON API."""
+from datetime import date, datetime, timezone
+from typing import Annotated, Generic, List, Optional, TypeVar
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field
+
+T = TypeVar("T")
+
+BATCH_LIMIT = 500
+
+
+def naive_utc(value: datetime):
+    """Converts an aware datetime to naive UTC, the form every timestamp is stored in."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Accepts ISO 8601 with or without an offset; naive input is taken as UTC.
+UtcDateTime = Annotated[datetime, AfterValidator(naive_utc)]
+
+
+class Row(BaseModel):
+    # Built from SQLAlchemy column rows, which expose fields as attributes.
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ToolTypeOut(Row):
+    id: int
+    name: str
+    description: Optional[str] = None
+
+
+class UserOut(Row):
+    id: int
+    username: str
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[str] = None
+
+
+class ToolOut(Row):
+    id: int
+    name: str
+    serial_number: str
+    type_id: Optional[int] = None
+    location: Optional[str] = None
+    status: Optional[str] = None
+    last_calibrated: Optional[datetime] = None
+    calibration_due: bool = False
+
+
+class CheckoutOut(Row):
+    id: int
+    tool_id: int
+    tool_serial_number: str
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    project_location: str
+    checked_out_at: Optional[datetime] = None
+    due_date: datetime
+    is_overdue: bool = False
+
+
+class CheckoutHistoryOut(Row):
+    id: int
+    tool_id: Optional[int] = None
+    tool_serial_number: Optional[str] = None
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    project_location: str
+    checked_out_at: Optional[datetime] = None
+    due_date: datetime
+    returned_at: Optional[datetime] = None
+    condition_on_return: Optional[str] = None
+    # True when the row has been moved to checkout_archive.
+    archived: bool = False
+
+
+class ReservationOut(Row):
+    id: int
+    tool_id: int
+    tool_serial_number: str
+    user_id: int
+    username: Optional[str] = None
+    starts_at: datetime
+    ends_at: datetime
+    project_location: Optional[str] = None
+
+
+class ReservationIn(BaseModel):
+    tool_id: int
+    user_id: int
+    # Half-open window: the tool is free again at ends_at.
+    starts_at: UtcDateTime
+    ends_at: UtcDateTime
+    project_location: Optional[str] = None
+
+
+class UtilisationOut(BaseModel):
+    # Tool id or tool type id, depending on the report's group.
+    key: Optional[int] = None
+    name: Optional[str] = None
+    month: str
+    hours_out: float
+    checkouts: int
+    # Share of the month (within the report window) spent checked out.
+    utilisation: Optional[float] = None
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    # Pass back as `after` (or `cursor` for checkouts) to fetch the next page.
+    next: Optional[str] = None
+
+
+class BatchCheckoutIn(BaseModel):
+    user_id: int
+    project_location: str
+    due_date: date
+    serial_numbers: List[str] = Field(min_length=1, max_length=BATCH_LIMIT)
+
+
+class BatchReturnIn(BaseModel):
+    serial_numbers: List[str] = Field(min_length=1, max_length=BATCH_LIMIT)
+    condition: str = "Good"
+
+
+class BatchCheckoutOut(Row):
+    id: int
+    tool_id: int
+
+
+class BatchResult(BaseModel):
+    # One entry per checkout opened or closed by the batch.
+    checkouts: List[BatchCheckoutOut]
+    count: int
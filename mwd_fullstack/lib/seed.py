@@ -0,0 +1,116 @@
+"""Demo data for a fresh database.
+
+Seeding is one transaction and is skipped after a single existence check,
+so it is cheap to run on every deploy.
+"""
+from sqlalchemy import select
+
+from lib.db import SessionLocal, engine
+from lib.models.user import User
+from lib.models.tool_type import ToolType
+from lib.models.tool import Tool
+from lib import events, migrations, refdata, summary
+
+TOOL_TYPES_DATA = [
+    ("Drilling Bits", "Fixed cutter and roller cone drill bits for various formations"),
+    ("Measurement While Drilling (MWD)", "Real-time downhole measurement tools for directional data"),
+    ("Logging While Drilling (LWD)", "Formation evaluation tools that measure petrophysical properties"),
+    ("Directional Drilling Tools", "Bent housing motors, rotary steerable systems for wellbore navigation"),
+    ("Downhole Motors", "Positive displacement motors for directional drilling"),
+    ("Stabilizers", "Blades and sleeve stabilizers for wellbore stability"),
+    ("Reamers", "Hole enlargement tools and back reamers"),
+    ("Drill Pipe", "Heavy weight drill pipe and drill collars"),
+    ("Mud Motors", "Turbodrilling motors and performance motors"),
+    ("Survey Instruments", "Multi-shot and single-shot survey tools")
+]
+
+USERS_DATA = [
+    ("john_kamau", "John Kamau", "john.kamau@gmail.com", "drilling_engineer"),
+    ("prince_kibali", "Prince Kibali", "prince.kibali@gmail.com", "mwd_technician"),
+    ("simon_njoroge", "Simon Njoroge", "simon.njoroge@gmail.com", "tool_push"),
+    ("edwin_omondi", "Edwin Omondi", "edwin.omondi@gmail.com", "mud_engineer"),
+    ("ann_kwamboka", "Ann Kwamboka", "ann.kwamboka@gmail.com", "rig_manager")
+]
+
+# (name, serial number, 1-based index into TOOL_TYPES_DATA, location)
+TOOLS_DATA = [
+    ("PDC Bit 8.5\"", "MWDBIT-001", 1, "Drill Bits Storage"),
+    ("Tricone Bit 12.25\"", "MWDBIT-002", 1, "Drill Bits Storage"),
+    ("PDC Bit 6\"", "MWDBIT-003", 1, "Drill Bits Storage"),
+
+    ("PowerPulse MWD System", "MWDSYS-001", 2, "MWD Electronics Bay"),
+    ("TeleScope MWD Tool", "MWDSYS-002", 2, "MWD Electronics Bay"),
+    ("SlimPulse MWD", "MWDSYS-003", 2, "MWD Electronics Bay"),
+
+    ("EcoScope Multiple Propagation Resistivity", "LWDTOOL-001", 3, "LWD Tool Storage"),
+    ("SonicVision Sonic Tool", "LWDTOOL-002", 3, "LWD Tool Storage"),
+    ("Azimuthal Litho-Density Tool", "LWDTOOL-003", 3, "LWD Tool Storage"),
+
+    ("Navi-Drill RSS", "DDSYS-001", 4, "Directional Tools Bay"),
+    ("PowerDrive RSS", "DDSYS-002", 4, "Directional Tools Bay"),
+    ("AutoTrak RSS", "DDSYS-003", 4, "Directional Tools Bay"),
+
+    ("Hamilton Motor 8\"", "DHMOTOR-001", 5, "Downhole Motors Storage"),
+    ("Navi-Drill X-treme Motor", "DHMOTOR-002", 5, "Downhole Motors Storage"),
+    ("PowerPak Motor", "DHMOTOR-003", 5, "Downhole Motors Storage"),
+
+    ("Spiral Blade Stabilizer 8.5\"", "STABIL-001", 6, "Stabilizers Storage"),
+    ("Integral Blade Stabilizer", "STABIL-002", 6, "Stabilizers Storage"),
+    ("String Stabilizer", "STABIL-003", 6, "Stabilizers Storage"),
+]
+
+
+def seed_database(db=None):
+    """Inserts the demo fleet unless any tool type exists. Returns True if it seeded."""
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        if db.execute(select(ToolType.id).limit(1)).first() is not None:
+            return False
+
+        types = [ToolType(name=name, description=description) for name, description in TOOL_TYPES_DATA]
+        db.add_all(types)
+        db.add_all(
+            User(username=username, full_name=full_name, email=email, role=role)
+            for username, full_name, email, role in USERS_DATA
+        )
+        db.flush()
+
+        tools = [
+            Tool(name=name, serial_number=serial_number, type_id=types[type_index - 1].id,
+                 location=location, status="available")
+            for name, serial_number, type_index, location in TOOLS_DATA
+        ]
+        db.add_all(tools)
+        db.flush()
+        # Same create events as crud.create_tool and the tools import.
+        events.record_many(db, [
+            event
+            for t in tools
+            for event in (
+                events.event_row(t.id, events.STATUS, None, t.status),
+                events.event_row(t.id, events.LOCATION, None, t.location),
+            )
+        ])
+        summary.count_new_tools(db, [
+            {"type_id": t.type_id, "location": t.location, "status": t.status} for t in tools
+        ])
+        db.commit()
+        summary.invalidate()
+        refdata.invalidate(refdata.TOOL_TYPES, refdata.USERS, refdata.AVAILABLE_TOOLS)
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
+
+
+def init_db(bind=engine):
+    """Applies pending migrations and seeds an empty database."""
+    applied = migrations.upgrade(bind)
+    if applied:
+        print(f" Applied schema migrations {', '.join(map(str, applied))}")
+    if seed_database():
+        print(" Database seeded with initial MWD equipment data")
@@ -0,0 +1,262 @@
+"""Fleet counters for the dashboard.
+
+``fleet_counts`` holds one row per (tool type, location, status) with the
+number of tools in it, and ``checkout_counts`` one row per (user, tool type,
+tool location, overdue) with the number of open checkouts. The crud write
+paths (and the scheduler, for overdue flags) adjust them in the same
+transaction as the change, so dashboard reads cost O(types x locations +
+users with tools out) rather than a scan of ``tools`` or ``checkouts``.
+``rebuild`` recomputes both from scratch.
+
+Counter rows are always locked in one order, fleet counters before
+checkout counters and sorted keys within each, so concurrent writers
+cannot deadlock on them.
+"""
+import os
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from lib.cache import TTLCache
+from lib.models.tool import Tool
+from lib.models.tool_type import ToolType
+from lib.models.checkout import Checkout
+from lib.models.user import User
+from lib.models.fleet_count import FleetCount
+from lib.models.checkout_count import CheckoutCount
+
+cache = TTLCache(ttl=float(os.environ.get("SUMMARY_CACHE_TTL", 30)))
+
+_UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+FLEET_KEY = ("type_id", "location", "status")
+CHECKOUT_KEY = ("user_id", "type_id", "location", "overdue")
+
+
+def _sort_key(key):
+    # type_id can be NULL; keep None comparable with ints.
+    return tuple((value is None, value) for value in key)
+
+
+def _upsert(db, model, columns, deltas):
+    """Adds each {key: delta} to its counter in one multi-row upsert, rows in sorted key order.
+
+    Every writer locks counter rows in that same order, so a checkout and a
+    concurrent return in the same type and location cannot each hold one
+    row while waiting for the other.
+    """
+    rows = [dict(zip(columns, key), count=deltas[key]) for key in sorted(deltas, key=_sort_key) if deltas[key]]
+    if not rows:
+        return
+    upsert = _UPSERTS[db.get_bind().dialect.name](model).values(rows)
+    db.execute(upsert.on_conflict_do_update(
+        index_elements=[getattr(model, column) for column in columns],
+        set_={"count": model.count + upsert.excluded.count},
+    ))
+
+
+def adjust(db, type_id, location, status, delta: int):
+    """Adds `delta` to one counter with a single upsert; call before committing."""
+    apply(db, {(type_id, location, status): delta})
+
+
+def apply(db, deltas):
+    """Applies {(type_id, location, status): delta} in one upsert; call before committing."""
+    merged = Counter()
+    for (type_id, location, status), delta in deltas.items():
+        merged[type_id, location or "", status] += delta
+    _upsert(db, FleetCount, FLEET_KEY, merged)
+
+
+def move(db, type_id, location, old_status, new_status):
+    if old_status == new_status:
+        return
+    apply(db, {(type_id, location or "", old_status): -1, (type_id, location or "", new_status): 1})
+
+
+def move_many(db, tools, old_status, new_status):
+    """Moves a batch of tools (rows with type_id and location) between statuses."""
+    if old_status == new_status:
+        return
+    deltas = Counter()
+    for tool in tools:
+        deltas[tool.type_id, tool.location or "", old_status] -= 1
+        deltas[tool.type_id, tool.location or "", new_status] += 1
+    apply(db, deltas)
+
+
+def count_new_tools(db, records):
+    """Adds freshly inserted tool rows (dicts) to the counters, one upsert per key."""
+    apply(db, Counter((r.get("type_id"), r.get("location") or "", r.get("status", "available")) for r in records))
+
+
+def apply_checkouts(db, deltas):
+    """Applies {(user_id, type_id, location, overdue): delta} in one upsert, after any `apply`."""
+    merged = Counter()
+    for (user_id, type_id, location, overdue), delta in deltas.items():
+        merged[user_id, type_id, location or "", bool(overdue)] += delta
+    _upsert(db, CheckoutCount, CHECKOUT_KEY, merged)
+
+
+def open_checkouts(db, keys):
+    """Counts new open checkouts, given (user_id, type_id, location) per checkout."""
+    apply_checkouts(db, Counter((user_id, type_id, location or "", False) for user_id, type_id, location in keys))
+
+
+def close_checkouts(db, keys):
+    """Uncounts returned checkouts, given (user_id, type_id, location, is_overdue) per checkout."""
+    deltas = Counter()
+    for user_id, type_id, location, overdue in keys:
+        deltas[user_id, type_id, location or "", bool(overdue)] -= 1
+    apply_checkouts(db, deltas)
+
+
+def flag_overdue(db, keys):
+    """Moves open checkouts, given (user_id, type_id, location) each, to the overdue counters."""
+    deltas = Counter()
+    for user_id, type_id, location in keys:
+        deltas[user_id, type_id, location or "", False] -= 1
+        deltas[user_id, type_id, location or "", True] += 1
+    apply_checkouts(db, deltas)
+
+
+def invalidate():
+    cache.invalidate()
+
+
+def _fresh_counts():
+    return (
+        select(
+            Tool.type_id,
+            func.coalesce(Tool.location, "").label("location"),
+            func.coalesce(Tool.status, "available").label("status"),
+            func.count().label("count"),
+        )
+        .group_by(Tool.type_id, func.coalesce(Tool.location, ""), func.coalesce(Tool.status, "available"))
+    )
+
+
+def _fresh_checkout_counts():
+    location = func.coalesce(Tool.location, "")
+    return (
+        select(Checkout.user_id, Tool.type_id, location.label("location"), Checkout.is_overdue, func.count().label("count"))
+        .join(Tool, Tool.id == Checkout.tool_id)
+        .where(Checkout.returned_at.is_(None))
+        .group_by(Checkout.user_id, Tool.type_id, location, Checkout.is_overdue)
+    )
+
+
+def rebuild_fleet(db):
+    """Recomputes fleet_counts from the tools table alone. Accepts a Session or Connection."""
+    db.execute(delete(FleetCount))
+    db.execute(insert(FleetCount).from_select(
+        ["type_id", "location", "status", "count"], _fresh_counts(),
+    ))
+
+
+def rebuild(db):
+    """Recomputes every counter from the tools and checkouts tables. Accepts a Session or Connection."""
+    rebuild_fleet(db)
+    db.execute(delete(CheckoutCount))
+    db.execute(insert(CheckoutCount).from_select(
+        ["user_id", "type_id", "location", "overdue", "count"], _fresh_checkout_counts(),
+    ))
+
+
+def _drift(stored_rows, actual_rows):
+    stored = {tuple(row[:-1]): row[-1] for row in stored_rows}
+    actual = {tuple(row[:-1]): row[-1] for row in actual_rows}
+    return {
+        key: (stored.get(key, 0), actual.get(key, 0))
+        for key in stored.keys() | actual.keys()
+        if stored.get(key, 0) != actual.get(key, 0)
+    }
+
+
+def verify(db):
+    """Returns {(table, *key): (stored, actual)} for every counter that is off."""
+    fleet = _drift(
+        db.execute(select(FleetCount.type_id, FleetCount.location, FleetCount.status, FleetCount.count)),
+        db.execute(_fresh_counts()),
+    )
+    checkouts = _drift(
+        db.execute(select(
+            CheckoutCount.user_id, CheckoutCount.type_id, CheckoutCount.location, CheckoutCount.overdue,
+            CheckoutCount.count,
+        )),
+        ((user_id, type_id, location, bool(overdue), count) for user_id, type_id, location, overdue, count
+         in db.execute(_fresh_checkout_counts())),
+    )
+    return {
+        **{(FleetCount.__tablename__, *key): counts for key, counts in fleet.items()},
+        **{(CheckoutCount.__tablename__, *key): counts for key, counts in checkouts.items()},
+    }
+
+
+def _empty_row(name):
+    return {"name": name, "available": 0, "checked_out": 0, "overdue": 0, "total": 0}
+
+
+def _load(db):
+    type_names = dict(db.execute(select(ToolType.id, ToolType.name)).all())
+    by_type, by_location = {}, {}
+    for type_id, location, status, count in db.execute(
+        select(FleetCount.type_id, FleetCount.location, FleetCount.status, FleetCount.count)
+        .where(FleetCount.count != 0)
+    ):
+        for bucket, key, name in (
+            (by_type, type_id, type_names.get(type_id, "Unassigned")),
+            (by_location, location, location or "Unassigned"),
+        ):
+            row = bucket.setdefault(key, _empty_row(name))
+            row["total"] += count
+            if status in ("available", "checked_out"):
+                row[status] += count
+
+    # Overdue depends on the clock, so the scheduler moves open checkouts
+    # between the overdue and on-time counters as it flags them.
+    by_user = {}
+    for user_id, type_id, location, overdue, count in db.execute(
+        select(CheckoutCount.user_id, CheckoutCount.type_id, CheckoutCount.location, CheckoutCount.overdue,
+               CheckoutCount.count)
+        .where(CheckoutCount.count != 0)
+    ):
+        user = by_user.setdefault(user_id, {"checked_out": 0, "overdue": 0})
+        user["checked_out"] += count
+        if overdue:
+            user["overdue"] += count
+            by_type.setdefault(type_id, _empty_row(type_names.get(type_id, "Unassigned")))["overdue"] += count
+            by_location.setdefault(location, _empty_row(location or "Unassigned"))["overdue"] += count
+    names = {
+        user_id: full_name or username
+        for user_id, username, full_name in db.execute(
+            select(User.id, User.username, User.full_name).where(User.id.in_(by_user))
+        )
+    } if by_user else {}
+    by_user = sorted(
+        ({"name": names.get(user_id), **counts} for user_id, counts in by_user.items() if counts["checked_out"]),
+        key=lambda r: (-r["checked_out"], r["name"] or ""),
+    )
+
+    totals = _empty_row("All tools")
+    for row in by_type.values():
+        for field in ("available", "checked_out", "overdue", "total"):
+            totals[field] += row[field]
+
+    return {
+        "totals": totals,
+        "by_type": sorted(by_type.values(), key=lambda r: r["name"]),
+        "by_location": sorted(by_location.values(), key=lambda r: r["name"]),
+        "by_user": by_user,
+    }
+
+
+def fleet_summary_entry(db):
+    """Dashboard counts as a CacheEntry, served from the in-process cache."""
+    return cache.get_entry("fleet", lambda: _load(db))
+
+
+def fleet_summary(db):
+    return fleet_summary_entry(db).value
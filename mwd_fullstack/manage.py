@@ -0,0 +1,168 @@
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+from lib.db import SessionLocal
+from lib import archive, assets, crud, export, importer, migrations, summary, seed
+
+EXPORTS = {
+    "users": (crud.USER_EXPORT_COLUMNS, crud.iter_users),
+    "tools": (crud.TOOL_EXPORT_COLUMNS, crud.iter_tools),
+    "checkouts": (crud.CHECKOUT_EXPORT_COLUMNS, crud.iter_checkouts),
+}
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    return ext if ext in importer.FORMATS else "csv"
+
+
+def cmd_import(args):
+    fmt = _format_for(args.path, args.format)
+    db = SessionLocal()
+    try:
+        with open(args.path, newline="", encoding="utf-8") as f:
+            report = importer.import_rows(db, args.kind, importer.read_rows(f, fmt), args.batch_size)
+    finally:
+        db.close()
+    inserted = 0
+    for batch in report:
+        inserted += batch["inserted"]
+        for error in batch["errors"]:
+            print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    rejected = sum(len(batch["errors"]) for batch in report)
+    print(f"Imported {inserted} {args.kind} in {len(report)} batches, {rejected} rejected")
+    return 1 if rejected else 0
+
+
+def cmd_export(args):
+    fmt = _format_for(args.output or "", args.format)
+    columns, rows = EXPORTS[args.kind]
+    db = SessionLocal()
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for chunk in export.iter_export(columns, rows(db), fmt):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        db.close()
+    return 0
+
+
+def cmd_migrate(args):
+    applied = migrations.upgrade()
+    if applied:
+        print(f"Applied migrations {', '.join(map(str, applied))}")
+    print(f"Schema is at version {migrations.current_version()}")
+    return 0
+
+
+def cmd_init_db(args):
+    seed.init_db()
+    print(f"Schema is at version {migrations.current_version()}")
+    return 0
+
+
+def cmd_seed(args):
+    print("Seeded demo data" if seed.seed_database() else "Database already has data, nothing seeded")
+    return 0
+
+
+def cmd_check_plans(args):
+    problems = migrations.check_query_plans()
+    for name, scans in problems.items():
+        print(f"{name}: full scan", file=sys.stderr)
+        for step in scans:
+            print(f"    {step}", file=sys.stderr)
+    if not problems:
+        print("All hot queries are index-backed")
+    return 1 if problems else 0
+
+
+def cmd_rebuild_summary(args):
+    db = SessionLocal()
+    try:
+        drift = summary.verify(db)
+        for (table, *key), (stored, actual) in sorted(drift.items(), key=str):
+            print(f"{table} {tuple(key)}: stored {stored}, actual {actual}")
+        if args.check:
+            print("Fleet counters are consistent" if not drift else f"{len(drift)} fleet counters are off")
+            return 1 if drift else 0
+        summary.rebuild(db)
+        db.commit()
+        remaining = summary.verify(db)
+    finally:
+        db.close()
+    print(f"Rebuilt fleet counters ({len(drift)} corrected)")
+    return 1 if remaining else 0
+
+
+def cmd_archive(args):
+    moved = archive.archive_returned(older_than=timedelta(days=args.older_than_days), batch_size=args.batch_size)
+    print(f"Archived {moved} checkouts returned more than {args.older_than_days} days ago")
+    return 0
+
+
+def cmd_build_assets(args):
+    report = assets.build(out_dir=args.output)
+    for name, sizes in sorted(report.items()):
+        compressed = ", ".join(f"{encoding} {size}" for encoding, size in sizes.items() if encoding not in ("path", "identity"))
+        print(f"{sizes['path']}: {sizes['identity']} bytes" + (f" ({compressed})" if compressed else ""))
+    if assets.brotli is None:
+        print("brotli is not installed; wrote gzip variants only", file=sys.stderr)
+    print(f"Built {len(report)} assets into {args.output}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MWD Tool Management maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="Bulk-load CSV/JSONL rows")
+    p.add_argument("kind", choices=sorted(importer.SPECS))
+    p.add_argument("path")
+    p.add_argument("--format", choices=importer.FORMATS)
+    p.add_argument("--batch-size", type=int, default=importer.BATCH_SIZE)
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="Stream rows out as CSV/JSONL")
+    p.add_argument("kind", choices=sorted(EXPORTS))
+    p.add_argument("-o", "--output")
+    p.add_argument("--format", choices=importer.FORMATS)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("migrate", help="Create tables and apply pending schema migrations")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("init-db", help="Migrate the schema and seed an empty database")
+    p.set_defaults(func=cmd_init_db)
+
+    p = sub.add_parser("seed", help="Insert the demo fleet into an empty database")
+    p.set_defaults(func=cmd_seed)
+
+    p = sub.add_parser("check-plans", help="Fail if hot queries fall back to full table scans")
+    p.set_defaults(func=cmd_check_plans)
+
+    p = sub.add_parser("rebuild-summary", help="Recompute the dashboard fleet counters from the tools table")
+    p.add_argument("--check", action="store_true", help="Only report counters that are off")
+    p.set_defaults(func=cmd_rebuild_summary)
+
+    p = sub.add_parser("archive", help="Move old returned checkouts into the archive table")
+    p.add_argument("--older-than-days", type=int, default=archive.ARCHIVE_AFTER.days)
+    p.add_argument("--batch-size", type=int, default=archive.BATCH_SIZE)
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("build-assets", help="Fingerprint and precompress static files for deploys")
+    p.add_argument("-o", "--output", default=assets.BUILD_DIR)
+    p.set_defaults(func=cmd_build_assets)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
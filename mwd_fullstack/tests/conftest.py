@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+# lib.db reads these at import time, so set them before anything imports lib.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_DIR = tempfile.mkdtemp(prefix="mwd-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'test.db')}"
+os.environ["SCHEDULER_ENABLED"] = "0"
+os.environ["SQL_COUNT_HEADER"] = "1"
+os.environ.pop("DB_ASYNC", None)
+# The app resolves templates/ and static/ relative to the working directory.
+os.chdir(APP_DIR)
+sys.path.insert(0, APP_DIR)
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    from lib.db import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_tools(db):
+    """Creates `count` available tools with serials starting with `prefix`; returns them."""
+    from lib import crud
+
+    def make(prefix, count, type_id=1, location="Test Bay"):
+        return [crud.create_tool(db, f"{prefix} {i}", f"{prefix}-{i:04d}", type_id, location) for i in range(count)]
+
+    return make
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from lib import archive, crud, importer
+from lib.models import Checkout, CheckoutArchive
+
+NOW = datetime(2024, 6, 1)
+
+
+def history_rows(tool, count, first):
+    return [
+        {"tool_serial_number": tool.serial_number, "username": "john_kamau", "project_location": f"Rig {n}",
+         "due_date": (first + timedelta(days=10 * n + 5)).isoformat(),
+         "checked_out_at": (first + timedelta(days=10 * n)).isoformat(),
+         "returned_at": (first + timedelta(days=10 * n + 3)).isoformat()}
+        for n in range(count)
+    ]
+
+
+def ids(db, model, tool):
+    return set(db.scalars(db.query(model.id).filter(model.tool_id == tool.id).statement))
+
+
+def test_archive_moves_old_returned_checkouts_only(client, db, make_tools):
+    (tool,) = make_tools("ARCHIVE", 1)
+    # Eight returned more than a year before NOW, four within the year.
+    rows = history_rows(tool, 8, NOW - timedelta(days=600)) + history_rows(tool, 4, NOW - timedelta(days=120))
+    (batch,) = importer.import_rows(db, "checkouts", enumerate(rows, start=1))
+    assert batch["inserted"] == 12
+    _, err = crud.checkout_tool(db, 1, tool.id, "Rig Open", "2099-01-01")
+    assert err is None
+    everything = ids(db, Checkout, tool)
+    cutoff = NOW - archive.ARCHIVE_AFTER
+
+    # One batch never moves more than its size.
+    assert archive.archive_batch(db, cutoff, batch_size=3, now=NOW) == 3
+    assert len(ids(db, CheckoutArchive, tool)) == 3
+
+    archive.archive_returned(now=NOW, batch_size=3)
+    hot, cold = ids(db, Checkout, tool), ids(db, CheckoutArchive, tool)
+    assert len(cold) == 8 and len(hot) == 5
+    assert not hot & cold and hot | cold == everything
+    returned_before_cutoff = db.query(Checkout).filter(Checkout.tool_id == tool.id, Checkout.returned_at < cutoff)
+    assert returned_before_cutoff.count() == 0
+    # Running it again finds nothing more for this tool.
+    archive.archive_returned(now=NOW, batch_size=3)
+    assert ids(db, CheckoutArchive, tool) == cold
+
+    seen, cursor = [], None
+    while True:
+        params = {"tool_id": tool.id, "limit": 4, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/v1/checkouts/history", params=params).json()
+        seen += [(item["checked_out_at"], item["id"]) for item in page["items"]]
+        cursor = page["next"]
+        if cursor is None:
+            break
+    assert [checkout_id for _, checkout_id in seen] == [checkout_id for _, checkout_id in sorted(seen, reverse=True)]
+    assert {checkout_id for _, checkout_id in seen} == everything
+    assert len(seen) == len(everything)
@@ -0,0 +1,17 @@
+import pytest
+
+from lib.assets import accepted_encodings
+
+
+@pytest.mark.parametrize("header, allowed, refused", [
+    ("gzip;q=0, *", {"br"}, {"gzip"}),
+    ("*", {"br", "gzip"}, set()),
+    ("br;q=0, gzip;q=0.5, *", {"gzip"}, {"br"}),
+    ("GZIP, br;q=0", {"gzip"}, {"br"}),
+    ("*;q=0", set(), {"br", "gzip"}),
+    ("", set(), {"br", "gzip"}),
+])
+def test_refused_codings_stay_refused_under_a_wildcard(header, allowed, refused):
+    accepted = accepted_encodings(header)
+    assert allowed <= accepted
+    assert not refused & accepted
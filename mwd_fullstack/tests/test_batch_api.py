@@ -0,0 +1,77 @@
+from lib import summary
+from lib.models import Checkout, Tool
+from lib.schemas import BATCH_LIMIT
+
+
+def checkout(client, serials):
+    return client.post("/api/v1/checkouts/batch", json={
+        "user_id": 1, "project_location": "Rig 9", "due_date": "2099-01-01", "serial_numbers": serials,
+    })
+
+
+def open_checkouts(db, tools):
+    return db.query(Checkout).filter(Checkout.tool_id.in_([tool.id for tool in tools]), Checkout.returned_at.is_(None)).count()
+
+
+def statuses(db, tools):
+    db.expire_all()
+    return {serial: status for serial, status in db.query(Tool.serial_number, Tool.status).filter(
+        Tool.id.in_([tool.id for tool in tools]))}
+
+
+def test_batch_checkout_is_all_or_nothing(client, db, make_tools):
+    tools = make_tools("BATCHOUT", 3)
+    serials = [tool.serial_number for tool in tools]
+    assert checkout(client, serials[:1]).status_code == 201
+
+    clash = checkout(client, serials + ["BATCHOUT-MISSING"])
+    assert clash.status_code == 409
+    assert clash.json()["detail"] == {
+        serials[0]: "not available (status=checked_out)",
+        "BATCHOUT-MISSING": "not found",
+    }
+    # The two free tools were claimed and then rolled back with the rest.
+    assert statuses(db, tools) == {serials[0]: "checked_out", serials[1]: "available", serials[2]: "available"}
+    assert open_checkouts(db, tools) == 1
+
+    done = checkout(client, serials[1:])
+    assert done.status_code == 201
+    assert done.json()["count"] == 2
+    assert summary.verify(db) == {}
+
+
+def test_batch_return_is_all_or_nothing(client, db, make_tools):
+    tools = make_tools("BATCHBACK", 3)
+    serials = [tool.serial_number for tool in tools]
+    assert checkout(client, serials[:2]).status_code == 201
+
+    clash = client.post("/api/v1/returns/batch", json={"serial_numbers": serials})
+    assert clash.status_code == 409
+    assert clash.json()["detail"] == {serials[2]: "not currently checked out"}
+    assert statuses(db, tools)[serials[0]] == "checked_out"
+    assert open_checkouts(db, tools) == 2
+
+    done = client.post("/api/v1/returns/batch", json={"serial_numbers": serials[:2]})
+    assert done.status_code == 200
+    assert done.json()["count"] == 2
+    assert open_checkouts(db, tools) == 0
+    assert summary.verify(db) == {}
+
+
+def test_batches_over_the_limit_are_rejected(client):
+    serials = [f"BATCHCAP-{n}" for n in range(BATCH_LIMIT + 1)]
+    assert checkout(client, serials).status_code == 422
+    assert client.post("/api/v1/returns/batch", json={"serial_numbers": serials}).status_code == 422
+    assert checkout(client, []).status_code == 422
+    assert checkout(client, serials[:BATCH_LIMIT]).status_code == 409
+
+
+def test_batch_checkout_for_an_unknown_user_claims_nothing(client, db, make_tools):
+    tools = make_tools("BATCHNOUSER", 2)
+    response = client.post("/api/v1/checkouts/batch", json={
+        "user_id": 99999, "project_location": "Rig 9", "due_date": "2099-01-01",
+        "serial_numbers": [tool.serial_number for tool in tools],
+    })
+    assert response.status_code == 404
+    assert set(statuses(db, tools).values()) == {"available"}
+    assert open_checkouts(db, tools) == 0
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from lib import crud
+
+
+def board_statements(client):
+    # The first request after a write refills the fleet-summary cache; measure the second.
+    client.get("/checkouts")
+    response = client.get("/checkouts")
+    assert response.status_code == 200
+    return int(response.headers["X-SQL-Count"])
+
+
+def test_board_statement_count_does_not_grow_with_checkouts(client, db, make_tools):
+    tools = make_tools("BOARD", 40)
+    _, err = crud.checkout_tool(db, 1, tools[0].id, "Rig 1", "2099-01-01")
+    assert err is None
+    one = board_statements(client)
+
+    rows, errors = crud.checkout_tools(db, 1, [tool.serial_number for tool in tools[1:]], "Rig 2", datetime(2099, 1, 1))
+    assert errors is None and len(rows) == 39
+    many = board_statements(client)
+
+    # One joined, column-only query for the page, whatever the page size.
+    assert one == many == 1
+
+
+
+def test_htmx_return_swaps_the_row_out_only_on_success(client, db, make_tools):
+    (tool,) = make_tools("HXRET", 1)
+    crud.checkout_tool(db, 1, tool.id, "Rig 4", "2099-01-01")
+    hx = {"HX-Request": "true"}
+
+    response = client.post("/checkouts/return", data={"tool_id": tool.id}, headers=hx)
+    assert (response.status_code, response.text) == (200, "")
+    # The tool's row fragment now shows it as available again.
+    row = client.get(f"/tools/rows/{tool.id}", headers=hx).text
+    assert "status-available" in row and "status-checked_out" not in row
+
+    for tool_id in (tool.id, 999999):
+        response = client.post("/checkouts/return", data={"tool_id": tool_id}, headers=hx)
+        assert response.status_code == 409
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from lib import crud, summary
+from lib.db import SessionLocal
+from lib.models import Checkout
+
+THREADS = 16
+ATTEMPTS = 32
+
+
+def _checkout(tool_id):
+    db = SessionLocal()
+    try:
+        _, err = crud.checkout_tool(db, 1, tool_id, "Stress Rig", "2099-01-01")
+        return err is None
+    finally:
+        db.close()
+
+
+def _calibrate(tool_id):
+    db = SessionLocal()
+    try:
+        _, err = crud.calibrate_tool(db, tool_id)
+        return err is None
+    finally:
+        db.close()
+
+
+def test_calibrations_racing_checkouts_keep_counters_in_step(db, make_tools):
+    tools = make_tools("CALRACE", 8)
+    jobs = [(fn, tool.id) for tool in tools for fn in (_checkout, _calibrate, _checkout, _calibrate)]
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(lambda job: job[0](job[1]), jobs))
+
+    assert all(ok for (fn, _), ok in zip(jobs, results) if fn is _calibrate)
+    assert summary.verify(db) == {}
+
+
+def test_concurrent_checkouts_of_one_tool_succeed_once(db, make_tools):
+    (tool,) = make_tools("RACE", 1)
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(_checkout, [tool.id] * ATTEMPTS))
+
+    assert results.count(True) == 1
+    assert db.query(Checkout).filter(Checkout.tool_id == tool.id, Checkout.returned_at.is_(None)).count() == 1
+    assert summary.verify(db) == {}
+
+
+def test_concurrent_checkouts_of_distinct_tools_all_succeed(db, make_tools):
+    tools = make_tools("SPREAD", ATTEMPTS * 4)
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(_checkout, [tool.id for tool in tools]))
+
+    assert all(results)
+    assert summary.verify(db) == {}
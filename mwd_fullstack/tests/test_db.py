@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from lib import db as lib_db
+
+
+def test_session_slots_work_across_event_loops():
+    async def crowd():
+        # More sessions than slots, so some have to wait on the semaphore.
+        async def hold():
+            async with lib_db._sync_session():
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(hold() for _ in range(lib_db.POOL_SIZE + lib_db.MAX_OVERFLOW + 5)))
+
+    asyncio.run(crowd())
+    asyncio.run(crowd())
+
+
+def test_pool_debug_route_is_off_by_default(client):
+    assert client.get("/debug/pool").status_code == 404
+
+
+def test_run_db_retries_a_locked_sqlite_write(db):
+    calls = []
+
+    def write(session):
+        calls.append(session)
+        if len(calls) < 3:
+            raise OperationalError("UPDATE tools", {}, Exception("database is locked"))
+        return "done"
+
+    assert asyncio.run(lib_db.run_db(db, write)) == "done"
+    assert len(calls) == 3
+
+    def broken(session):
+        raise OperationalError("UPDATE tools", {}, Exception("no such table: tools"))
+
+    with pytest.raises(OperationalError):
+        asyncio.run(lib_db.run_db(db, broken))
@@ -0,0 +1,76 @@
+from sqlalchemy.exc import OperationalError
+
+from lib import events
+from lib.models import ToolEvent
+
+
+class DownEngine:
+    def begin(self):
+        raise OperationalError("INSERT", {}, Exception("database is down"))
+
+
+def test_failed_flush_keeps_the_batch_for_the_next_one(db, make_tools, monkeypatch):
+    (tool,) = make_tools("EVRETRY", 1)
+    events.flush()
+    real_engine = events.engine
+    monkeypatch.setattr(events, "engine", DownEngine())
+    events.enqueue([events.event_row(tool.id, events.CALIBRATION, None, "2099-01-01")])
+
+    assert events.flush() == 0
+    assert db.query(ToolEvent).filter(ToolEvent.tool_id == tool.id, ToolEvent.kind == events.CALIBRATION).count() == 0
+
+    monkeypatch.setattr(events, "engine", real_engine)
+    events.flush()
+    assert db.query(ToolEvent).filter(ToolEvent.tool_id == tool.id, ToolEvent.kind == events.CALIBRATION).count() == 1
+
+
+def calibration_events(db, tool):
+    return db.query(ToolEvent).filter(ToolEvent.tool_id == tool.id, ToolEvent.kind == events.CALIBRATION).count()
+
+
+def test_bad_rows_are_split_out_and_dead_lettered(db, make_tools, monkeypatch, tmp_path):
+    (tool,) = make_tools("EVBAD", 1)
+    dead = tmp_path / "dead.jsonl"
+    monkeypatch.setattr(events, "DEAD_LETTER_PATH", str(dead))
+    events.flush()
+    good = [events.event_row(tool.id, events.CALIBRATION, None, str(n)) for n in range(7)]
+    # NOT NULL violation: the database rejects this row every time.
+    bad = events.event_row(tool.id, None, None, "bad")
+    events.enqueue(good[:3] + [bad] + good[3:])
+
+    assert events.flush() == 7
+    assert calibration_events(db, tool) == 7
+    (line,) = dead.read_text().splitlines()
+    assert '"new_value": "bad"' in line
+
+
+def test_retries_are_capped(db, make_tools, monkeypatch, tmp_path):
+    (tool,) = make_tools("EVCAP", 1)
+    dead = tmp_path / "dead.jsonl"
+    monkeypatch.setattr(events, "DEAD_LETTER_PATH", str(dead))
+    events.flush()
+    monkeypatch.setattr(events, "engine", DownEngine())
+    events.enqueue([events.event_row(tool.id, events.CALIBRATION, None, "capped")])
+
+    for _ in range(events.MAX_ATTEMPTS):
+        events.flush()
+    assert not events._retry
+    assert len(dead.read_text().splitlines()) == 1
+
+
+def test_full_queue_does_not_block_the_caller(monkeypatch, tmp_path):
+    import queue
+    import threading
+
+    dead = tmp_path / "dead.jsonl"
+    monkeypatch.setattr(events, "DEAD_LETTER_PATH", str(dead))
+    monkeypatch.setattr(events, "_queue", queue.Queue(maxsize=1))
+    flushes = []
+    monkeypatch.setattr(events, "flush", lambda: flushes.append(1))
+    monkeypatch.setattr(events, "_wake", threading.Event())
+
+    events.enqueue([events.event_row(1, events.CALIBRATION, None, str(n)) for n in range(3)])
+    assert len(dead.read_text().splitlines()) == 2
+    # The writer is woken; the caller neither flushes nor waits.
+    assert events._wake.is_set()
+    assert flushes == []
@@ -0,0 +1,171 @@
+import io
+from datetime import datetime
+
+from lib import events, importer, summary
+from lib.models import Checkout, Tool, ToolEvent
+
+
+def load(db, kind, rows, **kwargs):
+    return importer.import_rows(db, kind, enumerate(rows, start=1), **kwargs)
+
+
+def test_open_imported_checkout_claims_the_tool(db, make_tools):
+    free, taken, returned = make_tools("IMPORT", 3)
+    load(db, "checkouts", [{
+        "tool_serial_number": taken.serial_number, "username": "john_kamau",
+        "project_location": "Rig 5", "due_date": "2099-01-01",
+    }])
+    rows = [
+        {"tool_serial_number": free.serial_number, "username": "john_kamau",
+         "project_location": "Rig 9", "due_date": "2099-01-01"},
+        # A second open checkout for the same tool in the same batch.
+        {"tool_serial_number": free.serial_number, "username": "john_kamau",
+         "project_location": "Rig 9", "due_date": "2099-01-01"},
+        # Already checked out by the first import.
+        {"tool_serial_number": taken.serial_number, "username": "john_kamau",
+         "project_location": "Rig 9", "due_date": "2099-01-01"},
+        # History does not touch the tool's status.
+        {"tool_serial_number": returned.serial_number, "username": "john_kamau",
+         "project_location": "Rig 9", "due_date": "2020-01-01",
+         "checked_out_at": "2019-12-01T08:00:00", "returned_at": "2019-12-20T08:00:00"},
+    ]
+    (batch,) = load(db, "checkouts", rows)
+
+    assert batch["inserted"] == 2
+    assert sorted(error["line"] for error in batch["errors"]) == [2, 3]
+    db.expire_all()
+    statuses = {tool.serial_number: tool.status for tool in db.query(Tool).filter(Tool.id.in_([free.id, taken.id, returned.id]))}
+    assert statuses == {free.serial_number: "checked_out", taken.serial_number: "checked_out", returned.serial_number: "available"}
+    for tool in (free, taken):
+        assert db.query(Checkout).filter(Checkout.tool_id == tool.id, Checkout.returned_at.is_(None)).count() == 1
+    assert summary.verify(db) == {}
+
+
+def test_imported_checkouts_are_in_the_event_log(db, make_tools):
+    out, back = make_tools("IMPEVT", 2)
+    (batch,) = load(db, "checkouts", [
+        {"tool_serial_number": out.serial_number, "username": "john_kamau",
+         "project_location": "Rig 3", "due_date": "2099-01-01"},
+        {"tool_serial_number": back.serial_number, "username": "john_kamau",
+         "project_location": "Rig 3", "due_date": "2020-01-01",
+         "checked_out_at": "2019-12-01T08:00:00", "returned_at": "2019-12-20T08:00:00"},
+    ])
+    assert batch["inserted"] == 2
+    events.flush()
+
+    def status_events(tool):
+        return [
+            (event.old_value, event.new_value, event.occurred_at, event.checkout_id)
+            for event in db.query(ToolEvent)
+            .filter(ToolEvent.tool_id == tool.id, ToolEvent.kind == events.STATUS, ToolEvent.checkout_id.isnot(None))
+            .order_by(ToolEvent.occurred_at)
+        ]
+
+    (opened,) = db.query(Checkout).filter(Checkout.tool_id == out.id)
+    assert status_events(out) == [("available", "checked_out", opened.checked_out_at, opened.id)]
+    (history,) = db.query(Checkout).filter(Checkout.tool_id == back.id)
+    assert status_events(back) == [
+        ("available", "checked_out", datetime(2019, 12, 1, 8), history.id),
+        ("checked_out", "available", datetime(2019, 12, 20, 8), history.id),
+    ]
+
+
+def test_returned_checkout_needs_its_checkout_time(db, make_tools):
+    (tool,) = make_tools("IMPRET", 1)
+    row = {"tool_serial_number": tool.serial_number, "username": "john_kamau",
+           "project_location": "Rig 2", "due_date": "2020-01-01", "returned_at": "2019-12-20T08:00:00"}
+    backwards = dict(row, checked_out_at="2019-12-21T08:00:00")
+    (batch,) = load(db, "checkouts", [row, backwards])
+
+    assert batch["inserted"] == 0
+    assert [error["error"] for error in batch["errors"]] == [
+        "returned_at needs checked_out_at", "returned_at is before checked_out_at",
+    ]
+
+
+def test_rejected_batch_keys_can_be_imported_later(db, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+
+    real_count = summary.count_new_tools
+    calls = []
+
+    def fail_first_batch(db, records):
+        calls.append(len(records))
+        if len(calls) == 1:
+            raise IntegrityError("INSERT", {}, Exception("simulated constraint failure"))
+        real_count(db, records)
+
+    monkeypatch.setattr(summary, "count_new_tools", fail_first_batch)
+    row = {"name": "Retry Tool", "serial_number": "IMPSEEN-0001", "type_id": "1"}
+    first, second = load(db, "tools", [row, dict(row)], batch_size=1)
+
+    assert first["inserted"] == 0 and first["errors"][0]["error"].startswith("batch rejected")
+    assert second["inserted"] == 1 and second["errors"] == []
+
+
+def test_users_and_tool_types_import(db):
+    (users,) = load(db, "users", [{"username": "import_user_1", "full_name": "Import User"}])
+    (types,) = load(db, "tool_types", [{"name": "Import Type 1"}])
+    assert users["inserted"] == 1 and types["inserted"] == 1
+
+
+def test_bad_jsonl_lines_are_reported_per_line(db, make_tools):
+    (tool,) = make_tools("IMPJSON", 1)
+    lines = "\n".join([
+        '{"tool_serial_number": "%s", "username": "john_kamau", "project_location": "Rig 1", "due_date": "2020-01-01",'
+        ' "checked_out_at": "2019-12-01T08:00:00+02:00", "returned_at": "2019-12-01T07:00:00"}' % tool.serial_number,
+        '{"tool_serial_number": "IMPJSON-0000", "username": ',
+        '[1, 2]',
+    ])
+    (batch,) = importer.import_rows(db, "checkouts", importer.read_rows(io.StringIO(lines), "jsonl"))
+
+    assert batch["inserted"] == 1
+    assert [(error["line"], error["error"].split(":")[0]) for error in batch["errors"]] == [
+        (2, "invalid JSON"), (3, "expected an object, got list"),
+    ]
+    (history,) = db.query(Checkout).filter(Checkout.tool_id == tool.id)
+    # Offsets are stored as naive UTC.
+    assert history.checked_out_at == datetime(2019, 12, 1, 6)
+
+
+def test_errors_carry_the_file_line_and_unknown_tool_types_are_rejected(db):
+    csv_text = (
+        "name,serial_number,type_id,location\n"
+        '"Gauge, with\na two-line name",IMPLINE-0001,1,Bay\n'
+        "\n"
+        "Gauge,IMPLINE-0002,999999,Bay\n"
+        "Gauge,IMPLINE-0003,x,Bay\n"
+    )
+    (batch,) = importer.import_rows(db, "tools", importer.read_rows(io.StringIO(csv_text), "csv"))
+    assert batch["inserted"] == 1
+    assert [(error["line"], error["error"]) for error in batch["errors"]] == [
+        (6, "invalid type_id: 'x'"), (5, "unknown type_id 999999"),
+    ]
+
+    jsonl_text = '\n{"name": "Gauge", "serial_number": "IMPLINE-0004", "type_id": 999999}\n\n{"name": "Gauge"}\n'
+    (batch,) = importer.import_rows(db, "tools", importer.read_rows(io.StringIO(jsonl_text), "jsonl"))
+    assert [(error["line"], error["error"]) for error in batch["errors"]] == [
+        (4, "missing serial_number"), (2, "unknown type_id 999999"),
+    ]
+
+
+def test_exported_checked_out_tool_reimports_with_its_checkout(db):
+    (tools,) = load(db, "tools", [
+        {"name": "Reimport", "serial_number": "IMPSTAT-0001", "type_id": "1", "status": "checked_out"},
+        {"name": "Broken", "serial_number": "IMPSTAT-0002", "type_id": "1", "status": "broken"},
+    ])
+    assert tools["inserted"] == 1
+    assert [error["error"] for error in tools["errors"]] == ["invalid status: 'broken'"]
+    (tool,) = db.query(Tool).filter(Tool.serial_number == "IMPSTAT-0001")
+    assert {(event.kind, event.new_value) for event in db.query(ToolEvent).filter(ToolEvent.tool_id == tool.id)} == {
+        (events.STATUS, "available"), (events.LOCATION, None),
+    }
+
+    (checkouts,) = load(db, "checkouts", [
+        {"tool_serial_number": "IMPSTAT-0001", "username": "john_kamau", "project_location": "Rig 7",
+         "due_date": "2099-01-01"},
+    ])
+    assert checkouts["inserted"] == 1 and checkouts["errors"] == []
+    db.expire_all()
+    assert db.query(Tool.status).filter(Tool.serial_number == "IMPSTAT-0001").scalar() == "checked_out"
+    assert summary.verify(db) == {}
@@ -0,0 +1,20 @@
+from sqlalchemy import select, update
+
+from lib import metrics
+from lib.models import Tool
+
+
+def test_rows_counts_selected_and_changed_rows(db, make_tools):
+    tools = make_tools("METRICROWS", 3)
+    ids = [tool.id for tool in tools]
+    stats = metrics.RequestStats()
+    token = metrics._current.set(stats)
+    try:
+        # Column selects load no ORM instances but still return rows.
+        assert len(db.execute(select(Tool.id, Tool.serial_number).where(Tool.id.in_(ids))).all()) == 3
+        db.execute(update(Tool).where(Tool.id.in_(ids[:2])).values(location="Metric Bay"))
+        db.rollback()
+    finally:
+        metrics._current.reset(token)
+    assert stats.rows == 5
+    assert stats.sql_count == 2
@@ -0,0 +1,34 @@
+import os
+import shutil
+
+from lib import migrations, summary
+from lib.db import make_engine
+
+BASELINE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib", "mwd.db")
+
+
+def test_hot_queries_are_index_backed(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    try:
+        migrations.upgrade(bind=engine)
+        assert migrations.current_version(bind=engine) == migrations.MIGRATIONS[-1][0]
+        assert migrations.check_query_plans(bind=engine) == {}
+    finally:
+        engine.dispose()
+
+
+def test_upgrade_from_baseline_schema(tmp_path):
+    # lib/mwd.db predates every migration, like a database already deployed.
+    path = tmp_path / "baseline.db"
+    shutil.copy(BASELINE_DB, path)
+    engine = make_engine(f"sqlite:///{path}")
+    try:
+        assert migrations.current_version(bind=engine) == 0
+        assert migrations.upgrade(bind=engine) == [version for version, _, _ in migrations.MIGRATIONS]
+        with engine.connect() as conn:
+            assert summary.verify(conn) == {}
+            # Raises if the search table missed the tools that predate it.
+            conn.exec_driver_sql("INSERT INTO tools_fts(tools_fts, rank) VALUES ('integrity-check', 1)")
+        assert migrations.check_query_plans(bind=engine) == {}
+    finally:
+        engine.dispose()
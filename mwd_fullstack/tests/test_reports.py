@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from lib import events, reports
+
+
+def test_utilisation_counts_a_checkout_opened_before_the_window(db, make_tools):
+    (tool,) = make_tools("UTIL", 1, type_id=3)
+    events.record_many(db, [
+        events.event_row(tool.id, events.STATUS, "available", "checked_out", occurred_at=datetime(2020, 1, 1)),
+        events.event_row(tool.id, events.LOCATION, "Test Bay", "Rig 1", occurred_at=datetime(2020, 1, 1)),
+        events.event_row(tool.id, events.STATUS, "checked_out", "available", occurred_at=datetime(2020, 3, 11)),
+        events.event_row(tool.id, events.STATUS, "available", "checked_out", occurred_at=datetime(2020, 3, 21)),
+    ])
+    db.commit()
+    events.flush()
+
+    rows = reports.utilisation(db, "tool", datetime(2020, 3, 1), datetime(2020, 4, 1), tool_id=tool.id)
+    assert [(row["month"], row["hours_out"], row["checkouts"]) for row in rows] == [("2020-03", (10 + 11) * 24, 2)]
+
+    (by_type,) = [
+        row for row in reports.utilisation(db, "type", datetime(2020, 3, 1), datetime(2020, 4, 1)) if row["key"] == 3
+    ]
+    assert by_type["hours_out"] >= 21 * 24
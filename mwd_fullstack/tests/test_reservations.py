@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from lib import crud
+
+
+def book(client, tool_id, starts_at, days, user_id=1):
+    return client.post("/api/v1/reservations", json={
+        "tool_id": tool_id, "user_id": user_id,
+        "starts_at": starts_at.isoformat(), "ends_at": (starts_at + timedelta(days=days)).isoformat(),
+    })
+
+
+def test_reservation_answers_404_for_unknown_refs_422_for_bad_windows_and_409_for_a_clash(client, make_tools):
+    (tool,) = make_tools("RESV", 1)
+    start = datetime(2099, 3, 1)
+
+    assert book(client, 10**9, start, 5).status_code == 404
+    assert book(client, tool.id, start, 5, user_id=10**9).status_code == 404
+    assert book(client, tool.id, start, 0).status_code == 422
+    assert book(client, tool.id, start, 5).status_code == 201
+    clash = book(client, tool.id, start + timedelta(days=2), 5)
+    assert clash.status_code == 409
+    assert clash.json()["detail"].startswith(crud.ALREADY_RESERVED)
+
+
+def test_past_bookings_do_not_hide_a_free_tool(db, make_tools):
+    (tool,) = make_tools("RESVHIST", 1, type_id=2)
+    now = datetime(2099, 6, 1)
+    for days_ago in range(60, 0, -10):
+        _, err = crud.create_reservation(db, tool.id, 1, now - timedelta(days=days_ago), now - timedelta(days=days_ago - 5))
+        assert err is None
+
+    free = crud.get_free_tool_rows(db, 2, now, now + timedelta(days=3), limit=None)
+    assert tool.id in [row.id for row in free]
+    busy = crud.get_free_tool_rows(db, 2, now - timedelta(days=8), now - timedelta(days=7), limit=None)
+    assert tool.id not in [row.id for row in busy]
+
+
+def test_offset_and_naive_bounds_are_both_utc(client, db, make_tools):
+    (tool,) = make_tools("RESVTZ", 1, type_id=3)
+    window = {"starts_at": "2099-09-01T03:00:00+03:00", "ends_at": "2099-09-02T00:00:00"}
+    booked = client.post("/api/v1/reservations", json={"tool_id": tool.id, "user_id": 1, **window})
+    assert booked.status_code == 201
+    assert booked.json()["starts_at"] == "2099-09-01T00:00:00"
+
+    free = client.get("/api/v1/availability", params={"type_id": 3, "limit": 500, **window})
+    assert free.status_code == 200
+    assert tool.id not in [row["id"] for row in free.json()["items"]]
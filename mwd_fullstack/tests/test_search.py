@@ -0,0 +1,36 @@
+from lib import crud
+
+
+def serials(tools):
+    return [tool.serial_number for tool in tools]
+
+
+def test_search_ranks_exact_serial_then_serial_prefix_then_name_prefix(db):
+    crud.create_tool(db, "Gauge SRCH-RANK", "X-SRCH-RANK", 1, "Test Bay")
+    crud.create_tool(db, "SRCH-RANK gauge", "Y-100", 1, "Test Bay")
+    crud.create_tool(db, "Gauge", "SRCH-RANK-2", 1, "Test Bay")
+    crud.create_tool(db, "Gauge", "SRCH-RANK", 1, "Test Bay")
+
+    assert serials(crud.search_tools(db, "srch-rank")) == ["SRCH-RANK", "SRCH-RANK-2", "Y-100", "X-SRCH-RANK"]
+    assert serials(crud.search_tools(db, "srch-rank", limit=2)) == ["SRCH-RANK", "SRCH-RANK-2"]
+
+
+def test_search_takes_percent_and_underscore_literally(db):
+    crud.create_tool(db, "Pump 50% duty", "SRCH-PCT-1", 1, "Test Bay")
+    crud.create_tool(db, "Pump 500 duty", "SRCH-PCT-2", 1, "Test Bay")
+    crud.create_tool(db, "Sub", "SRCH_US_1", 1, "Test Bay")
+    crud.create_tool(db, "Sub", "SRCHXUSX1", 1, "Test Bay")
+
+    assert serials(crud.search_tools(db, "pump 50%")) == ["SRCH-PCT-1"]
+    assert serials(crud.search_tools(db, "srch_us")) == ["SRCH_US_1"]
+    # Under three characters the trigram table cannot help; LIKE must still escape.
+    assert "SRCH-PCT-2" not in serials(crud.search_tools(db, "0%"))
+
+
+def test_search_index_follows_renames(db):
+    tool = crud.create_tool(db, "Torque wrench", "SRCH-RENAME", 1, "Test Bay")
+    tool.name = "Impact driver"
+    db.commit()
+
+    assert serials(crud.search_tools(db, "torque wrench")) == []
+    assert serials(crud.search_tools(db, "impact driver")) == ["SRCH-RENAME"]
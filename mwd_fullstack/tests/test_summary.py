@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from lib import crud, summary
+
+
+def test_checkout_and_return_lock_counters_in_the_same_order(db, make_tools, monkeypatch):
+    tools = make_tools("LOCKORDER", 2)
+    calls = []
+    real_upsert = summary._upsert
+
+    def recording_upsert(db, model, columns, deltas):
+        calls.append((model.__tablename__, sorted(deltas, key=summary._sort_key)))
+        real_upsert(db, model, columns, deltas)
+
+    monkeypatch.setattr(summary, "_upsert", recording_upsert)
+
+    crud.checkout_tool(db, 1, tools[0].id, "Rig 4", "2099-01-01")
+    checkout_order = list(calls)
+    calls.clear()
+    crud.return_tool(db, tools[0].id)
+    assert calls == checkout_order
+
+    calls.clear()
+    crud.checkout_tools(db, 1, [tools[1].serial_number], "Rig 4", datetime(2099, 1, 1))
+    batch_checkout_order = list(calls)
+    calls.clear()
+    crud.return_tools(db, [tools[1].serial_number])
+    assert calls == batch_checkout_order == checkout_order
+    assert summary.verify(db) == {}
+
+
+def test_dashboard_breakdowns_come_from_counters(client, db, make_tools):
+    from lib import scheduler
+
+    tools = make_tools("BREAKDOWN", 3, location="Breakdown Yard")
+    crud.checkout_tool(db, 2, tools[0].id, "Rig 6", "2000-01-01")
+    crud.checkout_tools(db, 2, [tools[1].serial_number, tools[2].serial_number], "Rig 6", datetime(2099, 1, 1))
+    scheduler.run_due_checks()
+    crud.return_tool(db, tools[1].id)
+    assert summary.verify(db) == {}
+
+    summary.invalidate()
+    fleet = summary.fleet_summary(db)
+    (yard,) = [row for row in fleet["by_location"] if row["name"] == "Breakdown Yard"]
+    assert yard["overdue"] == 1 and yard["checked_out"] == 2
+
+    crud.return_tool(db, tools[0].id)
+    assert summary.verify(db) == {}